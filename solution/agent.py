@@ -1,20 +1,33 @@
 # Copyright (c) Microsoft. All rights reserved.
 
 import asyncio
-import json
 import os
 from datetime import datetime
 from pathlib import Path
 from typing import Annotated
 
-import pandas as pd
-from agent_framework.azure import AzureAIAgentsProvider
-from azure.identity.aio import DefaultAzureCredential
-from dotenv import load_dotenv
-from pydantic import Field
-
-# Load environment variables from .env file
-load_dotenv()
+from pydantic import BaseModel, Field
+
+from agent_cache import AgentCache, StartupTimer, get_agent_cache, get_or_create_agent
+from alias_allocator import get_alias_allocator
+from approvals import request_approval
+from badge_access import (
+    MAX_FLOOR,
+    MIN_FLOOR,
+    describe_floors,
+    floors_to_mask,
+    format_badge_access,
+    get_floor_access_index,
+    parse_badge_access,
+)
+from fuzzy_search import get_name_index
+from guest_expiry import GUEST_EXPIRY_DAYS
+from metrics import REGISTRY, export_metrics, instrument_tool
+from parking_codes import get_issued_today, get_parking_code_allocator
+from providers import open_provider
+from storage import get_backend
+from tool_executor import offload_tool, run_blocking
+from turn_trace import TurnHistory, TurnTrace
 
 """
 User Access Check Agent
@@ -29,47 +42,50 @@ EMPLOYEES_FILE = DATA_DIR / "employees.csv"
 GUESTS_FILE = DATA_DIR / "guests.csv"
 PARKING_RECORDS_FILE = DATA_DIR / "parking_records.csv"
 
+# Storage backend for the three datasets: the CSV files above by default,
+# or SQLite with STORAGE_BACKEND=sqlite (see storage.py). Nothing is read until a
+# tool first touches a table.
+STORAGE = get_backend(DATA_DIR)
+
 # ============================================================================
 # 🔐 HUMAN-IN-THE-LOOP APPROVAL SYSTEM
 # ============================================================================
-# PASSKEY: 1234
+# PASSKEY: 1234 (APPROVAL_PASSKEY in approvals.py)
 # This approval system protects all write operations (CSV modifications).
 # Before any data is written, the system admin must enter the passkey.
+# Approvals are async: set APPROVAL_MODE=console|queue|auto (see approvals.py).
 # ============================================================================
 
-APPROVAL_PASSKEY = "1234"  # Secret passkey for write operations
-
-def request_approval_for_write_operation(operation_name: str, details: str) -> bool:
+async def request_approval_for_write_operation(operation_name: str, details: str) -> bool:
     """Request human approval before executing a write operation.
     
+    The decision comes from the approver configured in approvals.py (console passkey
+    prompt by default). Awaiting it doesn't block the event loop, so other sessions
+    keep running while an admin decides.
+    
     Args:
         operation_name: Name of the operation (e.g., "Add Employee", "Generate Parking Code")
         details: Description of what will be written (e.g., "Add John Doe with alias jdoe")
     
     Returns:
-        True if approved, False if denied
+        True if approved, False if denied (or timed out)
     """
-    print("\n" + "="*70)
-    print("🔐 WRITE OPERATION APPROVAL REQUIRED")
-    print("="*70)
-    print(f"Operation: {operation_name}")
-    print(f"Details: {details}")
-    print(f"\nThis operation will modify data files.")
-    print("\nTo approve, enter the passkey (or press Enter to deny):")
-    print("="*70)
-    
-    try:
-        user_input = input("Enter passkey: ").strip()
-        
-        if user_input == APPROVAL_PASSKEY:
-            print("✅ APPROVED - Operation will proceed\n")
-            return True
-        else:
-            print("❌ DENIED - Invalid passkey or operation cancelled\n")
-            return False
-    except (EOFError, KeyboardInterrupt):
-        print("\n❌ DENIED - Operation cancelled by user\n")
-        return False
+    request = await request_approval(operation_name, details)
+    return bool(request.approved)
+
+
+def days_since(date_str: str) -> int:
+    """Whole days from a YYYY-MM-DD date to today."""
+    return (datetime.now().date() - datetime.strptime(date_str, "%Y-%m-%d").date()).days
+
+
+def close_matches_note(table, query: str) -> str:
+    """Near-matches of a missed lookup (typos), for the tool's reply; empty if there are none."""
+    matches = get_name_index(table).search(query)
+    if not matches:
+        return ""
+    listed = ", ".join(f"{row['name']} (alias: {row['alias']})" for row, _ in matches)
+    return f" Close matches: {listed}. Ask whether they are one of these before adding anyone."
 
 
 def check_employee_exists(
@@ -77,15 +93,14 @@ def check_employee_exists(
 ) -> str:
     """Check if an employee exists in the employee dataset by their alias."""
     try:
-        df = pd.read_csv(EMPLOYEES_FILE)
-        # Case-insensitive search by alias
-        result = df[df['alias'].str.lower() == alias.lower()]
+        # Case-insensitive O(1) lookup in the shared alias index
+        employee = STORAGE.employees.find('alias', alias)
         
-        if not result.empty:
-            employee = result.iloc[0]
+        if employee is not None:
             return f"Employee found: {employee['name']} (alias: {employee['alias']}, last accessed: {employee['date_accessed']})"
         else:
-            return f"Employee with alias '{alias}' not found in the employee database."
+            # A typo shouldn't lead to a second registration of the same person
+            return f"Employee with alias '{alias}' not found in the employee database." + close_matches_note(STORAGE.employees, alias)
     except Exception as e:
         return f"Error checking employee database: {str(e)}"
 
@@ -96,32 +111,63 @@ def check_guest_exists(
 ) -> str:
     """Check if a guest exists in the guest dataset by their first and last name. Validates 30-day expiration."""
     try:
-        from datetime import timedelta
-        
-        df = pd.read_csv(GUESTS_FILE)
-        # Construct full name and search case-insensitively
+        # Construct full name and look it up case-insensitively in the shared name index
         full_name = f"{first_name} {last_name}"
-        result = df[df['name'].str.lower() == full_name.lower()]
+        guest = STORAGE.guests.find('name', full_name)
         
-        if not result.empty:
-            guest = result.iloc[0]
-            
+        if guest is not None:
             # Check if guest has expired (more than 30 days since last access)
-            last_accessed = pd.to_datetime(guest['date_accessed'])
-            current_date = pd.to_datetime(datetime.now().strftime("%Y-%m-%d"))
-            days_since_access = (current_date - last_accessed).days
+            days_since_access = days_since(guest['date_accessed'])
             
-            if days_since_access > 30:
+            if days_since_access > GUEST_EXPIRY_DAYS:
                 return f"Guest found but EXPIRED: {guest['name']} (alias: {guest['alias']}, last accessed: {guest['date_accessed']}, {days_since_access} days ago). Guest access has expired after 30 days and must be re-registered with a new alias."
             else:
                 return f"Guest found: {guest['name']} (alias: {guest['alias']}, last accessed: {guest['date_accessed']}, {days_since_access} days ago)"
         else:
-            return f"Guest '{full_name}' not found in the guest database."
+            return f"Guest '{full_name}' not found in the guest database." + close_matches_note(STORAGE.guests, full_name)
     except Exception as e:
         return f"Error checking guest database: {str(e)}"
 
 
-def remove_expired_guest(
+def check_people_exist(
+    people: Annotated[list[str], Field(description="Everyone to check, each as an employee alias or a guest's full name. Example: ['jsmith', 'Tony Stark', 'Daniel Moore']")],
+) -> str:
+    """Check a whole group at once (e.g. visitors for an event). Each person is looked up as an employee alias, an employee name or a guest name in one pass. Validates the guests' 30-day expiration."""
+    try:
+        employees, guests = STORAGE.employees, STORAGE.guests
+        # Blank entries are not people
+        people = [person.strip() for person in people if person.strip()]
+        lines = []
+        counts = {"employee(s)": 0, "guest(s)": 0, "expired guest(s)": 0, "not found": 0}
+        
+        for person in people:
+            employee = employees.find('alias', person) or employees.find('name', person)
+            if employee is not None:
+                counts["employee(s)"] += 1
+                lines.append(f"- {person}: employee {employee['name']} (alias: {employee['alias']})")
+                continue
+            
+            guest = guests.find('name', person)
+            if guest is None:
+                counts["not found"] += 1
+                lines.append(f"- {person}: not found")
+                continue
+            
+            days_since_access = days_since(guest['date_accessed'])
+            if days_since_access > GUEST_EXPIRY_DAYS:
+                counts["expired guest(s)"] += 1
+                lines.append(f"- {person}: guest EXPIRED (alias: {guest['alias']}, last accessed {days_since_access} days ago) - must be re-registered")
+            else:
+                counts["guest(s)"] += 1
+                lines.append(f"- {person}: guest (alias: {guest['alias']}, last accessed {days_since_access} days ago)")
+        
+        summary = ", ".join(f"{count} {label}" for label, count in counts.items() if count)
+        return f"Checked {len(people)} people: {summary or 'nobody'}.\n" + "\n".join(lines)
+    except Exception as e:
+        return f"Error checking people: {str(e)}"
+
+
+async def remove_expired_guest(
     first_name: Annotated[str, Field(description="The first name of the expired guest to remove.")],
     last_name: Annotated[str, Field(description="The last name of the expired guest to remove.")],
 ) -> str:
@@ -130,21 +176,23 @@ def remove_expired_guest(
         full_name = f"{first_name} {last_name}"
         
         # 🔐 REQUEST APPROVAL BEFORE WRITING
-        if not request_approval_for_write_operation(
+        if not await request_approval_for_write_operation(
             "Remove Expired Guest",
             f"Remove guest '{full_name}' from the guest database"
         ):
             return f"❌ Operation cancelled: Removal of guest '{full_name}' was not approved."
         
-        df = pd.read_csv(GUESTS_FILE)
+        def remove_guest() -> int:
+            guests = STORAGE.guests
+            version_before = guests.version
+            removed_count = guests.remove('name', full_name)
+            get_name_index(guests).record_write(version_before)
+            return removed_count
         
-        # Find and remove the guest
-        initial_count = len(df)
-        df = df[df['name'].str.lower() != full_name.lower()]
-        final_count = len(df)
+        # Find and remove the guest (a file rewrite, so off the event loop)
+        removed_count = await run_blocking(remove_guest)
         
-        if initial_count > final_count:
-            df.to_csv(GUESTS_FILE, index=False)
+        if removed_count > 0:
             return f"✅ Expired guest '{full_name}' has been removed from the database. They can now be re-registered with a new alias."
         else:
             return f"Guest '{full_name}' not found in the database."
@@ -152,20 +200,18 @@ def remove_expired_guest(
         return f"Error removing expired guest: {str(e)}"
 
 
-def add_employee(
+async def add_employee(
     name: Annotated[str, Field(description="The full name of the employee to add.")],
     alias: Annotated[str, Field(description="The alias/username for the employee.")],
 ) -> str:
     """Add a new employee to the employee dataset. Requires passkey approval."""
     try:
-        df = pd.read_csv(EMPLOYEES_FILE)
-        
         # Check if already exists
-        if not df[df['name'].str.lower() == name.lower()].empty:
+        if await run_blocking(STORAGE.employees.contains, 'name', name):
             return f"Employee '{name}' already exists in the database."
         
         # 🔐 REQUEST APPROVAL BEFORE WRITING
-        if not request_approval_for_write_operation(
+        if not await request_approval_for_write_operation(
             "Add Employee",
             f"Add employee '{name}' with alias '{alias}' to the database"
         ):
@@ -174,21 +220,26 @@ def add_employee(
         # Get current date
         current_date = datetime.now().strftime("%Y-%m-%d")
         
-        # Add new row
-        new_row = pd.DataFrame({
-            'name': [name],
-            'alias': [alias],
-            'date_accessed': [current_date],
-            'badge_access': ['']  # New employees start with no badge access
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(EMPLOYEES_FILE, index=False)
+        # Append new row (only this row is written)
+        row = {
+            'name': name,
+            'alias': alias,
+            'date_accessed': current_date,
+            'badge_access': ''  # New employees start with no badge access
+        }
+        def append_employee():
+            employees = STORAGE.employees
+            version_before = employees.version
+            employees.append(row)
+            get_name_index(employees).record_added([row], version_before)
+        
+        await run_blocking(append_employee)
         
         return f"✅ Successfully added employee: {name} (alias: {alias}, date: {current_date}). No badge access granted yet."
     except Exception as e:
         return f"Error adding employee: {str(e)}"
 
-def add_guest(
+async def add_guest(
     first_name: Annotated[str, Field(description="The first name of the guest to add.")],
     last_name: Annotated[str, Field(description="The last name of the guest to add.")],
     alias: Annotated[str, Field(description="The alias/username for the guest.")],
@@ -196,14 +247,13 @@ def add_guest(
     """Add a new guest to the guest dataset. Requires passkey approval."""
     try:
         full_name = f"{first_name} {last_name}"
-        df = pd.read_csv(GUESTS_FILE)
         
         # Check if already exists
-        if not df[df['name'].str.lower() == full_name.lower()].empty:
+        if await run_blocking(STORAGE.guests.contains, 'name', full_name):
             return f"Guest '{full_name}' already exists in the database."
         
         # 🔐 REQUEST APPROVAL BEFORE WRITING
-        if not request_approval_for_write_operation(
+        if not await request_approval_for_write_operation(
             "Add Guest",
             f"Add guest '{full_name}' with alias '{alias}' to the database"
         ):
@@ -212,31 +262,35 @@ def add_guest(
         # Get current date
         current_date = datetime.now().strftime("%Y-%m-%d")
         
-        # Add new row
-        new_row = pd.DataFrame({
-            'name': [full_name],
-            'alias': [alias],
-            'date_accessed': [current_date]
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(GUESTS_FILE, index=False)
+        # Append new row (only this row is written)
+        row = {
+            'name': full_name,
+            'alias': alias,
+            'date_accessed': current_date
+        }
+        def append_guest():
+            guests = STORAGE.guests
+            version_before = guests.version
+            guests.append(row)
+            get_name_index(guests).record_added([row], version_before)
+        
+        await run_blocking(append_guest)
         
         return f"✅ Successfully added guest: {full_name} (alias: {alias}, date: {current_date})"
     except Exception as e:
         return f"Error adding guest: {str(e)}"
 
 
-def add_guest_with_auto_alias(
+async def add_guest_with_auto_alias(
     first_name: Annotated[str, Field(description="The first name of the guest to add.")],
     last_name: Annotated[str, Field(description="The last name of the guest to add.")],
 ) -> str:
     """Add a new guest with an automatically generated alias. Use this for re-registering expired guests. Requires passkey approval."""
     try:
         full_name = f"{first_name} {last_name}"
-        df = pd.read_csv(GUESTS_FILE)
         
         # Check if already exists
-        if not df[df['name'].str.lower() == full_name.lower()].empty:
+        if await run_blocking(STORAGE.guests.contains, 'name', full_name):
             return f"Guest '{full_name}' already exists in the database."
         
         # Auto-generate alias: first initial + last name + timestamp suffix
@@ -244,74 +298,188 @@ def add_guest_with_auto_alias(
         base_alias = f"{first_name[0].lower()}{last_name.lower()}"
         auto_alias = f"{base_alias}{timestamp_suffix}"
         
-        # Ensure alias is unique
-        counter = 1
-        final_alias = auto_alias
-        while not df[df['alias'].str.lower() == final_alias.lower()].empty:
-            final_alias = f"{auto_alias}{counter}"
-            counter += 1
-        
-        # 🔐 REQUEST APPROVAL BEFORE WRITING
-        if not request_approval_for_write_operation(
-            "Re-register Expired Guest",
-            f"Re-register guest '{full_name}' with auto-generated alias '{final_alias}'"
-        ):
-            return f"❌ Operation cancelled: Re-registering guest '{full_name}' was not approved."
-        
-        # Get current date
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        # Reserve a unique alias (per-base counter + alias index, no column rescans)
+        guests = STORAGE.guests
+        allocator = get_alias_allocator(guests)
+        final_alias = await run_blocking(allocator.reserve, auto_alias)
         
-        # Add new row
-        new_row = pd.DataFrame({
-            'name': [full_name],
-            'alias': [final_alias],
-            'date_accessed': [current_date]
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(GUESTS_FILE, index=False)
+        try:
+            # 🔐 REQUEST APPROVAL BEFORE WRITING
+            if not await request_approval_for_write_operation(
+                "Re-register Expired Guest",
+                f"Re-register guest '{full_name}' with auto-generated alias '{final_alias}'"
+            ):
+                return f"❌ Operation cancelled: Re-registering guest '{full_name}' was not approved."
+            
+            # Get current date
+            current_date = datetime.now().strftime("%Y-%m-%d")
+            
+            def append_guest(alias: str) -> bool:
+                row = {'name': full_name, 'alias': alias, 'date_accessed': current_date}
+                version_before = guests.version
+                written = guests.append(row, unique='alias')
+                get_name_index(guests).record_added([row] if written else [], version_before)
+                return written
+            
+            # Append new row; if another kiosk took the alias meanwhile, use the next one
+            while not await run_blocking(append_guest, final_alias):
+                allocator.release(final_alias)
+                final_alias = await run_blocking(allocator.reserve, auto_alias)
+        finally:
+            allocator.release(final_alias)
         
         return f"✅ Successfully re-registered guest: {full_name} with new auto-generated alias: {final_alias} (date: {current_date})"
     except Exception as e:
         return f"Error adding guest with auto alias: {str(e)}"
 
 
-def generate_parking_code(
-    alias: Annotated[str, Field(description="The alias/username of the employee requesting parking.")],
+class GuestRegistration(BaseModel):
+    """One guest in a group registration."""
+    
+    first_name: str = Field(description="The guest's first name.")
+    last_name: str = Field(description="The guest's last name.")
+    alias: str | None = Field(default=None, description="The alias/username for the guest. Leave empty to auto-generate one.")
+
+
+async def register_guests(
+    guests: Annotated[list[GuestRegistration], Field(description="The guests to register, e.g. everyone attending an event.")],
 ) -> str:
-    """Generate a 6-digit parking validation code for an employee and save it to parking records. Requires passkey approval."""
+    """Register a group of new guests at once, with ONE approval and ONE write for the whole group. Guests without an alias get an auto-generated one; guests already in the database are skipped. Requires passkey approval."""
     try:
-        import random
-        import string
+        # The framework passes nested objects as dicts
+        registrations = [GuestRegistration.model_validate(guest) for guest in guests]
+        if not registrations:
+            return "No guests to register."
         
-        # Generate a random 6-character code (letters and numbers)
-        characters = string.ascii_uppercase + string.digits
-        parking_code = ''.join(random.choice(characters) for _ in range(6))
+        table = STORAGE.guests
+        allocator = get_alias_allocator(table)
+        timestamp_suffix = datetime.now().strftime("%m%d%H")
         
-        # 🔐 REQUEST APPROVAL BEFORE WRITING
-        if not request_approval_for_write_operation(
-            "Generate Parking Code",
-            f"Generate parking code '{parking_code}' for employee '{alias}'"
-        ):
-            return f"❌ Operation cancelled: Parking code generation for '{alias}' was not approved."
+        def plan_registrations():
+            """Resolve everyone against the name index in one pass and reserve their aliases."""
+            planned, skipped, batch_names = [], [], set()
+            for guest in registrations:
+                full_name = f"{guest.first_name.strip()} {guest.last_name.strip()}"
+                if full_name.lower() in batch_names:
+                    skipped.append(f"{full_name} (listed twice)")
+                elif table.contains('name', full_name):
+                    skipped.append(f"{full_name} (already in the guest database)")
+                else:
+                    batch_names.add(full_name.lower())
+                    # A blank alias means "generate one"
+                    requested = (guest.alias or "").strip() or None
+                    base_alias = requested or f"{guest.first_name.strip()[:1].lower()}{guest.last_name.strip().lower()}{timestamp_suffix}"
+                    # [full name, preferred alias, reserved alias, alias the guest asked for]
+                    planned.append([full_name, base_alias, allocator.reserve(base_alias), requested])
+            return planned, skipped
+        
+        planned, skipped = await run_blocking(plan_registrations)
+        skipped_note = f" Skipped: {', '.join(skipped)}." if skipped else ""
+        if not planned:
+            return f"No new guests to register.{skipped_note}"
         
-        # Get current date
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        try:
+            # 🔐 REQUEST APPROVAL BEFORE WRITING (once for the whole group)
+            roster = "; ".join(f"{full_name} as '{alias}'" for full_name, _, alias, _ in planned)
+            if not await request_approval_for_write_operation(
+                "Register Guests",
+                f"Register {len(planned)} guest(s): {roster}"
+            ):
+                return f"❌ Operation cancelled: Registering {len(planned)} guest(s) was not approved."
+            
+            # Get current date
+            current_date = datetime.now().strftime("%Y-%m-%d")
+            
+            def append_guests(rows: list[dict[str, str]]) -> list[bool]:
+                version_before = table.version
+                written = table.append_many(rows, unique='alias')
+                get_name_index(table).record_added([row for row, ok in zip(rows, written) if ok], version_before)
+                return written
+            
+            # Append every row in one write; if another kiosk took an alias meanwhile,
+            # draw the next one for those guests only
+            pending = planned
+            while pending:
+                rows = [
+                    {'name': full_name, 'alias': alias, 'date_accessed': current_date}
+                    for full_name, _, alias, _ in pending
+                ]
+                written = await run_blocking(append_guests, rows)
+                pending = [entry for entry, ok in zip(pending, written) if not ok]
+                for entry in pending:
+                    allocator.release(entry[2])
+                    entry[2] = await run_blocking(allocator.reserve, entry[1])
+        finally:
+            for _, _, alias, _ in planned:
+                allocator.release(alias)
+        
+        registered = ", ".join(
+            f"{full_name} (alias: {alias})" if requested in (None, alias)
+            else f"{full_name} (alias: {alias}, as '{requested}' was taken)"
+            for full_name, _, alias, requested in planned
+        )
+        return f"✅ Successfully registered {len(planned)} guest(s) (date: {current_date}): {registered}.{skipped_note}"
+    except Exception as e:
+        return f"Error registering guests: {str(e)}"
+
+
+def already_issued_message(parking_code: str) -> str:
+    """Reply for an employee who already got a parking code today."""
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    return f"✅ A parking validation code was already issued today: {parking_code}. Valid for {current_date}. Please enter this code in the ParkRTC app to access parking."
+
+
+async def generate_parking_code(
+    alias: Annotated[str, Field(description="The alias/username of the employee requesting parking.")],
+) -> str:
+    """Generate a 6-digit parking validation code for an employee and save it to parking records. Requires passkey approval. If the employee already got a code today, that code is returned instead."""
+    try:
+        parking_records = STORAGE.parking_records
+        issued_today = get_issued_today(parking_records)
+
+        allocator = get_parking_code_allocator(parking_records)
+
+        def reserve_unless_issued() -> tuple[str | None, str | None]:
+            # One code per employee per day: a repeat request gets the same code back
+            existing_code = issued_today.find(alias)
+            if existing_code:
+                return existing_code, None
+            # Reserve a never-issued 6-character code (letters and numbers)
+            return None, allocator.reserve()
+
+        existing_code, parking_code = await run_blocking(reserve_unless_issued)
+        if existing_code:
+            return already_issued_message(existing_code)
         
-        # Load existing parking records
         try:
-            df = pd.read_csv(PARKING_RECORDS_FILE)
-        except FileNotFoundError:
-            # Create new dataframe if file doesn't exist
-            df = pd.DataFrame(columns=['alias', 'parking_code', 'date_issued'])
-        
-        # Add new parking record
-        new_record = pd.DataFrame({
-            'alias': [alias],
-            'parking_code': [parking_code],
-            'date_issued': [current_date]
-        })
-        df = pd.concat([df, new_record], ignore_index=True)
-        df.to_csv(PARKING_RECORDS_FILE, index=False)
+            # 🔐 REQUEST APPROVAL BEFORE WRITING
+            if not await request_approval_for_write_operation(
+                "Generate Parking Code",
+                f"Generate parking code '{parking_code}' for employee '{alias}'"
+            ):
+                return f"❌ Operation cancelled: Parking code generation for '{alias}' was not approved."
+            
+            # Get current date
+            current_date = datetime.now().strftime("%Y-%m-%d")
+
+            def write_parking_record() -> str:
+                nonlocal parking_code
+                # Append new parking record; if another kiosk issued the same code meanwhile, draw again
+                while not parking_records.append({
+                    'alias': alias,
+                    'parking_code': parking_code,
+                    'date_issued': current_date
+                }, unique='parking_code'):
+                    allocator.release(parking_code)
+                    parking_code = allocator.reserve()
+                return parking_code
+
+            # Another session may have issued one while we waited for the approval
+            issued_code, issued = await run_blocking(issued_today.issue, alias, current_date, write_parking_record)
+            if not issued:
+                return already_issued_message(issued_code)
+        finally:
+            allocator.release(parking_code)
         
         return f"✅ Parking validation code generated: {parking_code}. Valid for {current_date}. Please enter this code in the ParkRTC app to access parking."
     except Exception as e:
@@ -323,18 +491,15 @@ def check_badge_access(
 ) -> str:
     """Check which floors an employee has badge access to (floors 2-7). Note: Floor 1 is publicly accessible to everyone."""
     try:
-        df = pd.read_csv(EMPLOYEES_FILE)
-        result = df[df['alias'].str.lower() == alias.lower()]
+        employee = STORAGE.employees.find('alias', alias)
         
-        if result.empty:
+        if employee is None:
             return f"Employee with alias '{alias}' not found in the database."
         
-        employee = result.iloc[0]
-        badge_access = str(employee.get('badge_access', ''))
+        badge_mask = parse_badge_access(employee.get('badge_access'))
         
-        if badge_access and badge_access.strip():
-            floors = badge_access.split(',')
-            floors_list = ', '.join([f"Floor {f.strip()}" for f in floors if f.strip()])
+        if badge_mask:
+            floors_list = describe_floors(badge_mask)
             return f"Employee {employee['name']} (alias: {alias}) has badge access to: {floors_list}. Note: Floor 1 is publicly accessible to everyone."
         else:
             return f"Employee {employee['name']} (alias: {alias}) currently has NO badge access to restricted floors (2-7). Note: Floor 1 is publicly accessible to everyone."
@@ -342,66 +507,67 @@ def check_badge_access(
         return f"Error checking badge access: {str(e)}"
 
 
-def update_badge_access(
+async def update_badge_access(
     alias: Annotated[str, Field(description="The alias/username of the employee to update badge access for.")],
     floors: Annotated[str, Field(description="Comma-separated list of floor numbers (2-7) to grant access to. Example: '2,3,4' or '5,6,7'. Note: Floor 1 is publicly accessible and doesn't need badge access.")],
 ) -> str:
     """Update or add badge access floors for an employee (floors 2-7). This will ADD to existing access, not replace it. Floor 1 is publicly accessible."""
     try:
-        df = pd.read_csv(EMPLOYEES_FILE)
-        
         # Find the employee
-        employee_idx = df[df['alias'].str.lower() == alias.lower()].index
+        employee = await run_blocking(STORAGE.employees.find, 'alias', alias)
         
-        if employee_idx.empty:
+        if employee is None:
             return f"Employee with alias '{alias}' not found in the database."
         
-        idx = employee_idx[0]
-        employee_name = df.loc[idx, 'name']
+        employee_name = employee['name']
         
-        # Parse requested floors
-        requested_floors = set()
-        for floor in floors.split(','):
-            floor = floor.strip()
-            if floor and floor.isdigit():
-                floor_num = int(floor)
-                if 1 <= floor_num <= 7:
-                    requested_floors.add(str(floor_num))
+        # Parse requested floors into a bitmask
+        requested_mask = floors_to_mask(
+            int(floor) for floor in floors.split(',')
+            if floor.strip().isdigit() and MIN_FLOOR <= int(floor) <= MAX_FLOOR
+        )
         
-        if not requested_floors:
+        if not requested_mask:
             return "Invalid floor numbers. Please specify floors between 2 and 7. Note: Floor 1 is publicly accessible and doesn't require badge access."
         
-        # Get existing access
-        existing_access = str(df.loc[idx, 'badge_access'])
-        existing_floors = set()
-        if existing_access and existing_access.strip() and existing_access != 'nan':
-            existing_floors = set(f.strip() for f in existing_access.split(',') if f.strip())
-        
-        # Combine existing and new floors
-        all_floors = existing_floors.union(requested_floors)
-        
-        # Sort and format
-        sorted_floors = sorted(list(all_floors), key=int)
-        new_access_string = ','.join(sorted_floors)
+        # Combine existing and new floors with bitwise operations
+        existing_mask = parse_badge_access(employee.get('badge_access'))
+        all_mask = existing_mask | requested_mask
+        newly_added = requested_mask & ~existing_mask
         
-        floors_list = ', '.join([f"Floor {f}" for f in sorted_floors])
-        newly_added = requested_floors - existing_floors
+        floors_list = describe_floors(all_mask)
         
         # 🔐 REQUEST APPROVAL BEFORE WRITING (only if there are new floors to add)
         if newly_added:
-            added_list = ', '.join([f"Floor {f}" for f in sorted(newly_added, key=int)])
-            if not request_approval_for_write_operation(
+            added_list = describe_floors(newly_added)
+            if not await request_approval_for_write_operation(
                 "Update Badge Access",
                 f"Grant {employee_name} ({alias}) access to: {added_list}. Total access will be: {floors_list}"
             ):
                 return f"❌ Operation cancelled: Badge access update for '{employee_name}' was not approved."
         
-        # Update the dataframe
-        df.loc[idx, 'badge_access'] = new_access_string
-        df.to_csv(EMPLOYEES_FILE, index=False)
-        
         if newly_added:
-            added_list = ', '.join([f"Floor {f}" for f in sorted(newly_added, key=int)])
+            # Merge against the row as it is at write time, so a grant made by another
+            # kiosk since we read it isn't lost
+            def merge_floors(row):
+                merged_mask = parse_badge_access(row.get('badge_access')) | requested_mask
+                return {'badge_access': format_badge_access(merged_mask)}
+            
+            def write_badge_access():
+                employees = STORAGE.employees
+                floor_index = get_floor_access_index(employees)
+                version_before = employees.version
+                updated = employees.update('alias', alias, merge_floors)
+                
+                # Keep the floor -> employees audit index current without a rebuild, and
+                # tell the name index that nobody was renamed
+                if updated is not None:
+                    floor_index.record_change(updated['alias'], parse_badge_access(updated['badge_access']), version_before)
+                get_name_index(employees).record_write(version_before)
+            
+            # The whole-file rewrite runs in the tool thread pool, off the event loop
+            await run_blocking(write_badge_access)
+            
             return f"✅ Successfully updated badge access for {employee_name} (alias: {alias}). Added: {added_list}. Total access now: {floors_list}"
         else:
             return f"{employee_name} (alias: {alias}) already had access to the requested floors. Current access: {floors_list}"
@@ -410,139 +576,256 @@ def update_badge_access(
         return f"Error updating badge access: {str(e)}"
 
 
-def display_tool_execution_log(thought_process) -> None:
-    """Display detailed tool execution information from the captured thought process."""
-    if not thought_process or not thought_process.get("tool_calls"):
-        print("\n⚠️  No tool calls were made in the last interaction.\n")
+def list_employees_with_floor_access(
+    floor: Annotated[int, Field(description="The floor number (1-7) to list employees with badge access for.")],
+) -> str:
+    """List every employee with badge access to a floor. Use for security audits and fire-drill roll calls."""
+    try:
+        if not MIN_FLOOR <= floor <= MAX_FLOOR:
+            return f"Invalid floor number. The building has floors {MIN_FLOOR}-{MAX_FLOOR}."
+        
+        aliases = get_floor_access_index(STORAGE.employees).aliases_with_access(floor)
+        
+        if not aliases:
+            return f"No employees have badge access to Floor {floor}."
+        
+        # Keep the response readable for large directories
+        shown = ', '.join(aliases[:50])
+        more = f" ... and {len(aliases) - 50} more" if len(aliases) > 50 else ""
+        return f"{len(aliases)} employee(s) have badge access to Floor {floor}: {shown}{more}"
+    except Exception as e:
+        return f"Error listing floor access: {str(e)}"
+
+
+def get_current_date() -> str:
+    """Get today's date, day of the week and the local time."""
+    try:
+        now = datetime.now()
+        return f"Today is {now.strftime('%A, %Y-%m-%d')}. Local time: {now.strftime('%H:%M')}."
+    except Exception as e:
+        return f"Error getting the current date: {str(e)}"
+
+
+def display_tool_execution_log(trace: TurnTrace | None) -> None:
+    """Display detailed tool execution information from a recorded turn."""
+    if trace is None:
+        print("\n⚠️  That interaction is no longer in the history.\n")
+        return
+    if not trace.calls:
+        print(f"\n⚠️  No tool calls were made in turn {trace.number} (\"{trace.user_input}\").\n")
         return
     
     print("\n" + "="*70)
-    print("🔍 AGENT REASONING & TOOL EXECUTION LOG")
+    print(f"🔍 AGENT REASONING & TOOL EXECUTION LOG - turn {trace.number} at {trace.started:%H:%M:%S}")
+    print(f"   💬 You: {trace.user_input}")
     print("="*70)
     
-    for i, tool_call in enumerate(thought_process["tool_calls"], 1):
-        print(f"\n🔧 Step {i}: Called Tool '{tool_call['name']}'")
+    for i, tool_call in enumerate(trace.tool_calls, 1):
+        print(f"\n🔧 Step {i}: Called Tool '{tool_call.name}'")
         
-        if tool_call.get('server'):
-            print(f"   📍 Server: {tool_call['server']}")
+        if tool_call.server:
+            print(f"   📍 Server: {tool_call.server}")
         
         # Display input arguments
-        if tool_call.get('arguments'):
-            try:
-                args = json.loads(tool_call['arguments']) if isinstance(tool_call['arguments'], str) else tool_call['arguments']
+        if tool_call.arguments:
+            args = tool_call.parsed_arguments()
+            if args is not None:
                 print(f"   📥 Input Parameters:")
                 for key, value in args.items():
                     if value:  # Only show non-empty
                         print(f"      • {key}: {value}")
-            except:
-                print(f"   📥 Arguments: {tool_call['arguments']}")
+            else:
+                print(f"   📥 Arguments: {tool_call.arguments}")
         
         # Display output
-        if tool_call.get('output'):
-            output_str = str(tool_call['output'])
+        if tool_call.output:
+            output_str = str(tool_call.output)
             if len(output_str) > 200:
                 print(f"   📤 Output: {output_str[:200]}...")
             else:
                 print(f"   📤 Output: {output_str}")
         
-        # Display status
-        if tool_call.get('status'):
-            print(f"   ✅ Status: {tool_call['status']}")
+        # Display status and timing
+        print(f"   ✅ Status: {tool_call.status}")
+        if tool_call.duration is not None:
+            print(f"   ⏱️  Took: {tool_call.duration * 1000:.1f} ms")
     
+    if trace.duration is not None:
+        print(f"\n⏱️  Whole turn: {trace.duration:.2f} s")
+    if trace.time_to_first_token is not None:
+        print(f"⏱️  First reply token after: {trace.time_to_first_token:.2f} s")
+    if trace.input_tokens is not None:
+        print(f"🔢 Tokens: {trace.input_tokens} in, {trace.output_tokens} out")
     print("\n" + "="*70 + "\n")
 
 
+def display_turn_history(history: TurnHistory) -> None:
+    """List the recent turns kept for the 'show <n>' command."""
+    if not history:
+        print("\n⚠️  No previous interaction to show.\n")
+        return
+    
+    print()
+    for back, trace in enumerate(reversed(history.turns), 1):
+        tools = ", ".join(call.name for call in trace.tool_calls) or "no tools"
+        print(f"   show {back:<3} turn {trace.number} at {trace.started:%H:%M:%S}  \"{trace.user_input[:40]}\"  ({tools})")
+    print()
+
+
+# ============================================================================
+# 🤖 AGENT DEFINITION (shared by the console REPL and server.py)
+# ============================================================================
+
+AGENT_NAME = "UserAccessAgent"
+
+# Each tool is wrapped to record latency, rows scanned, bytes read/written and approval
+# wait time (see metrics.py), and synchronous tools run in the tool thread pool instead
+# of on the event loop (see tool_executor.py); the schemas the model sees are unchanged
+AGENT_TOOLS = [instrument_tool(offload_tool(tool)) for tool in (check_employee_exists, check_guest_exists, check_people_exist, add_employee, add_guest, add_guest_with_auto_alias, register_guests, generate_parking_code, remove_expired_guest, check_badge_access, update_badge_access, list_employees_with_floor_access, get_current_date)]
+
+
+# Static on purpose: no date or time, so the prompt is byte-identical across turns, days
+# and restarts (the model service can cache its prefix, and the agent cache keeps
+# reusing the same agent). The date comes from the get_current_date tool when needed.
+AGENT_INSTRUCTIONS = """You are a friendly access control assistant at the Microsoft Reston office.
+
+Greet users warmly and ask whether they are an employee or a guest. Always confirm before adding anyone to the database; if a lookup lists close matches, ask whether they are one of them first. The tools apply dates and the 30-day guest expiry themselves; call get_current_date only if you need today's date.
+
+EMPLOYEES
+- Ask for their alias and check the employee database. If found, confirm their information. If not, ask for their full name and alias, then add them (requires approval).
+- Then ask: "Will you need parking today?" If yes, generate a parking validation code with their alias and tell them to enter it in the ParkRTC app. If no, let them know they can proceed.
+
+GUESTS (access expires 30 days after their last access)
+- Ask for their first and last name and check the guest database.
+- Found, not expired: confirm their information.
+- Found but expired: tell them their access has expired and that a new alias will be generated automatically, then ask "May I proceed with re-registering you in our system with a new auto-generated alias?" If yes, call remove_expired_guest, then add_guest_with_auto_alias, and tell them their new alias. If no, thank them and explain they need approval to proceed.
+- Not found: ask for their desired alias and add them with add_guest (requires approval).
+- Groups arriving together: check everyone with one check_people_exist call and register all new guests with one register_guests call (one approval; an empty alias is auto-generated). Expired guests still follow the expired-guest steps.
+- Once a guest is confirmed or registered, tell them: "For parking, please use the ParkRTC app to pay. Park in Zone 200 in the Purple Garage."
+- Never offer parking validation to guests; if they ask, apologize and explain it is only available for employees.
+
+BADGE ACCESS (employees only; the office has floors 1-7)
+- Floor 1 is open to everyone. Badge access is only needed for floors 2-7.
+- When an employee asks about floor access: remind them floor 1 is always open, check their current access with check_badge_access, ask which floors (2-7) they need if they didn't say, add them with update_badge_access (it adds to existing access, it does not replace it) and confirm the result.
+- Guests asking about floors: floor 1 is open, floors 2-7 are restricted to employees.
+- Security audits or fire-drill roll calls ("who can access floor 5?"): use list_employees_with_floor_access.
+
+Be conversational and helpful."""
+
+
+async def create_user_access_agent(
+    provider,
+    cache: AgentCache | None = None,
+    timer: StartupTimer | None = None,
+    fast_path: bool | None = None,
+):
+    """Create the access control agent on a provider, or reuse the cached one.
+    
+    Args:
+        provider: The agents provider (see providers.py)
+        cache: Agent definition cache (see agent_cache.py); None to always create a new agent
+        timer: Startup timer to record the agent stage on
+        fast_path: Put the fast-path intent router in front of the agent (see
+            intent_router.py); defaults to FAST_PATH_ROUTER
+    
+    Returns:
+        The agent; call get_new_thread() on it for each conversation
+    """
+    agent, reused = await get_or_create_agent(
+        provider,
+        name=AGENT_NAME,
+        instructions=AGENT_INSTRUCTIONS,
+        tools=AGENT_TOOLS,
+        cache=cache,
+    )
+    if timer is not None:
+        timer.lap("agent reused" if reused else "agent created")
+
+    from intent_router import FastPathAgent, fast_path_enabled
+    if fast_path if fast_path is not None else fast_path_enabled():
+        # Structured employee requests are answered without a model round-trip
+        agent = FastPathAgent(agent, AGENT_TOOLS)
+    return agent
+
+
+def pregenerate_parking_codes() -> None:
+    """Pre-generate parking codes for the morning arrival peak (PARKING_CODE_POOL_SIZE in .env)."""
+    parking_code_pool_size = int(os.getenv("PARKING_CODE_POOL_SIZE", "0"))
+    if parking_code_pool_size > 0:
+        get_parking_code_allocator(STORAGE.parking_records).pregenerate(parking_code_pool_size)
+
+
+async def stream_agent_reply(agent, user_input: str, thread, trace: TurnTrace) -> str:
+    """Run one turn with agent.run_stream, printing tool progress and reply text as they arrive.
+    
+    Args:
+        agent: The agent
+        user_input: The user's message
+        thread: The conversation thread
+        trace: The turn's trace, fed every update (tool calls, results, first token)
+    
+    Returns:
+        The full reply text
+    """
+    # Tool progress lines come first; "Agent: " is printed when the reply text starts
+    at_line_start = True
+    chunks = []
+    
+    async for update in agent.run_stream(user_input, thread=thread):
+        for content in update.contents:
+            call = trace.observe(content)
+            if call is None:
+                continue
+            # The first fragment of a streamed call carries the tool name
+            if content.type == "function_call" and content.name:
+                progress = f"   🔧 {call.name}..."
+            elif content.type == "function_result":
+                took = f" in {call.duration * 1000:.1f} ms" if call.duration is not None else ""
+                progress = f"   {'✅' if call.status == 'completed' else '❌'} {call.name} {call.status}{took}"
+            else:
+                continue
+            if not at_line_start:
+                print()
+            print(progress, flush=True)
+            at_line_start = True
+        
+        if update.text:
+            if at_line_start:
+                print("Agent: ", end="")
+            print(update.text, end="", flush=True)
+            chunks.append(update.text)
+            at_line_start = False
+    
+    print()
+    return "".join(chunks)
+
+
 async def run_user_check_agent() -> None:
     """Run the user access check agent with interactive conversation."""
     print("=== User Access Check Agent ===\n")
     print("💡 Tip: Type 'show' after any response to see tool execution details")
+    print("💡 Tip: Type 'show 3' for the turn three responses ago, 'history' to list recent turns")
+    print("💡 Tip: Type 'stats' to see per-tool latency, I/O and time-to-first-token metrics")
     print("💡 Tip: Type 'exit' or 'quit' to end the session\n")
 
-    # Use DefaultAzureCredential which tries multiple authentication methods:
-    # 1. Environment variables (AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET)
-    # 2. Managed Identity
-    # 3. Azure CLI (az login)
-    # 4. Visual Studio Code
-    # 5. Azure PowerShell
-    async with (
-        DefaultAzureCredential() as credential,
-        AzureAIAgentsProvider(credential=credential) as provider,
-    ):
-        # Get current date and time for context
-        current_datetime = datetime.now()
-        current_date_str = current_datetime.strftime("%Y-%m-%d")
-        current_datetime_str = current_datetime.strftime("%Y-%m-%d %H:%M:%S")
-        
-        agent = await provider.create_agent(
-            name="UserAccessAgent",
-            instructions=f"""You are a friendly access control assistant. 
-
-CURRENT DATE AND TIME: {current_datetime_str}
-CURRENT DATE: {current_date_str}
-
-Your job is to:
-
-1. Greet users warmly
-
-2. Ask if they are an employee or a guest
-
-3. EMPLOYEE WORKFLOW:
-   - Ask for their ALIAS/USERNAME to check the employee database
-   - Check if they exist in the employee database
-   - If they exist, confirm their information
-   - If they don't exist, ask for their full name and alias, then request approval to add them
-   
-4. GUEST WORKFLOW (30-DAY EXPIRATION POLICY):
-   - Ask for their FIRST NAME and LAST NAME to check the guest database
-   - Check if they exist in the guest database
-   - Guest access expires after 30 days from their last access date
-   - If the guest is found and NOT expired (less than 30 days since last access), confirm their information
-   - If the guest is found but EXPIRED (more than 30 days since last access):
-     * Inform them their access has expired and needs to be renewed
-     * Explain that you will generate a new unique alias for them automatically
-     * ASK FOR PERMISSION: "May I proceed with re-registering you in our system with a new auto-generated alias?"
-     * Wait for user confirmation (yes/no)
-     * If YES: Remove the expired guest using remove_expired_guest, then add them with a new auto-generated alias using add_guest_with_auto_alias
-     * If NO: Thank them and let them know they'll need approval to proceed
-     * After successful re-registration, inform them of their new auto-generated alias
-   - If they don't exist at all, ask for their desired alias and request approval to add them using add_guest tool
-
-5. PARKING VALIDATION (EMPLOYEES ONLY):
-   - After confirming an employee is in the database (whether existing or newly added), ask: "Will you need parking today?"
-   - If YES: Generate a parking validation code for them using their alias, and tell them to use it in the ParkRTC app
-   - If NO: Respond with a friendly message and let them know they can proceed
-   - IMPORTANT: NEVER offer parking validation to guests
-   - If a guest asks about parking, apologetically inform them that parking validation is only available for employees
-
-6. GUEST PARKING INFORMATION:
-   - After confirming a guest is in the database (whether newly added or expired/re-registered), inform them: "For parking, please use the ParkRTC app to pay. Park in Zone 200 in the Purple Garage."
-   - Guests must pay for their own parking via the ParkRTC app
-   - Always mention Zone 200 and Purple Garage for guests
-
-7. BADGE ACCESS MANAGEMENT (EMPLOYEES ONLY):
-   - Microsoft Reston office has floors 1-7
-   - FLOOR 1 is publicly accessible to EVERYONE (employees and guests) - NO badge access needed
-   - Badge access is only required for floors 2-7
-   - If an employee mentions needing badge access or asks about floor access:
-     * Remind them that Floor 1 is always accessible to everyone
-     * First check their current badge access using check_badge_access with their alias
-     * If they need additional floor access (floors 2-7), ask which floors they need (if not already specified)
-     * Valid floors for badge access are 2-7
-     * Update their badge access using update_badge_access with their alias and the requested floors
-     * Confirm the updated access with them
-   - The update_badge_access tool ADDS to existing access, it does not replace it
-   - IMPORTANT: Badge access is only for employees, never for guests
-   - If a guest asks about floor access, inform them that Floor 1 is always accessible, but floors 2-7 are restricted to employees only
-
-Be conversational and helpful. Always confirm before adding someone to the database.""",
-            tools=[check_employee_exists, check_guest_exists, add_employee, add_guest, add_guest_with_auto_alias, generate_parking_code, remove_expired_guest, check_badge_access, update_badge_access],
-        )
+    # Replies stream token by token unless STREAM_RESPONSES=0
+    stream_responses = os.getenv("STREAM_RESPONSES", "1").strip() != "0"
 
-        print("Agent is ready! You can start chatting.\n")
+    timer = StartupTimer()
+    pregenerate_parking_codes()
+    timer.lap("parking code pool")
+    
+    # Azure AI agents by default; AGENT_PROVIDER=local runs offline (see providers.py)
+    async with open_provider() as provider:
+        timer.lap("credential + provider")
+        agent = await create_user_access_agent(provider, cache=get_agent_cache(), timer=timer)
+
+        print("Agent is ready! You can start chatting.")
+        print(f"{timer.report()}\n")
         
         # Create a thread to maintain conversation history
         thread = agent.get_new_thread()
-        last_thought_process = None  # Store last thought process for 'show' command
+        history = TurnHistory()  # Recent turns for the 'show' command
         
         while True:
             try:
@@ -555,65 +838,47 @@ Be conversational and helpful. Always confirm before adding someone to the datab
                     break
                 
                 # Check for show command to display previous interaction details
-                if user_input.lower() == 'show':
-                    if last_thought_process:
-                        display_tool_execution_log(last_thought_process)
+                command, _, argument = user_input.lower().partition(' ')
+                if command == 'show' and (not argument or argument.strip().isdigit()):
+                    if history:
+                        display_tool_execution_log(history.last(int(argument or 1)))
                     else:
                         print("\n⚠️  No previous interaction to show.\n")
                     continue
                 
-                # Skip empty inputs
-                if not user_input:
+                if user_input.lower() == 'history':
+                    display_turn_history(history)
                     continue
                 
-                # Initialize thought process for this interaction
-                thought_process = {
-                    "tool_calls": [],
-                    "reasoning": None
-                }
-                
-                # Send message with thread to maintain conversation history
-                print("Agent: ", end="", flush=True)
-                result = await agent.run(user_input, thread=thread)
+                # Check for stats command to display per-tool metrics
+                if user_input.lower() == 'stats':
+                    print(REGISTRY.format_table())
+                    export_metrics()
+                    continue
                 
-                # Extract tool calls from message contents
-                if hasattr(result, 'messages'):
-                    for message in result.messages:
-                        if hasattr(message, 'contents'):
-                            for content in message.contents:
-                                # Capture function calls
-                                if hasattr(content, 'type') and content.type == 'function_call':
-                                    tool_call = {
-                                        "name": getattr(content, 'name', 'Unknown'),
-                                        "server": 'local',
-                                        "arguments": getattr(content, 'arguments', None),
-                                        "call_id": getattr(content, 'call_id', None),
-                                        "status": 'completed',
-                                        "output": None
-                                    }
-                                    thought_process["tool_calls"].append(tool_call)
-                                
-                                # Capture function results and match with calls
-                                elif hasattr(content, 'type') and content.type == 'function_result':
-                                    call_id = getattr(content, 'call_id', None)
-                                    result_output = getattr(content, 'result', None)
-                                    
-                                    # Find matching tool call and update its output
-                                    if call_id and result_output:
-                                        for tool_call in thought_process["tool_calls"]:
-                                            if tool_call.get("call_id") == call_id:
-                                                tool_call["output"] = result_output
-                                                break
+                # Skip empty inputs
+                if not user_input:
+                    continue
                 
-                # Store thought process for 'show' command
-                last_thought_process = thought_process if thought_process["tool_calls"] else None
+                # Send message with thread to maintain conversation history, recording the
+                # tool calls and their outputs for the 'show' command
+                trace = history.start(user_input)
+                if stream_responses:
+                    response_text = await stream_agent_reply(agent, user_input, thread, trace)
+                else:
+                    print("Agent: ", end="", flush=True)
+                    result = await agent.run(user_input, thread=thread)
+                    trace.observe_response(result)
+                    
+                    # AgentResponse object has a text property or can be converted to string
+                    response_text = str(result) if not hasattr(result, 'text') else result.text
+                    print(response_text)
                 
-                # AgentResponse object has a text property or can be converted to string
-                response_text = str(result) if not hasattr(result, 'text') else result.text
-                print(response_text)
+                trace.finish(response_text)
+                REGISTRY.record_turn(trace.duration, trace.time_to_first_token, trace.input_tokens, trace.output_tokens)
                 
                 # Show hint about the 'show' command if tools were used
-                if thought_process["tool_calls"]:
+                if trace.calls:
                     print("   💬 (Type 'show' to see tool execution details)\n")
                 else:
                     print()
@@ -626,7 +891,20 @@ Be conversational and helpful. Always confirm before adding someone to the datab
 
 async def main() -> None:
     """Main entry point for the user access check agent."""
-    await run_user_check_agent()
+    global STORAGE
+
+    # Load environment variables from .env file. Done here rather than at import time,
+    # so importing this module (tests, server.py, benchmarks) has no side effects.
+    from dotenv import load_dotenv
+    load_dotenv()
+    # STORAGE_BACKEND may have come from .env
+    STORAGE = get_backend(DATA_DIR)
+
+    try:
+        await run_user_check_agent()
+    finally:
+        # Leave the final metrics for Prometheus' textfile collector (METRICS_PROMETHEUS_FILE)
+        export_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+"""
+Agent Definition Cache
+
+Creating the agent registers its instructions and every tool schema with the service,
+a remote round-trip on each launch that also leaves one more agent behind. Instead,
+the agent id is cached under a hash of everything that defines it (name, model,
+endpoint, instructions, tool schemas). On the next start, if nothing changed, the
+existing agent is looked up with provider.get_agent(); set AGENT_CACHE_VERIFY=0 to
+skip even that lookup and rebuild it from the cached definition with no round-trip.
+
+The cache is a small JSON file, AGENT_CACHE_FILE (default: .agent_cache.json at the
+repository root); set AGENT_CACHE_FILE= (empty) to always create a new agent.
+"""
+
+DEFAULT_AGENT_CACHE_FILE = Path(__file__).parent.parent / ".agent_cache.json"
+
+
+def tool_schemas(tools) -> list[dict]:
+    """Return the JSON schema the service sees for each tool."""
+    # Imported on first use: the framework is only needed once an agent is being set up
+    from agent_framework import AIFunction, ai_function
+
+    return [
+        (tool if isinstance(tool, AIFunction) else ai_function(tool)).to_json_schema_spec()
+        for tool in tools
+    ]
+
+
+def agent_definition_key(name: str, instructions: str, tools, model: str | None = None, endpoint: str | None = None) -> str:
+    """Hash an agent definition; any change to instructions or tool schemas changes the key."""
+    definition = {
+        "name": name,
+        "model": model or os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME"),
+        "endpoint": endpoint or os.getenv("AZURE_AI_PROJECT_ENDPOINT"),
+        "instructions": instructions,
+        "tools": tool_schemas(tools),
+    }
+    encoded = json.dumps(definition, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class AgentCache:
+    """Maps agent definition keys to the agents created for them.
+
+    Only the newest definition per agent name is kept, so the file stays tiny. Agents
+    replaced by a newer definition are not deleted from the service.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, entries: dict) -> None:
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, key: str) -> dict | None:
+        """Return the cached entry for a definition key, if any."""
+        with self._lock:
+            return self._read().get(key)
+
+    def store(self, key: str, entry: dict) -> None:
+        """Remember the agent created for a definition, replacing older ones with the same name."""
+        with self._lock:
+            entries = {
+                other_key: other for other_key, other in self._read().items()
+                if other.get("name") != entry.get("name")
+            }
+            entries[key] = entry
+            self._write(entries)
+
+    def forget(self, key: str) -> None:
+        """Drop an entry (e.g. the agent was deleted on the service)."""
+        with self._lock:
+            entries = self._read()
+            if entries.pop(key, None) is not None:
+                self._write(entries)
+
+
+def get_agent_cache() -> AgentCache | None:
+    """Return the agent cache configured by AGENT_CACHE_FILE, or None if it is disabled."""
+    path = os.getenv("AGENT_CACHE_FILE", str(DEFAULT_AGENT_CACHE_FILE))
+    return AgentCache(Path(path)) if path else None
+
+
+async def get_or_create_agent(provider, name: str, instructions: str, tools: list, cache: AgentCache | None = None):
+    """Reuse the agent cached for this exact definition, or create (and cache) a new one.
+
+    Args:
+        provider: The agents provider
+        name: Agent name
+        instructions: Agent instructions
+        tools: Tool functions
+        cache: Where agent ids are remembered (None to always create). Ignored for
+            providers whose agents don't outlive the process (persistent_agents = False).
+
+    Returns:
+        (agent, reused) - reused is True if no new agent was created
+    """
+    if cache is None or not getattr(provider, "persistent_agents", True):
+        return await provider.create_agent(name=name, instructions=instructions, tools=tools), False
+
+    key = agent_definition_key(name, instructions, tools)
+    entry = cache.lookup(key)
+    if entry is not None:
+        try:
+            if os.getenv("AGENT_CACHE_VERIFY", "1") == "0" and hasattr(provider, "as_agent"):
+                # Trust the cache: rebuild the agent locally, no service call at all
+                from azure.ai.agents.models import Agent
+                definition = Agent({
+                    "id": entry["agent_id"],
+                    "object": "assistant",
+                    "created_at": 0,
+                    "name": name,
+                    "model": entry.get("model"),
+                    "instructions": instructions,
+                    "tools": tool_schemas(tools),
+                })
+                return provider.as_agent(definition, tools=tools), True
+            return await provider.get_agent(entry["agent_id"], tools=tools), True
+        except Exception:
+            # Deleted on the service, or a provider that can't look agents up: start over
+            cache.forget(key)
+
+    agent = await provider.create_agent(name=name, instructions=instructions, tools=tools)
+    cache.store(key, {
+        "agent_id": agent.id,
+        "name": name,
+        "model": os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME"),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    return agent, False
+
+
+class StartupTimer:
+    """Collects how long each startup stage took, for the startup timing report."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: list[tuple[str, float]] = []
+        self._stage_started = self.started
+
+    def lap(self, name: str) -> None:
+        """Close the current stage (everything since the previous lap) under `name`."""
+        now = time.perf_counter()
+        self.stages.append((name, now - self._stage_started))
+        self._stage_started = now
+
+    def report(self) -> str:
+        """Render the stages as a one-line summary."""
+        total = time.perf_counter() - self.started
+        stages = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.stages)
+        return f"⏱️  Startup: {total * 1000:.0f} ms ({stages})"
@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import threading
+import weakref
+
+"""
+Alias Allocator
+
+Generates unique aliases (e.g. for re-registered guests) without rescanning the alias
+column. Each base alias keeps a counter of the next suffix to try, so repeated
+collisions on a common name cost O(1) instead of O(k·N), and aliases handed out but
+not yet written are reserved so two concurrent registrations never get the same one.
+"""
+
+# Upper bound on remembered base aliases (bases include a timestamp, so they keep coming)
+MAX_TRACKED_BASES = 10_000
+
+
+class AliasAllocator:
+    """Hands out unique values for one column of a storage table.
+
+    Uniqueness is checked against the table's hash index (table.contains) plus the set
+    of in-flight reservations. The final guarantee across processes comes from writing
+    the row with table.append(row, unique="alias"), which re-checks under the file or
+    database lock.
+    """
+
+    def __init__(self, table, column: str = "alias"):
+        self.table = table
+        self.column = column
+        self._lock = threading.Lock()
+        self._next_suffix: dict[str, int] = {}
+        self._reserved: set[str] = set()
+
+    def reserve(self, base: str) -> str:
+        """Reserve and return a unique alias: `base` itself, else `base1`, `base2`, ...
+
+        Args:
+            base: The preferred alias
+
+        Returns:
+            An alias that is neither in the table nor reserved by another caller.
+            Call release() once the row is written (or the registration is cancelled).
+        """
+        key = base.lower()
+        with self._lock:
+            counter = self._next_suffix.pop(key, 0)
+            while True:
+                candidate = base if counter == 0 else f"{base}{counter}"
+                counter += 1
+                if candidate.lower() not in self._reserved and not self.table.contains(self.column, candidate):
+                    break
+
+            # Re-inserted at the end, so the dict doubles as an LRU of recent bases
+            self._next_suffix[key] = counter
+            if len(self._next_suffix) > MAX_TRACKED_BASES:
+                del self._next_suffix[next(iter(self._next_suffix))]
+
+            self._reserved.add(candidate.lower())
+            return candidate
+
+    def release(self, alias: str) -> None:
+        """Drop a reservation (after the row is written, or if it never will be)."""
+        with self._lock:
+            self._reserved.discard(alias.lower())
+
+
+_allocators: "weakref.WeakKeyDictionary[object, AliasAllocator]" = weakref.WeakKeyDictionary()
+_allocators_lock = threading.Lock()
+
+
+def get_alias_allocator(table) -> AliasAllocator:
+    """Return the shared alias allocator for a storage table, creating it on first use."""
+    with _allocators_lock:
+        allocator = _allocators.get(table)
+        if allocator is None:
+            allocator = AliasAllocator(table)
+            _allocators[table] = allocator
+        return allocator
@@ -0,0 +1,273 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import os
+import stat
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from metrics import record_approval_wait
+
+"""
+Approval Subsystem
+
+Human-in-the-loop approval for write operations, without blocking the event loop.
+Tools `await request_approval(...)`; the decision comes from a pluggable Approver:
+
+    console - prompt for the passkey on this terminal (default)
+    queue   - park the request until an admin resolves it (e.g. from another session)
+    auto    - approve everything (tests and demos only)
+
+Select one with APPROVAL_MODE in .env, or call set_approver(). Set
+APPROVAL_TIMEOUT_SECONDS to auto-deny requests nobody answers in time. The console
+approver reads the passkey through the event loop (add_reader on stdin), so a timed-out
+prompt stops reading and the next line typed goes to the REPL, not to a stale prompt.
+Where the loop can't watch stdin (Windows, or input redirected from a file), the
+console prompt reads with input() and has no timeout.
+"""
+
+APPROVAL_PASSKEY = "1234"  # Secret passkey for write operations
+
+
+@dataclass
+class ApprovalRequest:
+    """A write operation waiting for a decision."""
+
+    operation_name: str
+    details: str
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    created_at: float = field(default_factory=time.monotonic)
+    decided_at: float | None = None
+    approved: bool | None = None
+
+    @property
+    def wait_seconds(self) -> float:
+        """How long the request waited (so far, if still pending)."""
+        return (self.decided_at or time.monotonic()) - self.created_at
+
+
+class Approver(ABC):
+    """Decides whether a write operation may proceed."""
+
+    # Whether decide() can be abandoned by a timeout without side effects
+    cancellable = True
+
+    @abstractmethod
+    async def decide(self, request: ApprovalRequest) -> bool:
+        """Return True to approve the request, False to deny it."""
+
+
+class ConsoleApprover(Approver):
+    """Prompts for the passkey on the console.
+
+    The passkey is read when stdin becomes readable (loop.add_reader), so other
+    sessions and background work keep running while the admin types, and a cancelled
+    prompt (timeout) stops reading instead of leaving a thread blocked on stdin that
+    would swallow the next line. Without add_reader support the prompt falls back to
+    input() in a worker thread and is not cancellable. Prompts are shown one at a time.
+    """
+
+    def __init__(self, passkey: str = APPROVAL_PASSKEY):
+        self.passkey = passkey
+        self._console_lock: asyncio.Lock | None = None
+        self.cancellable = _stdin_selectable()
+
+    async def _read_line(self, prompt: str) -> str:
+        """Read one line from stdin without blocking the loop; raises EOFError at end of input."""
+        if not self.cancellable:
+            return await asyncio.to_thread(input, prompt)
+
+        loop = asyncio.get_running_loop()
+        line = loop.create_future()
+
+        def on_readable():
+            if not line.done():
+                text = sys.stdin.readline()
+                if text:
+                    line.set_result(text.rstrip("\n"))
+                else:
+                    line.set_exception(EOFError())
+
+        fd = sys.stdin.fileno()
+        try:
+            loop.add_reader(fd, on_readable)
+        except (OSError, ValueError, NotImplementedError):
+            # The selector refused this stdin (e.g. a file or /dev/null): read it the plain way
+            self.cancellable = False
+            return await asyncio.to_thread(input, prompt)
+
+        print(prompt, end="", flush=True)
+        try:
+            return await line
+        finally:
+            loop.remove_reader(fd)
+
+    async def decide(self, request: ApprovalRequest) -> bool:
+        if self._console_lock is None:
+            self._console_lock = asyncio.Lock()
+
+        async with self._console_lock:
+            print("\n" + "="*70)
+            print("🔐 WRITE OPERATION APPROVAL REQUIRED")
+            print("="*70)
+            print(f"Operation: {request.operation_name}")
+            print(f"Details: {request.details}")
+            print(f"\nThis operation will modify data files.")
+            print("\nTo approve, enter the passkey (or press Enter to deny):")
+            print("="*70)
+
+            try:
+                user_input = (await self._read_line("Enter passkey: ")).strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\n❌ DENIED - Operation cancelled by user\n")
+                return False
+
+            if user_input == self.passkey:
+                print("✅ APPROVED - Operation will proceed\n")
+                return True
+            print("❌ DENIED - Invalid passkey or operation cancelled\n")
+            return False
+
+
+class QueueApprover(Approver):
+    """Parks requests until an admin resolves them with the passkey.
+
+    An admin console, web page or chat bot lists the waiting requests with pending()
+    (the server's GET /approvals) and answers them with resolve(). Requests are only
+    held while pending, so nothing accumulates in a long-running process. Those calls
+    come from other threads (the server's request handlers), so the pending requests
+    are guarded by a lock.
+    """
+
+    def __init__(self, passkey: str = APPROVAL_PASSKEY):
+        self.passkey = passkey
+        self._pending: dict[str, tuple[ApprovalRequest, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+
+    async def decide(self, request: ApprovalRequest) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._pending[request.request_id] = (request, future)
+        try:
+            return await future
+        finally:
+            with self._lock:
+                self._pending.pop(request.request_id, None)
+
+    def pending(self) -> list[ApprovalRequest]:
+        """Requests still waiting for a decision, oldest first."""
+        with self._lock:
+            return [request for request, _ in self._pending.values()]
+
+    def resolve(self, request_id: str, passkey: str) -> bool:
+        """Answer a pending request; it is approved only if the passkey is correct.
+
+        Safe to call from any thread. Returns False if no such request is pending.
+        """
+        with self._lock:
+            entry = self._pending.get(request_id)
+        if entry is None:
+            return False
+        _, future = entry
+        approved = passkey == self.passkey
+        future.get_loop().call_soon_threadsafe(
+            lambda: future.done() or future.set_result(approved)
+        )
+        return True
+
+    def deny(self, request_id: str) -> bool:
+        """Deny a pending request. Returns False if no such request is pending."""
+        return self.resolve(request_id, passkey="")
+
+
+class AutoApprover(Approver):
+    """Decides without a human - for tests and demos, never for production data.
+
+    Args:
+        policy: True to approve everything, False to deny everything, or a function
+            that receives the request and returns the decision
+    """
+
+    def __init__(self, policy: bool | Callable[[ApprovalRequest], bool] = True):
+        self.policy = policy
+
+    async def decide(self, request: ApprovalRequest) -> bool:
+        return self.policy(request) if callable(self.policy) else bool(self.policy)
+
+
+def _stdin_selectable() -> bool:
+    """Whether the event loop can watch stdin for input: a terminal, pipe or socket, not on Windows.
+
+    Regular files and most devices (e.g. /dev/null) can't be polled; selectors refuse them.
+    """
+    if sys.platform == "win32" or sys.stdin is None:
+        return False
+    try:
+        fd = sys.stdin.fileno()
+        mode = os.fstat(fd).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return os.isatty(fd) or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+
+
+_approver: Approver | None = None
+
+
+def get_approver() -> Approver:
+    """Return the active approver, creating it from APPROVAL_MODE on first use."""
+    global _approver
+    if _approver is None:
+        mode = os.getenv("APPROVAL_MODE", "console").strip().lower()
+        if mode == "console":
+            _approver = ConsoleApprover()
+        elif mode == "queue":
+            _approver = QueueApprover()
+        elif mode == "auto":
+            _approver = AutoApprover()
+        else:
+            raise ValueError(f"Unknown APPROVAL_MODE '{mode}' (expected 'console', 'queue' or 'auto')")
+    return _approver
+
+
+def set_approver(approver: Approver | None) -> None:
+    """Replace the active approver (None to go back to APPROVAL_MODE)."""
+    global _approver
+    _approver = approver
+
+
+async def request_approval(operation_name: str, details: str, timeout: float | None = None) -> ApprovalRequest:
+    """Ask the active approver to decide on a write operation, without blocking the loop.
+
+    Args:
+        operation_name: Name of the operation (e.g., "Add Employee")
+        details: Description of what will be written
+        timeout: Seconds to wait before denying automatically. Defaults to
+            APPROVAL_TIMEOUT_SECONDS, or no timeout if that isn't set. Ignored, with a
+            warning, for an approver that can't be cancelled.
+
+    Returns:
+        The decided request (check `.approved`)
+    """
+    if timeout is None and os.getenv("APPROVAL_TIMEOUT_SECONDS"):
+        timeout = float(os.environ["APPROVAL_TIMEOUT_SECONDS"])
+
+    approver = get_approver()
+    if timeout is not None and not approver.cancellable:
+        # Abandoning the prompt would leave it reading the next line typed
+        print(f"\n⚠️  APPROVAL_TIMEOUT_SECONDS is not supported by {type(approver).__name__} here; waiting for an answer\n")
+        timeout = None
+
+    request = ApprovalRequest(operation_name, details)
+    try:
+        request.approved = await asyncio.wait_for(approver.decide(request), timeout)
+    except asyncio.TimeoutError:
+        print(f"\n❌ DENIED - No decision on '{operation_name}' within {timeout:g}s\n")
+        request.approved = False
+    request.decided_at = time.monotonic()
+    record_approval_wait(request.wait_seconds)
+    return request
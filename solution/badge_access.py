@@ -0,0 +1,224 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import os
+import threading
+import weakref
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+"""
+Badge Access Bitmasks
+
+Badge access is handled as an integer bitmask - bit (floor - 1) is set when the
+employee can badge into that floor, so floors 1-7 fit in one byte. Merging grants,
+diffing old vs. new access and "who can access floor N" are plain bitwise operations
+instead of split/set/sorted string handling on every call.
+
+The stored format stays the comma-separated floor list ("2,3,4,5") by default; set
+BADGE_ACCESS_FORMAT=hex to store the mask itself (e.g. "0x1e"). Both forms are read.
+"""
+
+MIN_FLOOR = 1
+MAX_FLOOR = 7
+ALL_FLOORS_MASK = (1 << MAX_FLOOR) - 1
+
+
+def floor_bit(floor: int) -> int:
+    """Return the bit for one floor."""
+    if not MIN_FLOOR <= floor <= MAX_FLOOR:
+        raise ValueError(f"Floor {floor} is outside {MIN_FLOOR}-{MAX_FLOOR}")
+    return 1 << (floor - 1)
+
+
+def floors_to_mask(floors: Iterable[int]) -> int:
+    """Combine floor numbers into a bitmask."""
+    mask = 0
+    for floor in floors:
+        mask |= floor_bit(floor)
+    return mask
+
+
+def mask_to_floors(mask: int) -> list[int]:
+    """Expand a bitmask into its floor numbers, lowest first."""
+    return [floor for floor in range(MIN_FLOOR, MAX_FLOOR + 1) if mask & (1 << (floor - 1))]
+
+
+def parse_badge_access(value) -> int:
+    """Parse a stored badge_access value into a bitmask.
+
+    Accepts the floor list format ("2,3,4"), the hex mask format ("0x0e"), and empty
+    or missing values ("", None, NaN -> no access). Floors outside 1-7 are ignored.
+    """
+    if value is None:
+        return 0
+    text = str(value).strip()
+    if not text or text.lower() == 'nan':
+        return 0
+    if text.lower().startswith('0x'):
+        return int(text, 16) & ALL_FLOORS_MASK
+
+    mask = 0
+    for part in text.split(','):
+        part = part.strip()
+        if part.isdigit() and MIN_FLOOR <= int(part) <= MAX_FLOOR:
+            mask |= 1 << (int(part) - 1)
+    return mask
+
+
+def format_badge_access(mask: int, style: str | None = None) -> str:
+    """Serialize a bitmask for storage.
+
+    Args:
+        mask: The badge access bitmask
+        style: "floors" for "2,3,4" (default) or "hex" for "0x0e". Defaults to the
+            BADGE_ACCESS_FORMAT environment variable.
+    """
+    style = style or os.getenv("BADGE_ACCESS_FORMAT", "floors")
+    if style == "hex":
+        return f"0x{mask:02x}" if mask else ""
+    return ','.join(str(floor) for floor in mask_to_floors(mask))
+
+
+def describe_floors(mask: int) -> str:
+    """Render a bitmask for messages, e.g. "Floor 2, Floor 5"."""
+    return ', '.join(f"Floor {floor}" for floor in mask_to_floors(mask))
+
+
+# ----------------------------------------------------------------------------
+# Vectorized queries over the whole employee table
+# ----------------------------------------------------------------------------
+
+_mask_cache: "weakref.WeakKeyDictionary[object, tuple]" = weakref.WeakKeyDictionary()
+_mask_cache_lock = threading.Lock()
+
+
+def badge_mask_column(employees) -> tuple[list[str], "np.ndarray"]:
+    """Return (aliases, masks) for every employee, masks as a uint8 array.
+
+    The column is derived once per table version and cached, so repeated queries only
+    pay for the bitwise operation.
+    """
+    # numpy is only needed for the floor-wide queries, not for single-employee lookups
+    import numpy as np
+
+    version = employees.version
+    with _mask_cache_lock:
+        cached = _mask_cache.get(employees)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+    rows = employees.rows()
+    aliases = [row['alias'] for row in rows]
+    masks = np.fromiter((parse_badge_access(row.get('badge_access')) for row in rows), dtype=np.uint8, count=len(rows))
+
+    with _mask_cache_lock:
+        _mask_cache[employees] = (version, aliases, masks)
+    return aliases, masks
+
+
+def employees_with_floor_access(employees, floor: int) -> list[str]:
+    """Return the aliases of every employee with badge access to `floor`.
+
+    Floor 1 is public, but only employees explicitly granted it are returned.
+    """
+    import numpy as np
+
+    aliases, masks = badge_mask_column(employees)
+    hits = np.flatnonzero(masks & floor_bit(floor))
+    return [aliases[i] for i in hits]
+
+
+# ----------------------------------------------------------------------------
+# Floor -> employees reverse index
+# ----------------------------------------------------------------------------
+
+class FloorAccessIndex:
+    """Inverted index from floor number to the aliases with badge access to it.
+
+    Built once from the mask column (one vectorized AND per floor), then kept current
+    incrementally: update_badge_access reports each grant with record_change(). If the
+    table changed in any other way (another kiosk, a batch commit that included other
+    writes), the index notices the version jump and rebuilds on the next query.
+    """
+
+    def __init__(self, employees):
+        self.employees = employees
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        # Dicts used as ordered sets (O(1) add/remove, stable listing order)
+        self._floors: dict[int, dict[str, None]] = {}
+        self._masks: dict[str, int] = {}
+
+    def _rebuild(self, version: int) -> None:
+        import numpy as np
+
+        aliases, masks = badge_mask_column(self.employees)
+        self._floors = {
+            floor: dict.fromkeys(aliases[i] for i in np.flatnonzero(masks & floor_bit(floor)))
+            for floor in range(MIN_FLOOR, MAX_FLOOR + 1)
+        }
+        self._masks = {alias: int(mask) for alias, mask in zip(aliases, masks) if mask}
+        self._version = version
+
+    def _ensure_current(self) -> None:
+        """Rebuild if the table changed since the index last saw it. Caller holds _lock."""
+        version = self.employees.version
+        if version != self._version:
+            self._rebuild(version)
+
+    def record_change(self, alias: str, new_mask: int, version_before: int) -> None:
+        """Apply one employee's new badge mask after it was written.
+
+        Args:
+            alias: The employee whose access changed
+            new_mask: Their badge mask after the write
+            version_before: employees.version read just before the write. The change is
+                applied in place only if the index was current then and the write was
+                the only change since; otherwise the index rebuilds on next use.
+        """
+        with self._lock:
+            version_after = self.employees.version
+            if self._version != version_before or version_after != version_before + 1:
+                self._version = None
+                return
+
+            old_mask = self._masks.get(alias, 0)
+            for floor in mask_to_floors(old_mask & ~new_mask):
+                self._floors[floor].pop(alias, None)
+            for floor in mask_to_floors(new_mask & ~old_mask):
+                self._floors[floor][alias] = None
+            if new_mask:
+                self._masks[alias] = new_mask
+            else:
+                self._masks.pop(alias, None)
+            self._version = version_after
+
+    def aliases_with_access(self, floor: int) -> list[str]:
+        """Return the aliases of every employee with badge access to `floor`."""
+        floor_bit(floor)  # validates the floor number
+        with self._lock:
+            self._ensure_current()
+            return list(self._floors[floor])
+
+    def count(self, floor: int) -> int:
+        """Return how many employees have badge access to `floor`."""
+        floor_bit(floor)
+        with self._lock:
+            self._ensure_current()
+            return len(self._floors[floor])
+
+
+_floor_indexes: "weakref.WeakKeyDictionary[object, FloorAccessIndex]" = weakref.WeakKeyDictionary()
+
+
+def get_floor_access_index(employees) -> FloorAccessIndex:
+    """Return the shared floor -> employees index for an employee table."""
+    with _mask_cache_lock:
+        index = _floor_indexes.get(employees)
+        if index is None:
+            index = FloorAccessIndex(employees)
+            _floor_indexes[employees] = index
+        return index
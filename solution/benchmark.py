@@ -0,0 +1,250 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from generate_data import generate_directory
+
+"""
+End-to-End Latency Benchmark
+
+Measures the tool layer without Azure: the real agent tools run under the offline
+LocalAgentsProvider, which replays scripted conversations (the README's four test
+scenarios, then synthetic kiosk traffic). Writes are auto-approved. For each directory
+size it reports p50/p95/p99 per tool and per turn, the cost of the first load, and the
+mean tokens per turn (as estimated by the local provider from the prompt size).
+With --fast-path, the intent router answers what it can without the (scripted) model.
+The same conversations are then replayed on a copy of the directory with the router
+off, and the difference in total turn time is reported as the time it saved - set
+--model-latency to what a real model round-trip costs to see a realistic saving.
+
+    python solution/benchmark.py                          # 1k, 100k and 1M rows, CSV
+    python solution/benchmark.py --rows 1000 --sessions 500 --concurrency 16
+    python solution/benchmark.py --backend sqlite --json results.json
+    python solution/benchmark.py --data-dir data_1m       # a directory from generate_data.py
+    python solution/benchmark.py --partition-parking      # parking records split by month
+    python solution/benchmark.py --rows 1000 --fast-path --model-latency 0.8
+
+Directories are generated (or copied) into a temporary folder, so the originals are
+never modified. Generated directories hold `rows` employees, rows/5 guests and `rows`
+parking records, plus the shipped rows from data/ so the README scenarios still apply.
+"""
+
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+
+
+def percentiles(samples: list[float]) -> dict:
+    """n, p50, p95 and p99 (in milliseconds) of a list of durations in seconds."""
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(samples), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+class Recorder:
+    """Collects turn and tool durations from agent responses."""
+
+    def __init__(self):
+        self.turns: dict[str, list[float]] = defaultdict(list)
+        self.tools: dict[str, list[float]] = defaultdict(list)
+        self.input_tokens: list[int] = []
+        self.output_tokens: list[int] = []
+        self.routed = 0
+
+    def record_turn(self, scenario: str, seconds: float, result) -> None:
+        self.turns["all turns"].append(seconds)
+        self.turns[scenario].append(seconds)
+        if (result.additional_properties or {}).get("fast_path"):
+            self.routed += 1
+            self.turns["fast path: routed"].append(seconds)
+        else:
+            self.turns["fast path: to model"].append(seconds)
+        if result.usage_details:
+            self.input_tokens.append(result.usage_details.get("input_token_count") or 0)
+            self.output_tokens.append(result.usage_details.get("output_token_count") or 0)
+
+        names = {}
+        for message in result.messages:
+            for content in message.contents:
+                if content.type == "function_call":
+                    names[content.call_id] = content.name
+                elif content.type == "function_result":
+                    duration = (content.additional_properties or {}).get("duration_seconds")
+                    if duration is not None:
+                        self.tools[names.get(content.call_id, "unknown")].append(duration)
+
+    def summary(self) -> dict:
+        routed, to_model = self.turns.pop("fast path: routed", []), self.turns.pop("fast path: to model", [])
+        if routed:
+            # Listed after the scenarios; without the router every turn goes to the model
+            self.turns.update({"fast path: routed": routed, "fast path: to model": to_model})
+        return {
+            "tools": {name: percentiles(samples) for name, samples in sorted(self.tools.items())},
+            "turns": {name: percentiles(samples) for name, samples in self.turns.items()},
+            "tokens_per_turn": {
+                "input": float(np.mean(self.input_tokens)) if self.input_tokens else None,
+                "output": float(np.mean(self.output_tokens)) if self.output_tokens else None,
+            },
+            "fast_path": {
+                "hit_rate": self.routed / len(self.turns["all turns"]) if self.turns["all turns"] else 0.0,
+            },
+            "turn_seconds": float(np.sum(self.turns["all turns"])),
+        }
+
+
+async def replay(agent, scenario, recorder: Recorder) -> None:
+    """Replay one scripted conversation on a new thread, timing every turn."""
+    thread = agent.get_new_thread(script=scenario.script())
+    for message in scenario.messages():
+        started = time.perf_counter()
+        result = await agent.run(message, thread=thread)
+        recorder.record_turn(scenario.name, time.perf_counter() - started, result)
+
+
+async def benchmark_directory(data_dir: Path, args: argparse.Namespace, fast_path: bool) -> dict:
+    """Run the README scenarios and synthetic traffic against one directory."""
+    import agent as kiosk
+    from agent import create_user_access_agent
+    from providers import open_provider
+    from scenarios import readme_scenarios, synthetic_scenarios
+    from storage import CsvBackend, SqliteBackend, import_csv_to_sqlite
+
+    if args.backend == "sqlite":
+        db_path = data_dir / "access_control.db"
+        import_csv_to_sqlite(data_dir, db_path)
+        storage = SqliteBackend(db_path)
+    else:
+        storage = CsvBackend(data_dir)
+    # The tools read the module-level backend
+    kiosk.STORAGE = storage
+
+    # First load (parse + index build) is reported separately from steady-state turns
+    load = {}
+    for dataset in ("employees", "guests", "parking_records"):
+        started = time.perf_counter()
+        len(storage.table(dataset))
+        load[dataset] = (time.perf_counter() - started) * 1000
+
+    recorder = Recorder()
+    async with open_provider("local", model_latency=args.model_latency) as provider:
+        agent = await create_user_access_agent(provider, fast_path=fast_path)
+
+        for _ in range(args.repeat):
+            for scenario in readme_scenarios():
+                await replay(agent, scenario, recorder)
+
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def run_session(scenario):
+            async with slots:
+                await replay(agent, scenario, recorder)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_session(s) for s in synthetic_scenarios(storage, args.sessions, args.seed)))
+        synthetic_seconds = time.perf_counter() - started
+
+    return {
+        "load_ms": load,
+        "synthetic_sessions_per_second": args.sessions / synthetic_seconds if synthetic_seconds else None,
+        **recorder.summary(),
+    }
+
+
+def format_results(label: str, results: dict) -> str:
+    """Render one directory's results as a table."""
+    lines = [
+        f"\n=== {label} ===",
+        "First load: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in results["load_ms"].items()),
+    ]
+    if results["synthetic_sessions_per_second"]:
+        lines.append(f"Synthetic throughput: {results['synthetic_sessions_per_second']:.1f} sessions/s")
+    tokens = results["tokens_per_turn"]
+    if tokens["input"] is not None:
+        lines.append(f"Tokens per turn (estimated): {tokens['input']:.0f} in, {tokens['output']:.0f} out")
+    fast_path = results["fast_path"]
+    if "saved_seconds" in fast_path:
+        lines.append(
+            f"Fast path: {fast_path['hit_rate']:.0%} of turns routed; same conversations took "
+            f"{fast_path['router_off_seconds']:.1f} s without the router, "
+            f"{results['turn_seconds']:.1f} s with it ({fast_path['saved_seconds']:+.1f} s saved)"
+        )
+
+    for section in ("tools", "turns"):
+        lines.append(f"\n{section.upper():<30} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, stats in results[section].items():
+            lines.append(f"{name:<30} {stats['n']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    return "\n".join(lines)
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    from approvals import AutoApprover, set_approver
+
+    set_approver(AutoApprover())
+    all_results = {}
+    for rows in ([None] if args.data_dir else args.rows):
+        with tempfile.TemporaryDirectory(prefix="access-bench-") as tmp:
+            data_dir = Path(tmp) / "data"
+            data_dir.mkdir()
+            started = time.perf_counter()
+            if args.data_dir:
+                for dataset in ("employees", "guests", "parking_records"):
+                    shutil.copy(args.data_dir / f"{dataset}.csv", data_dir)
+                label = str(args.data_dir)
+                print(f"Copied {label} in {time.perf_counter() - started:.1f} s")
+            else:
+                generate_directory(
+                    data_dir, employees=rows, guests=rows // 5, parking_records=rows,
+                    include_shipped=True, seed=args.seed,
+                )
+                label = f"{rows:,} rows"
+                print(f"Generated {label} directory in {time.perf_counter() - started:.1f} s")
+            if args.partition_parking:
+                from parking_history import partition_parking_records
+
+                partition_parking_records(data_dir)
+                label += ", partitioned parking records"
+
+            if args.fast_path:
+                # The same conversations on an untouched copy, without the router
+                baseline_dir = Path(tmp) / "router-off"
+                shutil.copytree(data_dir, baseline_dir)
+                baseline = await benchmark_directory(baseline_dir, args, fast_path=False)
+            results = await benchmark_directory(data_dir, args, fast_path=args.fast_path)
+            if args.fast_path:
+                results["fast_path"]["router_off_seconds"] = baseline["turn_seconds"]
+                results["fast_path"]["saved_seconds"] = baseline["turn_seconds"] - results["turn_seconds"]
+            print(format_results(label, results))
+            all_results[label] = results
+    return all_results
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the agent tools offline with scripted conversations.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Directory sizes to generate (one run each)")
+    parser.add_argument("--data-dir", type=Path, help="Benchmark this existing directory instead of generating one")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--partition-parking", action="store_true", help="Split parking records into monthly partitions")
+    parser.add_argument("--fast-path", action="store_true", help="Put the intent router in front of the agent (and replay once without it, to measure the saving)")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds per simulated model round-trip")
+    parser.add_argument("--repeat", type=int, default=5, help="Replays of the README scenarios")
+    parser.add_argument("--sessions", type=int, default=200, help="Synthetic kiosk conversations")
+    parser.add_argument("--concurrency", type=int, default=8, help="Synthetic conversations in flight at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import csv
+import io
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from metrics import record_io
+
+"""
+CSV Storage Helpers
+
+Low-level read and write paths for the data/*.csv files. Inserts are appended to the end of
+the file in a single write instead of re-reading and rewriting the whole table, so the
+cost of adding a row doesn't grow with the size of the file. Updates and deletes are
+written to a temp file and swapped in with os.replace, under an advisory lock shared by
+every kiosk process pointed at the same data directory.
+"""
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive advisory lock for a data file across processes.
+
+    The lock is taken on a sidecar "<file>.lock" file (not the CSV itself), because
+    atomic rewrites replace the CSV's inode and would silently drop a lock held on it.
+    """
+    lock_path = Path(f"{path}.lock")
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_csv_header(path: Path) -> list[str] | None:
+    """Read only the header row of a CSV file.
+
+    Returns:
+        The column names, or None if the file doesn't exist or is empty
+    """
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None)
+    except FileNotFoundError:
+        return None
+    return header or None
+
+
+def read_csv_rows(path: Path) -> tuple[list[str], list[dict[str, str]]]:
+    """Parse a whole CSV file into rows of text, without pandas.
+
+    Every value stays a string (empty cells are "", never NaN), so rows round-trip
+    exactly. Blank lines are skipped and short rows are padded with "", like
+    pd.read_csv(dtype=str, keep_default_na=False), but in about half the time and
+    without importing pandas.
+
+    Returns:
+        (column names, rows)
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        width = len(columns)
+        rows = [
+            dict(zip(columns, values if len(values) >= width else values + [""] * (width - len(values))))
+            for values in reader
+            if values
+        ]
+    return columns, rows
+
+
+def format_csv_rows(rows: list[dict[str, str]], columns: list[str], header: bool = False) -> bytes:
+    """Encode rows as CSV text (same quoting as pandas' to_csv) in column order."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if row.get(column) is None else row.get(column) for column in columns])
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_csv_atomic(path: Path, rows: list[dict[str, str]], columns: list[str]) -> tuple[int, int]:
+    """Replace a CSV file's contents in a crash-safe way.
+
+    The new contents are written to a temp file in the same directory, fsynced, and then
+    moved over the original with os.replace. Readers see either the old file or the new
+    one, never a truncated mix. Callers should hold file_lock(path) so concurrent
+    read-modify-write cycles don't overwrite each other.
+
+    Returns:
+        The (mtime_ns, size) of the new file
+    """
+    path = Path(path)
+    payload = format_csv_rows(rows, columns, header=True)
+    record_io(bytes_written=len(payload))
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(payload)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def append_csv_rows(
+    path: Path,
+    rows: list[dict[str, str]],
+    columns: list[str] | None = None,
+    lock: bool = True,
+) -> tuple[int, tuple[int, int]]:
+    """Append rows to the end of a CSV file without reading or rewriting it.
+
+    The file is opened with O_APPEND and the encoded rows are written with a single
+    os.write call followed by fsync, so a row is either fully on disk or not there at
+    all. The write happens under file_lock(path), so it can't land in a file that a
+    concurrent atomic rewrite is about to replace. If the file doesn't exist yet it is
+    created with a header row.
+
+    Args:
+        path: The CSV file to append to
+        rows: Rows to append, as dicts keyed by column name
+        columns: Column order to use when the file has no header yet
+            (defaults to the keys of the first row)
+        lock: Take file_lock(path) around the write. Pass False if the caller
+            already holds it.
+
+    Returns:
+        (offset, signature) - the file size before the write, and the (mtime_ns, size)
+        of the file after it
+    """
+    path = Path(path)
+    if lock:
+        with file_lock(path):
+            return append_csv_rows(path, rows, columns, lock=False)
+
+    header = read_csv_header(path)
+    write_header = header is None
+    columns = header or columns or list(rows[0])
+
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        offset = os.fstat(fd).st_size
+        payload = format_csv_rows(rows, columns, header=write_header and offset == 0)
+
+        # Don't glue the new row onto a last line that is missing its newline
+        if offset > 0:
+            os.lseek(fd, offset - 1, os.SEEK_SET)
+            if os.read(fd, 1) not in (b"\n", b"\r"):
+                payload = b"\n" + payload
+
+        os.write(fd, payload)
+        os.fsync(fd)
+        record_io(bytes_written=len(payload))
+        stat = os.fstat(fd)
+    finally:
+        os.close(fd)
+
+    return offset, (stat.st_mtime_ns, stat.st_size)
+
+
+def append_csv_row(
+    path: Path,
+    row: dict[str, str],
+    columns: list[str] | None = None,
+    lock: bool = True,
+) -> tuple[int, tuple[int, int]]:
+    """Append a single row to a CSV file. See append_csv_rows."""
+    return append_csv_rows(path, [row], columns, lock=lock)
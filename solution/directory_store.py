@@ -0,0 +1,484 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+from csv_storage import append_csv_rows, file_lock, read_csv_rows, write_csv_atomic
+from metrics import record_io
+
+"""
+Directory Store
+
+Shared in-memory copy of the employee and guest CSV files. Each file is parsed once
+and indexed by lowercased alias and full name, so the agent's lookup tools are O(1)
+dictionary hits instead of a full CSV parse + column scan on every call. Range queries
+(rows_between, e.g. today's parking records) use a sorted index of the column, built
+on first use.
+
+Writes go through the store as well: inserts are appended, and updates/deletes are
+group-committed - concurrent changes are queued and a single atomic rewrite under the
+cross-process file lock applies all of them. Writes to one file are serialized, but
+reads are not held up by them: while a rewrite is in progress, lookups keep answering
+from the previous in-memory snapshot, and the new rows and indexes are swapped in once
+the file has been replaced.
+"""
+
+# A change to apply to the in-memory rows; returns the value handed back to the caller
+Mutation = Callable[[list[dict[str, str]]], Any]
+
+
+class DirectoryStore:
+    """In-memory, indexed view of one CSV data file (employees, guests, parking records).
+
+    The file is loaded on first read. On every access the file's mtime and size are
+    compared with the values seen at load time, and the table is only re-parsed when
+    they changed (e.g. another kiosk wrote to it). Appends to a table that hasn't been
+    read yet go straight to the file without loading it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        key_columns: tuple[str, ...] = ("alias", "name"),
+        columns: list[str] | None = None,
+    ):
+        self.path = Path(path)
+        self.key_columns = key_columns
+        self.default_columns = list(columns) if columns else []
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = 0
+        self._signature: tuple[int, int] | None = None
+        self._rows: list[dict[str, str]] = []
+        self._columns: list[str] = []
+        self._indexes: dict[str, dict[str, int]] = {column: {} for column in key_columns}
+        # Range indexes for rows_between: column -> sorted (value, position) pairs, built
+        # on first use and dropped whenever the rows are replaced
+        self._sorted: dict[str, list[tuple[str, int]]] = {}
+        # Set while this process rewrites the file, so readers keep using the current
+        # snapshot instead of re-parsing the half-committed file
+        self._rewriting = False
+        # Group commit: queued mutations, and a lock held by whichever writer is flushing
+        self._pending: list[tuple[Mutation, Future]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _file_signature(self) -> tuple[int, int] | None:
+        """Return (mtime_ns, size) of the backing file, or None if it doesn't exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, signature: tuple[int, int] | None) -> None:
+        """Parse the CSV file and rebuild the key indexes."""
+        if signature is None:
+            self._rows = []
+            self._columns = list(self.default_columns)
+        else:
+            # Read everything as text so values round-trip exactly (no NaN for empty cells)
+            self._columns, self._rows = read_csv_rows(self.path)
+            record_io(rows_scanned=len(self._rows), bytes_read=signature[1])
+
+        self._rebuild_indexes()
+        self._signature = signature
+        self._loaded = True
+        self._version += 1
+
+    def _rebuild_indexes(self) -> None:
+        """Rebuild the key indexes from the in-memory rows."""
+        self._indexes = self._build_indexes(self._rows)
+        self._sorted = {}
+
+    def _build_indexes(self, rows: list[dict[str, str]]) -> dict[str, dict[str, int]]:
+        """Build the key indexes for a list of rows."""
+        indexes = {column: {} for column in self.key_columns}
+        for position, row in enumerate(rows):
+            self._index_row(position, row, indexes)
+        return indexes
+
+    def _index_row(self, position: int, row: dict[str, str], indexes: dict[str, dict[str, int]] | None = None) -> None:
+        """Add one row to the key indexes. The first occurrence of a key wins, like iloc[0]."""
+        indexes = self._indexes if indexes is None else indexes
+        for column in self.key_columns:
+            value = row.get(column)
+            if value:
+                indexes[column].setdefault(value.lower(), position)
+
+    def refresh(self) -> None:
+        """Reload the table if the backing file changed since it was last read."""
+        with self._lock:
+            if self._rewriting and self._loaded:
+                # Our own rewrite is in flight; its rows are swapped in when it finishes
+                return
+            signature = self._file_signature()
+            if signature != self._signature or not self._loaded:
+                self._load(signature)
+
+    def invalidate(self) -> None:
+        """Force a reload on the next access (call after writing the file directly)."""
+        with self._lock:
+            self._loaded = False
+            self._version += 1
+            self._signature = None
+            self._rows = []
+            self._indexes = {column: {} for column in self.key_columns}
+            self._sorted = {}
+
+    def find(self, column: str, value: str) -> dict[str, str] | None:
+        """Return a copy of the first row whose `column` equals `value` (case-insensitive).
+
+        Args:
+            column: One of the store's key columns (e.g. "alias" or "name")
+            value: The value to look up
+
+        Returns:
+            The matching row as a dict, or None if there is no match
+        """
+        with self._lock:
+            self.refresh()
+            position = self._indexes[column].get(value.lower())
+            if position is None:
+                return None
+            record_io(rows_scanned=1)
+            return dict(self._rows[position])
+
+    def contains(self, column: str, value: str) -> bool:
+        """Check whether any row has `column` equal to `value` (case-insensitive)."""
+        with self._lock:
+            self.refresh()
+            return value.lower() in self._indexes[column]
+
+    def append(self, row: dict[str, str], unique: str | None = None) -> bool:
+        """Append a row to the CSV file and to the in-memory table.
+
+        Only the new row is written (see csv_storage.append_csv_rows). If nobody else
+        changed the file since it was loaded, the row is indexed in place and no reload
+        is needed; otherwise the next access re-reads the file.
+
+        Args:
+            row: The new row
+            unique: Optional key column whose value must not exist yet. It is checked
+                under the file lock against the latest data, so two kiosks can't both
+                insert the same value.
+
+        Returns:
+            True if the row was written, False if the unique check failed
+        """
+        return self.append_many([row], unique=unique)[0]
+
+    def append_many(self, rows: list[dict[str, str]], unique: str | None = None) -> list[bool]:
+        """Append several rows with a single write (see append).
+
+        Args:
+            rows: The new rows, in order
+            unique: Optional key column whose values must not exist yet - neither in the
+                table nor earlier in `rows`. Rows failing the check are skipped; the
+                others are still written.
+
+        Returns:
+            One flag per row: True if it was written, False if the unique check failed
+        """
+        if not rows:
+            return []
+
+        with file_lock(self.path), self._lock:
+            if unique is None and not self._loaded:
+                append_csv_rows(self.path, rows, self.default_columns or list(rows[0]), lock=False)
+                return [True] * len(rows)
+
+            self.refresh()
+            written = []
+            accepted = []
+            batch_keys = set()
+            for row in rows:
+                if unique is not None:
+                    key = row.get(unique, "").lower()
+                    if key in self._indexes[unique] or key in batch_keys:
+                        written.append(False)
+                        continue
+                    batch_keys.add(key)
+                written.append(True)
+                accepted.append(row)
+            if not accepted:
+                return written
+
+            expected_offset = self._signature[1] if self._signature else 0
+            columns = self._columns or self.default_columns or list(accepted[0])
+            offset, signature = append_csv_rows(self.path, accepted, columns, lock=False)
+
+            if offset != expected_offset:
+                self.invalidate()
+                return written
+
+            self._columns = columns
+            for row in accepted:
+                row = {column: row.get(column, "") for column in columns}
+                self._rows.append(row)
+                self._index_row(len(self._rows) - 1, row)
+                for column, entries in self._sorted.items():
+                    if row.get(column):
+                        # New rows are usually the latest dates, so this lands at the end
+                        insort(entries, (row[column], len(self._rows) - 1))
+            self._signature = signature
+            self._version += 1
+            return written
+
+    def apply(self, mutation: Mutation) -> Any:
+        """Apply a read-modify-write change to the table and persist it atomically.
+
+        The mutation is queued. One writer at a time takes the cross-process file lock,
+        reloads the file if another process changed it, runs every queued mutation
+        against the current rows, and writes the result once with write_csv_atomic.
+        Under concurrent load, many updates share a single file rewrite instead of
+        each doing their own.
+
+        Args:
+            mutation: Function that modifies the list of rows in place and returns a result
+
+        Returns:
+            Whatever the mutation returned. Exceptions raised by the mutation are re-raised.
+        """
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending.append((mutation, future))
+
+        with self._flush_lock:
+            # Another writer may already have committed our change as part of its batch
+            if not future.done():
+                self._flush()
+        return future.result()
+
+    def _flush(self) -> None:
+        """Commit every queued mutation with one atomic rewrite. Caller holds _flush_lock."""
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            # The file lock keeps other writers (appends, other processes) out until the
+            # new rows are swapped in; readers only take self._lock, briefly
+            with file_lock(self.path):
+                with self._lock:
+                    self.refresh()
+                    current_rows, current_columns = self._rows, self._columns
+                    self._rewriting = True
+                try:
+                    rows = [dict(row) for row in current_rows]
+                    results = []
+                    for mutation, future in batch:
+                        try:
+                            results.append((future, mutation(rows), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+
+                    # Skip the rewrite entirely if none of the mutations changed anything
+                    if _rows_changed(current_rows, rows):
+                        columns = current_columns or (list(rows[0]) if rows else list(self.key_columns))
+                        signature = write_csv_atomic(self.path, rows, columns)
+                        indexes = self._build_indexes(rows)
+                        with self._lock:
+                            self._rows = rows
+                            self._columns = columns
+                            self._indexes = indexes
+                            self._sorted = {}
+                            self._signature = signature
+                            # One step per mutation, so each writer can tell whether others
+                            # were committed in the same batch
+                            self._version += len(batch)
+                finally:
+                    with self._lock:
+                        self._rewriting = False
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def update(
+        self,
+        column: str,
+        value: str,
+        changes: dict[str, str] | Callable[[dict[str, str]], dict[str, str]],
+    ) -> dict[str, str] | None:
+        """Update the first row whose `column` equals `value` (case-insensitive).
+
+        Args:
+            column: Column to match on (e.g. "alias")
+            value: Value to match
+            changes: New column values, or a function that receives the current row and
+                returns them. Use a function when the new value depends on the old one,
+                so it is computed against the latest data under the file lock.
+
+        Returns:
+            The updated row, or None if no row matched
+        """
+        def mutation(rows: list[dict[str, str]]) -> dict[str, str] | None:
+            for position, row in enumerate(rows):
+                if row.get(column, "").lower() == value.lower():
+                    record_io(rows_scanned=position + 1)
+                    row.update(changes(row) if callable(changes) else changes)
+                    return dict(row)
+            record_io(rows_scanned=len(rows))
+            return None
+
+        return self.apply(mutation)
+
+    def remove(self, column: str, value: str) -> int:
+        """Remove every row whose `column` equals `value` (case-insensitive).
+
+        Returns:
+            The number of rows removed
+        """
+        def mutation(rows: list[dict[str, str]]) -> int:
+            record_io(rows_scanned=len(rows))
+            kept = [row for row in rows if row.get(column, "").lower() != value.lower()]
+            removed = len(rows) - len(kept)
+            rows[:] = kept
+            return removed
+
+        return self.apply(mutation)
+
+    def remove_older_than(self, column: str, cutoff: str) -> list[dict[str, str]]:
+        """Remove every row whose date in `column` is before `cutoff`, in one rewrite.
+
+        The date column is parsed once into a datetime64 array and compared against the
+        cutoff in a single vectorized operation. Rows with a missing or unparseable date
+        are kept.
+
+        Args:
+            column: Date column in YYYY-MM-DD format (e.g. "date_accessed")
+            cutoff: Rows dated strictly before this YYYY-MM-DD date are removed
+
+        Returns:
+            The removed rows
+        """
+        # Only the expiry sweep needs pandas, so lookups never pay for importing it
+        import pandas as pd
+
+        cutoff_date = pd.Timestamp(cutoff)
+
+        def mutation(rows: list[dict[str, str]]) -> list[dict[str, str]]:
+            record_io(rows_scanned=len(rows))
+            dates = pd.to_datetime(
+                pd.Series([row.get(column, "") for row in rows], dtype="object"),
+                format="%Y-%m-%d",
+                errors="coerce",
+            )
+            expired_mask = (dates < cutoff_date).to_numpy()
+            removed = [row for row, expired in zip(rows, expired_mask) if expired]
+            if removed:
+                rows[:] = [row for row, expired in zip(rows, expired_mask) if not expired]
+            return removed
+
+        return self.apply(mutation)
+
+    def rows(self) -> list[dict[str, str]]:
+        """Return a snapshot of all rows."""
+        with self._lock:
+            self.refresh()
+            record_io(rows_scanned=len(self._rows))
+            return [dict(row) for row in self._rows]
+
+    def rows_between(self, column: str, start: str | None = None, end: str | None = None) -> list[dict[str, str]]:
+        """Return copies of the rows whose `column` is from `start` to `end` (inclusive; None = unbounded).
+
+        Values are compared as text, which orders YYYY-MM-DD dates correctly. Rows with
+        an empty value never match. The first query on a column sorts it once; later
+        ones are two binary searches plus the matching rows.
+        """
+        with self._lock:
+            self.refresh()
+            entries = self._sorted.get(column)
+            if entries is None:
+                record_io(rows_scanned=len(self._rows))
+                entries = sorted((row[column], position) for position, row in enumerate(self._rows) if row.get(column))
+                self._sorted[column] = entries
+            first = 0 if start is None else bisect_left(entries, (start,))
+            last = len(entries) if end is None else bisect_right(entries, (end, len(self._rows)))
+            # In file order, like the other queries
+            positions = sorted(position for _, position in entries[first:last])
+            record_io(rows_scanned=len(positions))
+            return [dict(self._rows[position]) for position in positions]
+
+    def column_values(self, column: str) -> list[str]:
+        """Return one column of every row (cheaper than rows() for counting and reports)."""
+        with self._lock:
+            self.refresh()
+            record_io(rows_scanned=len(self._rows))
+            return [row.get(column, "") for row in self._rows]
+
+    @property
+    def columns(self) -> list[str]:
+        """Column names of the backing CSV file."""
+        with self._lock:
+            self.refresh()
+            return list(self._columns)
+
+    @property
+    def version(self) -> int:
+        """Counter that increases whenever the table's contents change.
+
+        It moves by exactly one for each write made through this store, and by at least
+        one when the file is reloaded after an outside change. Lets callers cache values
+        derived from the rows (e.g. badge bitmasks) and recompute them only when the
+        data actually changed.
+        """
+        with self._lock:
+            self.refresh()
+            return self._version
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._rows)
+
+
+def _rows_changed(before: list[dict[str, str]], after: list[dict[str, str]], chunk: int = 10_000) -> bool:
+    """`before != after`, compared in chunks.
+
+    One list comparison of a million rows holds the GIL for hundreds of milliseconds;
+    chunking lets the event loop and reader threads run in between.
+    """
+    if len(before) != len(after):
+        return True
+    return any(before[i:i + chunk] != after[i:i + chunk] for i in range(0, len(before), chunk))
+
+
+# One shared store per file, so every tool call (and every agent session in the
+# process) reuses the same parsed table and indexes.
+_stores: dict[Path, DirectoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(
+    path: Path,
+    key_columns: tuple[str, ...] = ("alias", "name"),
+    columns: list[str] | None = None,
+) -> DirectoryStore:
+    """Return the shared DirectoryStore for a CSV file, creating it on first use.
+
+    Args:
+        path: The CSV file
+        key_columns: Columns to keep case-insensitive hash indexes on
+        columns: Header to write if the file has to be created
+    """
+    key = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = DirectoryStore(key, key_columns=key_columns, columns=columns)
+            _stores[key] = store
+        return store
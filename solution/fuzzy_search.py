@@ -0,0 +1,255 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import difflib
+import threading
+import weakref
+from collections import Counter
+
+"""
+Fuzzy Name Search
+
+Exact lookups (Table.find) miss on a typo at the kiosk - "jsmiht", "Jon Smith" - and
+the model then retries or registers the person a second time. FuzzySearchIndex returns
+the closest aliases and names instead, ranked:
+
+  - each distinct alias and name is split into the trigrams of its padded lowercase
+    form ("  jsmith " -> "  j", " js", "jsm", "smi", "mit", "ith", "th ")
+  - the inverted index (trigram -> terms containing it) is two numpy arrays: the sorted
+    distinct trigram codes with their offsets, and the concatenated posting lists -
+    about 4 bytes per trigram occurrence, built vectorized in chunks
+  - a search counts the trigrams each term shares with the query by sorting the query's
+    posting lists together, keeps the best candidates by trigram similarity and
+    re-ranks those by edit similarity (difflib) - milliseconds on a 1M-row directory
+
+The index is built on the first search, so exact lookups never pay for it. Writes made
+through the tools are reported with the table version read just before them
+(record_added / record_write) and applied in place when they account for the version
+step; any other change (another kiosk, an import) rebuilds it on the next search.
+Matches are re-read from the table before they are returned, so removed people never
+show up.
+"""
+
+# Indexed prefix of a padded term, in UTF-8 bytes
+MAX_TERM_BYTES = 48
+# Terms turned into trigrams per vectorized build step (bounds the temporary matrix)
+BUILD_CHUNK = 200_000
+# Best trigram matches re-ranked by edit similarity per search
+CANDIDATES = 50
+# Lowest edit similarity (0-1) reported as a near-match
+MIN_SIMILARITY = 0.75
+# People added in place before the index is rebuilt into the arrays
+MAX_ADDED = 10_000
+
+
+def _padded(term: str) -> bytes:
+    return f"  {term.lower()} ".encode("utf-8")[:MAX_TERM_BYTES]
+
+
+def trigrams(term: str) -> set[int]:
+    """The trigram codes of a term (three bytes of its padded lowercase form each)."""
+    data = _padded(term)
+    return {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+
+
+def build_postings(terms: list[str]):
+    """Build the inverted trigram index of `terms`.
+
+    Returns:
+        (codes, offsets, postings, sizes): the sorted distinct trigram codes; the
+        postings of codes[i] are postings[offsets[i]:offsets[i + 1]] (term positions);
+        sizes[j] is the number of distinct trigrams of terms[j]
+    """
+    import numpy as np
+
+    key_parts = []
+    for first in range(0, len(terms), BUILD_CHUNK):
+        chunk = [_padded(term) for term in terms[first:first + BUILD_CHUNK]]
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+        width = int(lengths.max())
+        data = np.array(chunk, dtype=f"S{width}").view(np.uint8).reshape(len(chunk), width).astype(np.uint32)
+        # Row by row, so each term's trigrams line up with its repeated position below
+        codes = (data[:, :-2] << 16 | data[:, 1:-1] << 8 | data[:, 2:])[np.arange(width - 2) < (lengths - 2)[:, None]]
+        ids = np.repeat(np.arange(first, first + len(chunk), dtype=np.uint64), lengths - 2)
+        key_parts.append(codes.astype(np.uint64) << np.uint64(32) | ids)
+
+    # Sorting (trigram, term) keys groups the postings by trigram; duplicates are dropped
+    keys = np.sort(np.concatenate(key_parts)) if key_parts else np.zeros(0, dtype=np.uint64)
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+    codes = (keys >> np.uint64(32)).astype(np.uint32)
+    postings = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    offsets = np.concatenate(([0], boundaries, [len(codes)])) if len(codes) else np.zeros(1, dtype=np.int64)
+    sizes = np.bincount(postings, minlength=len(terms)).astype(np.uint8)
+    return codes[offsets[:-1]], offsets, postings, sizes
+
+
+class FuzzySearchIndex:
+    """Ranked near-match search over some columns of a table (by default alias and name).
+
+    Args:
+        table: The storage table (employees or guests)
+        columns: The columns searched
+    """
+
+    def __init__(self, table, columns: tuple[str, ...] = ("alias", "name")):
+        self.table = table
+        self.columns = columns
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        # Indexed terms (original case) and the column each came from
+        self._terms: list[str] = []
+        self._term_columns: list[str] = []
+        self._codes = self._offsets = self._postings = self._sizes = None
+        # Terms added in place since the build, with their own small trigram index
+        self._added: list[tuple[str, str]] = []
+        self._added_postings: dict[int, list[int]] = {}
+
+    def _rebuild(self) -> None:
+        terms, term_columns = [], []
+        for column in self.columns:
+            # Distinct values, case-insensitively, keeping the first spelling
+            distinct = {}
+            for value in self.table.column_values(column):
+                if value:
+                    distinct.setdefault(value.lower(), value)
+            terms.extend(distinct.values())
+            term_columns.extend([column] * len(distinct))
+        self._codes, self._offsets, self._postings, self._sizes = build_postings(terms)
+        self._terms, self._term_columns = terms, term_columns
+        self._added, self._added_postings = [], {}
+
+    def _ensure_current(self) -> None:
+        """Rebuild if the table changed other than through record_*(). Caller holds _lock."""
+        version = self.table.version
+        if version == self._version and len(self._added) <= MAX_ADDED:
+            return
+        self._rebuild()
+        self._version = version
+
+    def _advance(self, version_before: int) -> bool:
+        """Move to the table's version after one reported write. Caller holds _lock.
+
+        Returns False (and marks the index for a rebuild) unless the index was current
+        before the write and the write was the only change since.
+        """
+        if self._version is None:
+            return False
+        version_after = self.table.version
+        # A write that changed nothing may not move the version at all
+        if self._version == version_before and version_after in (version_before, version_before + 1):
+            self._version = version_after
+            return True
+        self._version = None
+        return False
+
+    def record_added(self, rows: list[dict[str, str]], version_before: int) -> None:
+        """Index people just written to the table.
+
+        Args:
+            rows: The rows written (possibly none, e.g. a unique check that failed)
+            version_before: table.version read just before the write
+        """
+        with self._lock:
+            if not self._advance(version_before):
+                return
+            for row in rows:
+                for column in self.columns:
+                    if row.get(column):
+                        position = len(self._added)
+                        self._added.append((row[column], column))
+                        for code in trigrams(row[column]):
+                            self._added_postings.setdefault(code, []).append(position)
+
+    def record_write(self, version_before: int) -> None:
+        """Account for a write that added nobody: removals (their terms are filtered out
+        on search) or changes that keep names and aliases (badge access).
+
+        Args:
+            version_before: table.version read just before the write
+        """
+        with self._lock:
+            self._advance(version_before)
+
+    def _candidates(self, query: str) -> list[tuple[str, str]]:
+        """The indexed (term, column) pairs sharing the most trigrams with `query`. Caller holds _lock."""
+        import numpy as np
+
+        query_codes = trigrams(query)
+        scored = []
+        if len(self._codes):
+            wanted = np.fromiter(query_codes, dtype=np.uint32, count=len(query_codes))
+            slots = np.minimum(np.searchsorted(self._codes, wanted), len(self._codes) - 1)
+            slots = slots[self._codes[slots] == wanted]
+            if len(slots):
+                # Sorting the query's postings groups each term's shared trigrams together
+                ids = np.sort(np.concatenate([self._postings[self._offsets[slot]:self._offsets[slot + 1]] for slot in slots]))
+                starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+                hits, shared = ids[starts], np.diff(np.append(starts, len(ids)))
+                # Terms sharing under half as many trigrams as the best one can't be close
+                keep = shared >= (shared.max() + 1) // 2
+                hits, shared = hits[keep], shared[keep]
+                # Trigram (Jaccard) similarity
+                similarity = shared / (len(query_codes) + self._sizes[hits] - shared)
+                if len(hits) > CANDIDATES:
+                    best = np.argpartition(-similarity, CANDIDATES)[:CANDIDATES]
+                    hits, similarity = hits[best], similarity[best]
+                scored = [(float(s), self._terms[i], self._term_columns[i]) for i, s in zip(hits.tolist(), similarity)]
+
+        shared_added = Counter(position for code in query_codes for position in self._added_postings.get(code, ()))
+        for position, count in shared_added.items():
+            term, column = self._added[position]
+            scored.append((count / (len(query_codes) + len(trigrams(term)) - count), term, column))
+        scored.sort(reverse=True)
+        return [(term, column) for _, term, column in scored[:CANDIDATES]]
+
+    def search(self, query: str, limit: int = 3, min_similarity: float = MIN_SIMILARITY) -> list[tuple[dict[str, str], float]]:
+        """Return up to `limit` people whose alias or name is closest to `query`.
+
+        Args:
+            query: What the user typed (an alias or a full name)
+            limit: Most matches to return
+            min_similarity: Lowest edit similarity (0-1) to report
+
+        Returns:
+            (row, similarity) pairs, best first; one entry per person
+        """
+        query = " ".join(query.split())
+        if not query:
+            return []
+        with self._lock:
+            self._ensure_current()
+            candidates = self._candidates(query)
+
+        ranked = []
+        for term, column in candidates:
+            similarity = difflib.SequenceMatcher(None, query.lower(), term.lower()).ratio()
+            if similarity >= min_similarity:
+                ranked.append((similarity, term, column))
+        ranked.sort(key=lambda match: match[0], reverse=True)
+
+        matches, seen = [], set()
+        for similarity, term, column in ranked:
+            row = self.table.find(column, term)
+            if row is None:
+                continue
+            person = (row.get("alias", "").lower(), row.get("name", "").lower())
+            if person not in seen:
+                seen.add(person)
+                matches.append((row, similarity))
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+_indexes: "weakref.WeakKeyDictionary[object, FuzzySearchIndex]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(table) -> FuzzySearchIndex:
+    """Return the shared alias/name search index for a storage table, creating it on first use."""
+    with _indexes_lock:
+        index = _indexes.get(table)
+        if index is None:
+            index = FuzzySearchIndex(table)
+            _indexes[table] = index
+        return index
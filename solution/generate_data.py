@@ -0,0 +1,271 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from badge_access import MAX_FLOOR, format_badge_access
+
+"""
+Synthetic Dataset Generator
+
+Writes employees.csv, guests.csv and parking_records.csv at production scale, in the
+same schemas as data/, for benchmarks and profiling:
+
+  - surnames follow a Zipf-like distribution (lots of Smiths and Johnsons, a long tail
+    of rare names), so alias collisions (jsmith, jsmith2, ...) happen as in real life
+  - badge access clusters around each employee's home floor; some have none
+  - a configurable fraction of guests is expired (last access over 30 days ago)
+  - parking history spans several years of weekdays, busier on Tue-Thu, including
+    employees who asked for a second code on the same day
+
+    python solution/generate_data.py --out-dir data_1m --employees 1000000
+    python solution/generate_data.py --out-dir data_100k --employees 100000 --guests 20000 \\
+        --parking-years 5 --expired-guest-fraction 0.4
+"""
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Christopher", "Lisa", "Daniel", "Nancy", "Matthew", "Betty", "Anthony", "Sandra", "Mark", "Margaret",
+    "Donald", "Ashley", "Steven", "Kimberly", "Andrew", "Emily", "Paul", "Donna", "Joshua", "Michelle",
+    "Kenneth", "Carol", "Kevin", "Amanda", "Brian", "Melissa", "George", "Deborah", "Timothy", "Stephanie",
+    "Wei", "Priya", "Hiroshi", "Fatima", "Carlos", "Sofia", "Ahmed", "Mei", "Raj", "Olga",
+    "Luis", "Aisha", "Chen", "Ananya", "Diego", "Yuki", "Omar", "Ingrid", "Kwame", "Lucia",
+]
+
+COMMON_SURNAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell", "Carter", "Roberts",
+    "Kim", "Chen", "Patel", "Wang", "Singh", "Li", "Zhang", "Kumar", "Park", "Cohen",
+]
+
+# Long tail of rarer surnames, built from syllables (e.g. "Ashford", "Kellerman")
+SURNAME_PREFIXES = ["Ash", "Bren", "Cal", "Dun", "El", "Fair", "Gold", "Hart", "Kel", "Lang",
+                    "Mar", "North", "Oak", "Pem", "Red", "Stan", "Thorn", "Wal", "Whit", "York"]
+SURNAME_SUFFIXES = ["ford", "ley", "ton", "wood", "man", "er", "field", "brook", "by", "well",
+                    "more", "stein", "berg", "son", "ridge"]
+
+# Probability that an employee has no badge access at all
+NO_BADGE_ACCESS_FRACTION = 0.1
+
+CODE_ALPHABET = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype=np.uint8)
+
+
+def surname_pool() -> tuple[np.ndarray, np.ndarray]:
+    """All surnames with Zipf-like weights (rank^-1.1): common names first, then the tail."""
+    tail = [prefix + suffix for prefix in SURNAME_PREFIXES for suffix in SURNAME_SUFFIXES]
+    names = np.array(COMMON_SURNAMES + tail)
+    weights = 1.0 / np.arange(1, len(names) + 1) ** 1.1
+    return names, weights / weights.sum()
+
+
+def generate_people(rng: np.random.Generator, count: int, taken: list[str] = ()) -> tuple[np.ndarray, np.ndarray]:
+    """Return (full names, unique aliases) for `count` people.
+
+    Aliases are first initial + surname, lowercased; repeats get a numeric suffix in
+    order of appearance (jsmith, jsmith2, jsmith3, ...), counting the `taken` aliases
+    as already issued.
+    """
+    surnames, weights = surname_pool()
+    first = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), count)]
+    last = surnames[rng.choice(len(surnames), size=count, p=weights)]
+
+    names = np.char.add(np.char.add(first, " "), last)
+    taken = [alias.lower() for alias in taken]
+    base = pd.Series(taken + list(np.char.lower(np.char.add(first.astype("U1"), last))))
+    occurrence = base.groupby(base, sort=False).cumcount() + 1
+    aliases = base.where(occurrence == 1, base + occurrence.astype(str))
+    return names, aliases.to_numpy()[len(taken):]
+
+
+def generate_dates(rng: np.random.Generator, count: int, today: pd.Timestamp, min_days: int, max_days: int) -> np.ndarray:
+    """`count` dates between min_days and max_days before today, as YYYY-MM-DD strings."""
+    offsets = pd.to_timedelta(rng.integers(min_days, max_days + 1, count), unit="D")
+    return (today - offsets).strftime("%Y-%m-%d").to_numpy()
+
+
+def generate_badge_access(rng: np.random.Generator, count: int, style: str) -> np.ndarray:
+    """Badge access strings: a contiguous block of 1-3 floors around a home floor (2-7)."""
+    home = rng.integers(2, MAX_FLOOR + 1, count)
+    low = np.clip(home - rng.integers(0, 2, count), 2, MAX_FLOOR)
+    high = np.clip(home + rng.integers(0, 2, count), 2, MAX_FLOOR)
+    floor_numbers = np.arange(1, MAX_FLOOR + 1)
+    bits = (floor_numbers >= low[:, None]) & (floor_numbers <= high[:, None])
+    masks = (bits * (1 << (floor_numbers - 1))).sum(axis=1)
+    masks[rng.random(count) < NO_BADGE_ACCESS_FRACTION] = 0
+
+    # Only 2^7 distinct masks, so format each once
+    formatted = np.array([format_badge_access(mask, style) for mask in range(1 << MAX_FLOOR)], dtype=object)
+    return formatted[masks]
+
+
+def generate_parking_codes(rng: np.random.Generator, count: int) -> np.ndarray:
+    """`count` distinct 6-character parking codes (A-Z, 0-9)."""
+    numbers = rng.choice(36 ** 6, size=count, replace=False)
+    digits = np.stack([(numbers // 36 ** i) % 36 for i in range(6)], axis=1)
+    return CODE_ALPHABET[digits].copy().view("S6").ravel().astype("U6")
+
+
+def generate_employees(rng: np.random.Generator, count: int, today: pd.Timestamp, badge_style: str, taken: list[str] = ()) -> pd.DataFrame:
+    """Employees, most of whom came in recently."""
+    names, aliases = generate_people(rng, count, taken)
+    # Exponential recency: typical employee was in within the last few weeks
+    days_ago = np.minimum(rng.exponential(14, count).astype(int), 730)
+    return pd.DataFrame({
+        "name": names,
+        "alias": aliases,
+        "date_accessed": (today - pd.to_timedelta(days_ago, unit="D")).strftime("%Y-%m-%d"),
+        "badge_access": generate_badge_access(rng, count, badge_style),
+    })
+
+
+def generate_guests(rng: np.random.Generator, count: int, today: pd.Timestamp, expired_fraction: float, taken: list[str] = ()) -> pd.DataFrame:
+    """Guests; `expired_fraction` of them last visited more than 30 days ago."""
+    names, aliases = generate_people(rng, count, taken)
+    expired = rng.random(count) < expired_fraction
+    dates = np.where(
+        expired,
+        generate_dates(rng, count, today, 31, 365),
+        generate_dates(rng, count, today, 0, 30),
+    )
+    return pd.DataFrame({"name": names, "alias": aliases, "date_accessed": dates})
+
+
+def generate_parking_records(
+    rng: np.random.Generator,
+    aliases: np.ndarray,
+    count: int,
+    today: pd.Timestamp,
+    years: float,
+    duplicate_fraction: float,
+) -> pd.DataFrame:
+    """Parking codes issued on weekdays over `years` years, oldest first.
+
+    Tue-Thu are busiest; `duplicate_fraction` of requests are a second code for someone
+    who already got one that day.
+    """
+    days = pd.date_range(end=today, periods=max(int(years * 365), 1), freq="D")
+    weekday_weights = np.array([0.8, 1.2, 1.3, 1.2, 0.7, 0.02, 0.02])[days.dayofweek]
+    day_index = np.sort(rng.choice(len(days), size=count, p=weekday_weights / weekday_weights.sum()))
+
+    record_aliases = aliases[rng.integers(0, len(aliases), count)]
+    # Repeat requests: copy the previous record's alias when it was issued the same day
+    repeat = rng.random(count) < duplicate_fraction
+    repeat[0] = False
+    same_day = np.r_[False, day_index[1:] == day_index[:-1]]
+    repeat &= same_day
+    repeat_positions = np.flatnonzero(repeat)
+    record_aliases[repeat_positions] = record_aliases[repeat_positions - 1]
+
+    return pd.DataFrame({
+        "alias": record_aliases,
+        "parking_code": generate_parking_codes(rng, count),
+        "date_issued": days[day_index].strftime("%Y-%m-%d"),
+    })
+
+
+def generate_directory(
+    out_dir: Path,
+    employees: int,
+    guests: int,
+    parking_records: int,
+    parking_years: float = 3,
+    expired_guest_fraction: float = 0.3,
+    duplicate_parking_fraction: float = 0.02,
+    badge_style: str = "floors",
+    include_shipped: bool = False,
+    seed: int = 0,
+) -> dict[str, int]:
+    """Write the three CSV files into `out_dir`.
+
+    Args:
+        out_dir: Directory to write employees.csv, guests.csv and parking_records.csv to
+        employees: Number of employees
+        guests: Number of guests
+        parking_records: Number of parking records
+        parking_years: How many years of parking history to spread the records over
+        expired_guest_fraction: Fraction of guests whose access has expired
+        duplicate_parking_fraction: Fraction of parking requests that repeat a same-day request
+        badge_style: "floors" ("2,3,4") or "hex" ("0x0e") badge_access values
+        include_shipped: Put the rows from data/ first (so the README scenarios still work)
+        seed: Random seed; the same seed always produces the same files
+
+    Returns:
+        Rows written per file
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.now().normalize()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    shipped_dir = Path(__file__).parent.parent / "data"
+    shipped = {
+        dataset: pd.read_csv(shipped_dir / f"{dataset}.csv", dtype=str, keep_default_na=False)
+        for dataset in ("employees", "guests", "parking_records")
+    } if include_shipped else {}
+
+    def taken(dataset: str) -> list[str]:
+        return shipped[dataset]["alias"].tolist() if include_shipped else []
+
+    frames = {
+        "employees": generate_employees(rng, employees, today, badge_style, taken("employees")),
+        "guests": generate_guests(rng, guests, today, expired_guest_fraction, taken("guests")),
+    }
+    frames["parking_records"] = generate_parking_records(
+        rng, frames["employees"]["alias"].to_numpy(), parking_records, today, parking_years, duplicate_parking_fraction
+    )
+
+    if include_shipped:
+        # Keep parking codes unique across the shipped and generated records
+        parking = frames["parking_records"]
+        frames["parking_records"] = parking[~parking["parking_code"].isin(shipped["parking_records"]["parking_code"])]
+
+    written = {}
+    for dataset, frame in frames.items():
+        if include_shipped:
+            frame = pd.concat([shipped[dataset], frame], ignore_index=True)
+        frame.to_csv(out_dir / f"{dataset}.csv", index=False, lineterminator="\n")
+        written[dataset] = len(frame)
+    return written
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate large synthetic employees/guests/parking datasets.")
+    parser.add_argument("--out-dir", type=Path, required=True, help="Where to write the CSV files (not data/!)")
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--guests", type=int, help="Number of guests (default: employees / 5)")
+    parser.add_argument("--parking-records", type=int, help="Number of parking records (default: employees)")
+    parser.add_argument("--parking-years", type=float, default=3, help="Years of parking history")
+    parser.add_argument("--expired-guest-fraction", type=float, default=0.3)
+    parser.add_argument("--duplicate-parking-fraction", type=float, default=0.02)
+    parser.add_argument("--badge-format", choices=["floors", "hex"], default="floors")
+    parser.add_argument("--include-shipped", action="store_true", help="Prepend the rows from data/")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = generate_directory(
+        args.out_dir,
+        employees=args.employees,
+        guests=args.guests if args.guests is not None else args.employees // 5,
+        parking_records=args.parking_records if args.parking_records is not None else args.employees,
+        parking_years=args.parking_years,
+        expired_guest_fraction=args.expired_guest_fraction,
+        duplicate_parking_fraction=args.duplicate_parking_fraction,
+        badge_style=args.badge_format,
+        include_shipped=args.include_shipped,
+        seed=args.seed,
+    )
+    summary = ", ".join(f"{dataset} {rows:,}" for dataset, rows in written.items())
+    print(f"✅ Wrote {summary} rows to {args.out_dir} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from csv_storage import append_csv_rows
+from fuzzy_search import get_name_index
+from storage import StorageBackend, get_backend
+
+"""
+Guest Expiry Sweep
+
+Removes every guest whose access has expired (more than GUEST_EXPIRY_DAYS since their
+last access) in one pass and one write, instead of finding them one at a time in
+check_guest_exists and rewriting the guest file once per removal.
+
+Run it once (e.g. from cron / Task Scheduler) or keep it running on an interval:
+    python solution/guest_expiry.py
+    python solution/guest_expiry.py --interval 60
+"""
+
+# Guest access expires after this many days without a visit
+GUEST_EXPIRY_DAYS = 30
+
+ARCHIVE_COLUMNS = ["name", "alias", "date_accessed", "date_removed"]
+
+
+def sweep_expired_guests(
+    storage: StorageBackend,
+    archive_path: Path | None = None,
+    today: date | None = None,
+) -> dict:
+    """Remove all expired guests in a single write, optionally archiving them first.
+
+    Args:
+        storage: The storage backend holding the guests dataset
+        archive_path: CSV file to append the removed guests to (None to skip archiving)
+        today: Reference date for the expiry calculation (defaults to today)
+
+    Returns:
+        A report with the number of guests scanned, removed and archived, and the time taken
+    """
+    start = time.perf_counter()
+    today = today or datetime.now().date()
+    # Expired means more than GUEST_EXPIRY_DAYS days since last access
+    cutoff = (today - timedelta(days=GUEST_EXPIRY_DAYS)).strftime("%Y-%m-%d")
+
+    guests = storage.guests
+    scanned = len(guests)
+
+    # Archive before deleting: if the archive write fails, nobody has been removed yet.
+    # A guest who checks in between the two steps is archived but kept, never the reverse.
+    archived = 0
+    if archive_path is not None:
+        day_before_cutoff = (today - timedelta(days=GUEST_EXPIRY_DAYS + 1)).strftime("%Y-%m-%d")
+        expired = guests.rows_between("date_accessed", None, day_before_cutoff)
+        if expired:
+            date_removed = today.strftime("%Y-%m-%d")
+            # Appended with a single write followed by fsync
+            append_csv_rows(
+                archive_path,
+                [{**guest, "date_removed": date_removed} for guest in expired],
+                columns=ARCHIVE_COLUMNS,
+            )
+            archived = len(expired)
+
+    version_before = guests.version
+    removed = guests.remove_older_than("date_accessed", cutoff)
+    get_name_index(guests).record_write(version_before)
+
+    return {
+        "scanned": scanned,
+        "removed": len(removed),
+        "archived": archived,
+        "cutoff": cutoff,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def format_sweep_report(report: dict) -> str:
+    """Render a sweep report as a one-line summary."""
+    return (
+        f"🧹 Guest expiry sweep: scanned {report['scanned']}, removed {report['removed']} "
+        f"(last access before {report['cutoff']}), archived {report['archived']} "
+        f"in {report['seconds'] * 1000:.1f} ms"
+    )
+
+
+def main() -> None:
+    """Command-line entry point: run the sweep once, or repeatedly with --interval."""
+    load_dotenv()
+    default_data_dir = Path(__file__).parent.parent / "data"
+
+    parser = argparse.ArgumentParser(description="Remove (and archive) all expired guests in one pass.")
+    parser.add_argument("--data-dir", type=Path, default=default_data_dir, help="Directory with the data files")
+    parser.add_argument("--no-archive", action="store_true", help="Delete expired guests without archiving them")
+    parser.add_argument("--interval", type=float, default=0, help="Repeat every N minutes (default: run once)")
+    args = parser.parse_args()
+
+    storage = get_backend(args.data_dir)
+    archive_path = None if args.no_archive else args.data_dir / "guests_archive.csv"
+
+    while True:
+        print(format_sweep_report(sweep_expired_guests(storage, archive_path)))
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import os
+import re
+import time
+import uuid
+import weakref
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+
+from agent_framework import AgentResponse, AgentResponseUpdate, Content, UsageDetails
+
+from metrics import REGISTRY
+
+"""
+Fast-Path Intent Router
+
+Most kiosk turns are an employee saying who they are and asking for parking or their
+floors - "I'm employee jsmith, I need parking" - and each one costs a couple of model
+round-trips before check_employee_exists and generate_parking_code run. FastPathAgent
+sits in front of the agent and answers the structured ones itself, calling the same
+(instrumented) tools directly:
+
+    "I'm employee jsmith" / "my alias is jsmith"   -> check_employee_exists, offer parking
+    "... I need parking" / "Yes" to that offer     -> generate_parking_code (same approval)
+    "... which floors can I access?"               -> check_badge_access
+
+Only an exact match on a known employee is routed. Anything else - greetings, guests,
+badge changes, negations, unknown aliases - goes to the agent unchanged, prefixed with a
+one-line note of the turns the router answered so the model keeps the context. Routed
+replies use the agent's own shapes (function_call / function_result contents, a usage
+content with zero tokens), so traces, `show` and the server's tool lists are unchanged.
+
+Enable with FAST_PATH_ROUTER=1 in .env (off by default). The hit rate and routed vs.
+model turn latency are in the `stats` table and /metrics; benchmark.py --fast-path
+measures the time saved on the same conversations with the router off.
+"""
+
+# A kiosk alias: a letter, then letters, digits, dots, dashes or underscores
+_ALIAS = r"(?P<alias>[a-z][a-z0-9._-]{1,31})"
+_GREETING = r"(?:(?:hi|hello|hey|good (?:morning|afternoon|evening))\b[\s,.!]*)?"
+_REST = r"(?:(?:\s*[,.!;]\s*|\s+and\s+)(?P<rest>.*?))?[\s.!]*$"
+_EMPLOYEE = r"(?:an\s+)?employee[\s,:]+(?:(?:my\s+)?alias(?:\s+is)?[\s:]+)?"
+
+# "I'm employee jsmith", "Hi, I am an employee, alias jsmith. ...", "I'm jsmith",
+# "this is employee jsmith" ("this is" / "it's" only with "employee": "it's raining")
+INTRODUCTION = re.compile(
+    _GREETING + r"(?:(?:i'?m|i am)\s+(?:" + _EMPLOYEE + r")?|(?:this is|it'?s)\s+" + _EMPLOYEE + r")" + _ALIAS + _REST
+)
+# "employee jsmith", "my alias is jsmith", "alias: jsmith"
+ALIAS_ONLY = re.compile(_GREETING + r"(?:employee[\s,:]+|(?:my\s+)?alias(?:\s+is)?[\s:]+)" + _ALIAS + _REST)
+
+# Words after "I'm" that are not aliases
+NOT_ALIASES = {
+    "a", "an", "the", "here", "new", "not", "just", "looking", "visiting", "guest", "employee",
+    "fine", "good", "ok", "okay", "back", "sorry", "trying", "waiting", "meeting",
+}
+
+# Only a plain request for today's code; anything more ("parking for my guest",
+# "parking tomorrow", "get rid of my parking") is for the agent to interpret
+_PARKING = r"(?:(?:a|some|my)\s+)?(?:parking(?:\s+(?:code|validation|pass))?|to\s+park)"
+_POLITE = r"(?:[\s,]+(?:please|today|for today|for me|thanks?(?: you)?))*$"
+PARKING_REQUEST = re.compile(
+    r"^(?:i\s*)?(?:(?:would|'d)\s+)?(?:need|want|like|get)\s+" + _PARKING + _POLITE
+    + r"|^(?:can|could|may)\s+i\s+(?:get|have)\s+" + _PARKING + _POLITE
+    + r"|^" + _PARKING + _POLITE
+)
+BADGE_QUESTION = re.compile(
+    r"^(?:which|what)\s+floors?\s+(?:can|do)\s+i\s+(?:access|have(?:\s+access(?:\s+to)?)?|get\s+into)\??$"
+    r"|^(?:check\s+)?(?:my\s+)?(?:badge|floor)\s+access\??$"
+)
+YES = re.compile(r"^(?:yes|yeah|yep|yup|sure|ok|okay|y)(?:[\s,]+(?:please|i do|i will|thanks?(?: you)?))?$|^please$")
+NO = re.compile(r"^(?:no|nope|nah|n)(?:[\s,]+(?:thanks?(?: you)?|i don'?t|i won'?t))?$")
+# Words that change the meaning of a request; such messages always go to the agent
+NEGATION = re.compile(r"\b(?:not|no|never|don'?t|doesn'?t|won'?t|cancel|instead|but)\b|n't\b")
+
+EMPLOYEE_FOUND = re.compile(r"^Employee found: (?P<name>.+?) \(alias: (?P<alias>[^,]+),")
+
+
+@dataclass
+class RouterState:
+    """What the router knows about one conversation."""
+
+    # The employee verified by a routed lookup in this conversation
+    alias: str | None = None
+    name: str | None = None
+    # The last routed reply offered parking, so "yes" / "no" answers it
+    parking_offered: bool = False
+    # Routed exchanges the agent has not seen yet
+    unseen: list[str] = field(default_factory=list)
+
+
+def fast_path_enabled() -> bool:
+    """Whether FAST_PATH_ROUTER is set in the environment."""
+    return os.getenv("FAST_PATH_ROUTER", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace("’", "'").split()).strip(" ?!.")
+
+
+def _classify(rest: str) -> str | None:
+    """The intent of what follows an introduction: "lookup", "parking", "badge", or None if unsure."""
+    if not rest:
+        return "lookup"
+    if NEGATION.search(rest):
+        return None
+    if PARKING_REQUEST.match(rest):
+        return "parking"
+    if BADGE_QUESTION.match(rest):
+        return "badge"
+    return None
+
+
+class FastPathAgent:
+    """Wraps an agent and answers structured employee requests without a model call.
+
+    Has the agent's shape (get_new_thread(), run(), run_stream()), so the REPL, the
+    server and the benchmark use it in place of the agent.
+
+    Args:
+        agent: The agent to send everything else to
+        tools: The agent's tools, looked up by name (check_employee_exists,
+            generate_parking_code, check_badge_access)
+    """
+
+    def __init__(self, agent, tools: list[Callable]):
+        self.agent = agent
+        self.tools = {getattr(tool, 'name', None) or tool.__name__: tool for tool in tools}
+        self._states: dict[int, RouterState] = {}
+
+    def __getattr__(self, name):
+        # id, name, instructions... come from the wrapped agent
+        return getattr(self.agent, name)
+
+    def get_new_thread(self, *args, **kwargs):
+        """Start a new conversation on the wrapped agent."""
+        thread = self.agent.get_new_thread(*args, **kwargs)
+        self._states[id(thread)] = RouterState()
+        weakref.finalize(thread, self._states.pop, id(thread), None)
+        return thread
+
+    def plan(self, text: str, state: RouterState) -> tuple[str, str | None] | None:
+        """Decide whether a message can be answered without the model.
+
+        Returns:
+            (intent, alias) - intent is "lookup", "parking", "badge" or "decline", alias is
+            the employee to look up (None when the conversation's verified employee
+            applies) - or None to send the message to the agent
+        """
+        message = _normalize(text)
+        match = INTRODUCTION.match(message) or ALIAS_ONLY.match(message)
+        if match is not None:
+            if match["alias"] in NOT_ALIASES:
+                return None
+            intent = _classify(match["rest"] or "")
+            return (intent, match["alias"]) if intent else None
+
+        if state.alias is None:
+            return None
+        if state.parking_offered and YES.match(message):
+            return "parking", None
+        if state.parking_offered and NO.match(message):
+            return "decline", None
+        intent = _classify(message) if message else None
+        return (intent, None) if intent in ("parking", "badge") else None
+
+    async def _call(self, name: str, updates: list, **arguments) -> str:
+        """Call a tool, recording the call and its result as the agent would."""
+        call_id = f"fast-{uuid.uuid4().hex[:12]}"
+        updates.append(AgentResponseUpdate(role="assistant", contents=[
+            Content.from_function_call(call_id, name, arguments=arguments)
+        ]))
+        started = time.perf_counter()
+        try:
+            output = str(await self.tools[name](**arguments))
+        except Exception as e:
+            output = f"Error calling {name}: {str(e)}"
+        updates.append(AgentResponseUpdate(role="tool", contents=[Content.from_function_result(
+            call_id, result=output, additional_properties={"duration_seconds": time.perf_counter() - started}
+        )]))
+        return output
+
+    async def _answer(self, intent: str, alias: str | None, state: RouterState) -> tuple[list[AgentResponseUpdate], str] | None:
+        """Run a routed intent. Returns the turn's updates and reply, or None if the agent should take over."""
+        updates = []
+        greeting = ""
+        if alias is not None and alias != state.alias:
+            found = EMPLOYEE_FOUND.match(await self._call("check_employee_exists", updates, alias=alias))
+            if found is None:
+                # Unknown alias or a lookup error: the agent knows how to register people
+                return None
+            state.alias, state.name = found["alias"], found["name"]
+            greeting = f"Welcome back, {state.name}! "
+
+        state.parking_offered = False
+        if intent == "lookup":
+            reply = f"{greeting or f'Welcome back, {state.name}! '}You're verified as an employee. Will you need parking today?"
+            state.parking_offered = True
+        elif intent == "parking":
+            reply = greeting + await self._call("generate_parking_code", updates, alias=state.alias)
+        elif intent == "badge":
+            reply = greeting + await self._call("check_badge_access", updates, alias=state.alias)
+        else:
+            reply = "No problem - you're all set and can proceed. Have a great day!"
+
+        updates.append(AgentResponseUpdate(role="assistant", text=reply, additional_properties={"fast_path": True}))
+        updates.append(AgentResponseUpdate(role="assistant", contents=[
+            Content.from_usage(UsageDetails(input_token_count=0, output_token_count=0))
+        ]))
+        return updates, reply
+
+    async def _route(self, text: str, thread) -> list[AgentResponseUpdate] | None:
+        state = self._states.setdefault(id(thread), RouterState())
+        planned = self.plan(text, state)
+        if planned is None:
+            return None
+        answered = await self._answer(*planned, state)
+        if answered is None:
+            return None
+        updates, reply = answered
+        state.unseen.append(f'user: "{text}" / you: "{reply}"')
+        # A scripted local thread (scenarios.py) has the model's turn for this message
+        # queued; drop it so the rest of the script stays aligned with the conversation
+        script = getattr(thread, "script", None)
+        if script:
+            script.popleft()
+        return updates
+
+    def _for_agent(self, text: str, thread) -> str:
+        """The message for the agent, with the routed exchanges it hasn't seen."""
+        state = self._states.setdefault(id(thread), RouterState())
+        state.parking_offered = False
+        if not state.unseen:
+            return text
+        note = "; ".join(state.unseen)
+        state.unseen.clear()
+        return f"[Earlier in this conversation the kiosk answered directly - {note}]\n{text}"
+
+    async def run_stream(self, text: str, *, thread=None) -> AsyncIterator[AgentResponseUpdate]:
+        """Answer one user message as a stream of updates, routed or from the agent."""
+        thread = thread if thread is not None else self.get_new_thread()
+        started = time.perf_counter()
+        updates = await self._route(text, thread)
+        if updates is not None:
+            for update in updates:
+                yield update
+            REGISTRY.record_route(True, time.perf_counter() - started)
+            return
+
+        async for update in self.agent.run_stream(self._for_agent(text, thread), thread=thread):
+            yield update
+        REGISTRY.record_route(False, time.perf_counter() - started)
+
+    async def run(self, text: str, *, thread=None) -> AgentResponse:
+        """Answer one user message, routed or from the agent."""
+        thread = thread if thread is not None else self.get_new_thread()
+        started = time.perf_counter()
+        updates = await self._route(text, thread)
+        if updates is not None:
+            REGISTRY.record_route(True, time.perf_counter() - started)
+            return AgentResponse.from_agent_run_response_updates(updates)
+
+        result = await self.agent.run(self._for_agent(text, thread), thread=thread)
+        REGISTRY.record_route(False, time.perf_counter() - started)
+        return result
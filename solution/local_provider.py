@@ -0,0 +1,241 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import inspect
+import json
+import re
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+
+from agent_framework import AgentResponse, AgentResponseUpdate, Content, UsageDetails
+
+"""
+Local Agents Provider
+
+An offline stand-in for AzureAIAgentsProvider, for tests and load runs of the server
+without Azure credentials or model calls. It has the same shape as the real provider
+(async context manager, create_agent(name, instructions, tools), agent.get_new_thread(),
+await agent.run(text, thread=thread), agent.run_stream(text, thread=thread)) and returns
+framework AgentResponse / AgentResponseUpdate objects with function_call /
+function_result contents, so the tool-trace code works unchanged.
+
+What the "model" does is decided by a thread's script, if it has one (a queue of
+ScriptedTurns replayed one per user message - see scenarios.py), and otherwise by a
+responder. The default responder understands commands, one per line, that call tools
+directly:
+
+    !check_employee_exists {"alias": "jsmith"}
+    !generate_parking_code {"alias": "jsmith"}
+
+and echoes anything else. Set model_latency to simulate model round-trips and
+token_latency to pace the streamed reply (one token per word). Each
+function_result carries the tool's wall time in additional_properties["duration_seconds"].
+
+Every turn ends with a usage content estimating the tokens a real model would have
+been billed for: each simulated round-trip reads the instructions, the tool schemas
+and the conversation so far (about four characters per token), so prompt-size changes
+show up in the token metrics without calling a model.
+"""
+
+# Rough size of a token in English text and JSON, for the usage estimate
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text (no tokenizer needed)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class ToolCall:
+    """One tool invocation the local model decided to make."""
+
+    name: str
+    arguments: dict = field(default_factory=dict)
+
+
+@dataclass
+class ScriptedTurn:
+    """What the local model does for one user message.
+
+    Args:
+        tool_calls: Tools to call, in order
+        text: The reply. None to reply with the tool outputs.
+    """
+
+    tool_calls: list[ToolCall] = field(default_factory=list)
+    text: str | None = None
+
+
+@dataclass
+class LocalThread:
+    """Conversation history of one local thread, as (role, text) pairs, plus its script."""
+
+    thread_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    messages: list[tuple[str, str]] = field(default_factory=list)
+    script: deque[ScriptedTurn] = field(default_factory=deque)
+
+
+def command_responder(text: str, thread: LocalThread) -> ScriptedTurn:
+    """Default responder: run `!tool_name {json arguments}` lines, echo anything else."""
+    tool_calls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith('!'):
+            continue
+        name, _, arguments = line[1:].partition(' ')
+        tool_calls.append(ToolCall(name, json.loads(arguments) if arguments.strip() else {}))
+
+    if tool_calls:
+        return ScriptedTurn(tool_calls)
+    return ScriptedTurn(text=f"(local agent) You said: {text}")
+
+
+class LocalAgent:
+    """An agent whose replies come from a responder instead of a model."""
+
+    def __init__(
+        self,
+        name: str,
+        instructions: str,
+        tools: list[Callable],
+        responder: Callable[[str, LocalThread], ScriptedTurn] = command_responder,
+        model_latency: float = 0.0,
+        token_latency: float = 0.0,
+    ):
+        self.id = f"local-{uuid.uuid4().hex[:12]}"
+        self.name = name
+        self.instructions = instructions
+        self.tools = {getattr(tool, 'name', None) or tool.__name__: tool for tool in tools}
+        self._prompt_tokens: int | None = None
+        self.responder = responder
+        self.model_latency = model_latency
+        self.token_latency = token_latency
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Estimated tokens of the fixed prompt sent with every model call: instructions and tool schemas."""
+        if self._prompt_tokens is None:
+            from agent_cache import tool_schemas
+
+            schemas = json.dumps(tool_schemas(list(self.tools.values())))
+            self._prompt_tokens = estimate_tokens(self.instructions) + estimate_tokens(schemas)
+        return self._prompt_tokens
+
+    def get_new_thread(self, script: Iterable[ScriptedTurn] = ()) -> LocalThread:
+        """Start a new conversation, optionally with scripted turns to replay."""
+        return LocalThread(script=deque(script))
+
+    async def _call_tool(self, call: ToolCall) -> str:
+        tool = self.tools.get(call.name)
+        if tool is None:
+            return f"Error: unknown tool '{call.name}'"
+        try:
+            result = tool(**call.arguments)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return f"Error calling {call.name}: {str(e)}"
+
+    async def run_stream(self, text: str, *, thread: LocalThread | None = None) -> AsyncIterator[AgentResponseUpdate]:
+        """Answer one user message as a stream of updates: tool calls, tool results, then text."""
+        thread = thread or self.get_new_thread()
+        thread.messages.append(("user", text))
+        history_tokens = sum(estimate_tokens(message) for _, message in thread.messages)
+        input_tokens = self.prompt_tokens + history_tokens
+        output_tokens = 0
+
+        # One model round-trip to decide what to do...
+        if self.model_latency:
+            await asyncio.sleep(self.model_latency)
+        turn = thread.script.popleft() if thread.script else self.responder(text, thread)
+
+        outputs = []
+        if turn.tool_calls:
+            calls = [(uuid.uuid4().hex[:12], call) for call in turn.tool_calls]
+            call_tokens = sum(estimate_tokens(call.name + json.dumps(call.arguments)) for call in turn.tool_calls)
+            output_tokens += call_tokens
+            yield AgentResponseUpdate(role="assistant", contents=[
+                Content.from_function_call(call_id, call.name, arguments=json.dumps(call.arguments))
+                for call_id, call in calls
+            ])
+            for call_id, call in calls:
+                started = time.perf_counter()
+                output = await self._call_tool(call)
+                duration = time.perf_counter() - started
+                outputs.append(str(output))
+                yield AgentResponseUpdate(role="tool", contents=[Content.from_function_result(
+                    call_id, result=output, additional_properties={"duration_seconds": duration}
+                )])
+
+            # ...and one more to read the tool results
+            if self.model_latency:
+                await asyncio.sleep(self.model_latency)
+            input_tokens += self.prompt_tokens + history_tokens + call_tokens + sum(estimate_tokens(output) for output in outputs)
+
+        reply = turn.text if turn.text is not None else "\n".join(outputs)
+        thread.messages.append(("assistant", reply))
+        # The reply streams word by word, like model tokens
+        for token in re.findall(r"\s*\S+", reply) or [reply]:
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield AgentResponseUpdate(role="assistant", text=token)
+        output_tokens += estimate_tokens(reply)
+        yield AgentResponseUpdate(role="assistant", contents=[Content.from_usage(
+            UsageDetails(input_token_count=input_tokens, output_token_count=output_tokens)
+        )])
+
+    async def run(self, text: str, *, thread: LocalThread | None = None) -> AgentResponse:
+        """Answer one user message, calling tools as the responder decides."""
+        updates = [update async for update in self.run_stream(text, thread=thread)]
+        return AgentResponse.from_agent_run_response_updates(updates)
+
+
+class LocalAgentsProvider:
+    """Drop-in replacement for AzureAIAgentsProvider that never leaves the process.
+
+    Args:
+        responder: Decides tool calls and replies (defaults to command_responder)
+        model_latency: Seconds to sleep per simulated model round-trip
+        token_latency: Seconds to sleep per streamed reply token
+    """
+
+    # Agents live in memory only, so there is nothing to cache across restarts
+    persistent_agents = False
+
+    def __init__(
+        self,
+        responder: Callable[[str, LocalThread], ScriptedTurn] = command_responder,
+        model_latency: float = 0.0,
+        token_latency: float = 0.0,
+    ):
+        self.responder = responder
+        self.model_latency = model_latency
+        self.token_latency = token_latency
+        self.agents: dict[str, LocalAgent] = {}
+
+    async def __aenter__(self) -> "LocalAgentsProvider":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def create_agent(self, name: str, instructions: str = "", tools: list[Callable] | None = None, **kwargs) -> LocalAgent:
+        """Create an agent (kept in memory only)."""
+        agent = LocalAgent(name, instructions, tools or [], self.responder, self.model_latency, self.token_latency)
+        self.agents[agent.id] = agent
+        return agent
+
+    async def get_agent(self, id: str, *, tools: list[Callable] | None = None, **kwargs) -> LocalAgent:
+        """Look up an agent created earlier by this provider."""
+        agent = self.agents.get(id)
+        if agent is None:
+            raise KeyError(f"No local agent '{id}'")
+        if tools is not None:
+            agent.tools = {getattr(tool, 'name', None) or tool.__name__: tool for tool in tools}
+            agent._prompt_tokens = None
+        return agent
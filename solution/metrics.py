@@ -0,0 +1,352 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+"""
+Tool Metrics
+
+Every agent tool is wrapped with instrument_tool(), which records per call:
+
+    seconds               wall time of the call
+    approval_wait         time spent waiting for the passkey (part of `seconds`)
+    rows_scanned          rows the storage layer parsed or examined for the call
+    bytes_read / written  CSV bytes read from / written to disk for the call
+
+The storage layer reports rows and bytes with record_io(); they are attributed to the
+tool call running in the current context (threads started with asyncio.to_thread
+inherit it). SQLite does its own I/O, so only rows are counted there.
+
+Whole turns are recorded with record_turn(): wall time, time to the first reply token
+(what a kiosk user waits before text starts appearing when replies are streamed), and
+the input/output tokens the turn's model calls consumed, when the provider reports them.
+With the fast-path router on (intent_router.py), record_route() splits turns into the
+ones it answered directly and the ones it passed to the model, for its hit rate. (The
+time it saves is measured by benchmark.py --fast-path, which replays the same
+conversations with the router off.)
+
+Export:
+  - `stats` in the REPL prints a per-tool summary; the server serves GET /metrics
+  - Prometheus text format: format_prometheus(), also written to METRICS_PROMETHEUS_FILE
+    (for node_exporter's textfile collector) by export_metrics()
+  - JSON lines: set METRICS_JSONL_FILE to append one event per tool call
+"""
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+# Recent call durations kept per tool for percentiles
+RECENT_CALLS = 1024
+
+
+@dataclass
+class ToolCall:
+    """Measurements for one tool call in progress."""
+
+    tool: str
+    started: float = field(default_factory=time.perf_counter)
+    seconds: float = 0.0
+    approval_wait: float = 0.0
+    rows_scanned: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    error: bool = False
+
+
+@dataclass
+class ToolStats:
+    """Running totals for one tool."""
+
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    approval_wait: float = 0.0
+    rows_scanned: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    recent: deque = field(default_factory=lambda: deque(maxlen=RECENT_CALLS))
+
+
+_current_call: ContextVar[ToolCall | None] = ContextVar("current_tool_call", default=None)
+
+
+def record_io(rows_scanned: int = 0, bytes_read: int = 0, bytes_written: int = 0) -> None:
+    """Attribute storage work to the tool call running in this context (if any)."""
+    call = _current_call.get()
+    if call is not None:
+        call.rows_scanned += rows_scanned
+        call.bytes_read += bytes_read
+        call.bytes_written += bytes_written
+
+
+def record_approval_wait(seconds: float) -> None:
+    """Attribute time spent waiting for an approval to the current tool call."""
+    call = _current_call.get()
+    if call is not None:
+        call.approval_wait += seconds
+
+
+class MetricsRegistry:
+    """Per-tool totals, histograms and recent durations for every instrumented call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tools: dict[str, ToolStats] = {}
+        self.turns = ToolStats()
+        self.first_token = ToolStats()
+        self.metered_turns = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.routed_turns = ToolStats()
+        self.model_turns = ToolStats()
+
+    def record(self, call: ToolCall) -> None:
+        with self._lock:
+            stats = self.tools.setdefault(call.tool, ToolStats())
+            stats.calls += 1
+            stats.errors += call.error
+            stats.seconds += call.seconds
+            stats.approval_wait += call.approval_wait
+            stats.rows_scanned += call.rows_scanned
+            stats.bytes_read += call.bytes_read
+            stats.bytes_written += call.bytes_written
+            _observe(stats, call.seconds)
+            stats.recent.append(call.seconds - call.approval_wait)
+
+        path = os.getenv("METRICS_JSONL_FILE")
+        if path:
+            event = {
+                "ts": time.time(),
+                "tool": call.tool,
+                "seconds": call.seconds,
+                "approval_wait_seconds": call.approval_wait,
+                "rows_scanned": call.rows_scanned,
+                "bytes_read": call.bytes_read,
+                "bytes_written": call.bytes_written,
+                "error": call.error,
+            }
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+
+    def record_turn(
+        self,
+        seconds: float,
+        time_to_first_token: float | None = None,
+        input_tokens: int | None = None,
+        output_tokens: int | None = None,
+    ) -> None:
+        """Record one user turn: its wall time and, if known, the time to the first reply token and its token usage."""
+        with self._lock:
+            if input_tokens is not None:
+                self.metered_turns += 1
+                self.input_tokens += input_tokens
+                self.output_tokens += output_tokens or 0
+            self.turns.calls += 1
+            self.turns.seconds += seconds
+            _observe(self.turns, seconds)
+            self.turns.recent.append(seconds)
+            if time_to_first_token is not None:
+                self.first_token.calls += 1
+                self.first_token.seconds += time_to_first_token
+                _observe(self.first_token, time_to_first_token)
+                self.first_token.recent.append(time_to_first_token)
+
+    def record_route(self, routed: bool, seconds: float) -> None:
+        """Record one turn seen by the fast-path router: answered directly (routed) or passed to the model."""
+        with self._lock:
+            stats = self.routed_turns if routed else self.model_turns
+            stats.calls += 1
+            stats.seconds += seconds
+            _observe(stats, seconds)
+            stats.recent.append(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.tools = {}
+            self.turns = ToolStats()
+            self.first_token = ToolStats()
+            self.metered_turns = 0
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self.routed_turns = ToolStats()
+            self.model_turns = ToolStats()
+
+    def format_table(self) -> str:
+        """Per-tool summary for the REPL `stats` command (latency excludes approval waits)."""
+        import numpy as np
+
+        with self._lock:
+            items = sorted(self.tools.items(), key=lambda item: item[1].seconds - item[1].approval_wait, reverse=True)
+            if not items and not self.turns.calls:
+                return "\n⚠️  No tool calls recorded yet.\n"
+
+            lines = [
+                "\n" + "=" * 100,
+                "📊 TOOL METRICS (latency excludes approval wait)",
+                "=" * 100,
+                f"{'tool':<34}{'calls':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'rows/call':>11}"
+                f"{'KB read':>10}{'KB written':>12}{'approval s':>12}",
+            ]
+            for name, stats in items:
+                p50, p95 = np.percentile(np.array(stats.recent) * 1000, [50, 95])
+                lines.append(
+                    f"{name:<34}{stats.calls:>6}{stats.errors:>5}{p50:>9.2f}{p95:>9.2f}"
+                    f"{stats.rows_scanned / stats.calls:>11.0f}{stats.bytes_read / 1024:>10.1f}"
+                    f"{stats.bytes_written / 1024:>12.1f}{stats.approval_wait:>12.1f}"
+                )
+            for label, stats in (("whole turns", self.turns), ("time to first token", self.first_token)):
+                if stats.calls:
+                    p50, p95 = np.percentile(np.array(stats.recent) * 1000, [50, 95])
+                    lines.append(f"{label:<34}{stats.calls:>6}{'':>5}{p50:>9.2f}{p95:>9.2f}")
+            if self.metered_turns:
+                lines.append(
+                    f"{'tokens per turn (in / out)':<34}{self.metered_turns:>6}     "
+                    f"{self.input_tokens / self.metered_turns:.0f} / {self.output_tokens / self.metered_turns:.0f}"
+                )
+            routed, to_model = self.routed_turns, self.model_turns
+            if routed.calls:
+                p50, p95 = np.percentile(np.array(routed.recent) * 1000, [50, 95])
+                lines.append(f"{'fast path: routed turns':<34}{routed.calls:>6}{'':>5}{p50:>9.2f}{p95:>9.2f}")
+            if to_model.calls:
+                p50, p95 = np.percentile(np.array(to_model.recent) * 1000, [50, 95])
+                lines.append(f"{'fast path: turns sent to the model':<34}{to_model.calls:>6}{'':>5}{p50:>9.2f}{p95:>9.2f}")
+            if routed.calls:
+                lines.append(f"fast path hit rate {routed.calls / (routed.calls + to_model.calls):.0%}")
+            lines.append("=" * 100 + "\n")
+            return "\n".join(lines)
+
+    def format_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        prefix = "access_agent_tool"
+        counters = [
+            ("calls_total", "Tool calls", lambda s: s.calls),
+            ("errors_total", "Tool calls that failed", lambda s: s.errors),
+            ("approval_wait_seconds_total", "Time spent waiting for approvals", lambda s: s.approval_wait),
+            ("rows_scanned_total", "Rows parsed or examined by the storage layer", lambda s: s.rows_scanned),
+            ("bytes_read_total", "CSV bytes read", lambda s: s.bytes_read),
+            ("bytes_written_total", "CSV bytes written", lambda s: s.bytes_written),
+        ]
+        with self._lock:
+            items = sorted(self.tools.items())
+            lines = []
+            for suffix, help_text, value in counters:
+                lines.append(f"# HELP {prefix}_{suffix} {help_text}.")
+                lines.append(f"# TYPE {prefix}_{suffix} counter")
+                lines.extend(f'{prefix}_{suffix}{{tool="{name}"}} {value(stats)}' for name, stats in items)
+
+            lines.append(f"# HELP {prefix}_duration_seconds Tool call wall time, including approval waits.")
+            lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+            for name, stats in items:
+                lines.extend(_histogram_lines(f"{prefix}_duration_seconds", stats, f'tool="{name}"'))
+
+            for metric, help_text, stats in (
+                ("access_agent_turn_duration_seconds", "User turn wall time", self.turns),
+                ("access_agent_time_to_first_token_seconds", "Time from the user's message to the first reply text", self.first_token),
+            ):
+                lines.append(f"# HELP {metric} {help_text}.")
+                lines.append(f"# TYPE {metric} histogram")
+                lines.extend(_histogram_lines(metric, stats))
+
+            metric = "access_agent_fast_path_turn_duration_seconds"
+            lines.append(f"# HELP {metric} Turns seen by the fast-path router, answered directly (routed) or by the model.")
+            lines.append(f"# TYPE {metric} histogram")
+            for path, stats in (("routed", self.routed_turns), ("model", self.model_turns)):
+                lines.extend(_histogram_lines(metric, stats, f'path="{path}"'))
+
+            for metric, help_text, value in (
+                ("access_agent_metered_turns_total", "User turns with reported token usage", self.metered_turns),
+                ("access_agent_input_tokens_total", "Model input (prompt) tokens", self.input_tokens),
+                ("access_agent_output_tokens_total", "Model output (completion) tokens", self.output_tokens),
+            ):
+                lines.append(f"# HELP {metric} {help_text}.")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _observe(stats: ToolStats, seconds: float) -> None:
+    # Cumulative histogram buckets
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            stats.bucket_counts[i] += 1
+
+
+def _histogram_lines(metric: str, stats: ToolStats, labels: str = "") -> list[str]:
+    sep = "," if labels else ""
+    lines = [f'{metric}_bucket{{{labels}{sep}le="{bound}"}} {count}' for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts)]
+    lines.append(f'{metric}_bucket{{{labels}{sep}le="+Inf"}} {stats.calls}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {stats.seconds}")
+    lines.append(f"{metric}_count{suffix} {stats.calls}")
+    return lines
+
+
+REGISTRY = MetricsRegistry()
+
+
+def export_metrics() -> None:
+    """Write the Prometheus text file, if METRICS_PROMETHEUS_FILE is set."""
+    path = os.getenv("METRICS_PROMETHEUS_FILE")
+    if path:
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(REGISTRY.format_prometheus(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _is_error(result) -> bool:
+    # Tools report failures as "Error ...: ..." strings instead of raising
+    return isinstance(result, str) and result.startswith("Error")
+
+
+def instrument_tool(func):
+    """Wrap a tool (sync or async) so every call is measured and recorded in REGISTRY.
+
+    The wrapper keeps the tool's name, docstring and annotated signature, so the schema
+    the model sees is unchanged.
+    """
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            call = ToolCall(name)
+            token = _current_call.set(call)
+            try:
+                result = await func(*args, **kwargs)
+                call.error = _is_error(result)
+                return result
+            except BaseException:
+                call.error = True
+                raise
+            finally:
+                _current_call.reset(token)
+                call.seconds = time.perf_counter() - call.started
+                REGISTRY.record(call)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        call = ToolCall(name)
+        token = _current_call.set(call)
+        try:
+            result = func(*args, **kwargs)
+            call.error = _is_error(result)
+            return result
+        except BaseException:
+            call.error = True
+            raise
+        finally:
+            _current_call.reset(token)
+            call.seconds = time.perf_counter() - call.started
+            REGISTRY.record(call)
+    return wrapper
@@ -0,0 +1,195 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import secrets
+import string
+import threading
+import weakref
+from collections import deque
+from collections.abc import Callable
+from datetime import date
+
+"""
+Parking Code Allocator
+
+Issues parking validation codes that are guaranteed not to have been issued before.
+Codes are drawn with the `secrets` module and checked against the parking table's
+parking_code index (O(1) per check). A pool of codes can be pre-generated in bulk ahead
+of the morning arrival peak, so issuing a code is just a pop from the pool.
+
+An employee gets one code per day: IssuedTodayIndex maps alias -> the code already
+issued today, so a repeat request is answered from memory without another approval,
+draw or write. It is rebuilt from today's rows only when the day changes or someone
+else (another kiosk) wrote to the parking table.
+"""
+
+PARKING_CODE_ALPHABET = string.ascii_uppercase + string.digits
+PARKING_CODE_LENGTH = 6
+
+
+def draw_parking_code() -> str:
+    """Draw one random 6-character code (letters and numbers) from a CSPRNG."""
+    return ''.join(secrets.choice(PARKING_CODE_ALPHABET) for _ in range(PARKING_CODE_LENGTH))
+
+
+class ParkingCodeAllocator:
+    """Hands out parking codes that are unique across all issued codes.
+
+    A code is unique if it is not in the parking table, not sitting in the pre-generated
+    pool, and not reserved by another in-flight request. The final guarantee across
+    kiosk processes comes from writing the record with
+    table.append(record, unique="parking_code").
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._lock = threading.Lock()
+        self._pool: deque[str] = deque()
+        self._pooled: set[str] = set()
+        self._reserved: set[str] = set()
+
+    def _is_free(self, code: str) -> bool:
+        return (
+            code not in self._pooled
+            and code not in self._reserved
+            and not self.table.contains('parking_code', code)
+        )
+
+    def _draw_unique(self) -> str:
+        """Draw codes until one is free. Caller holds _lock."""
+        while True:
+            code = draw_parking_code()
+            if self._is_free(code):
+                return code
+
+    def pregenerate(self, count: int) -> int:
+        """Add `count` fresh unique codes to the pool (e.g. before the morning peak).
+
+        Returns:
+            The pool size afterwards
+        """
+        with self._lock:
+            for _ in range(count):
+                code = self._draw_unique()
+                self._pool.append(code)
+                self._pooled.add(code)
+            return len(self._pool)
+
+    def reserve(self) -> str:
+        """Reserve and return a unique code, taking it from the pool if one is available.
+
+        Call release() once the record is written (or the request is cancelled).
+        """
+        with self._lock:
+            code = None
+            while self._pool:
+                candidate = self._pool.popleft()
+                self._pooled.discard(candidate)
+                # Another kiosk process may have issued it since it was pooled
+                if not self.table.contains('parking_code', candidate):
+                    code = candidate
+                    break
+            if code is None:
+                code = self._draw_unique()
+            self._reserved.add(code)
+            return code
+
+    def release(self, code: str) -> None:
+        """Drop a reservation (after the record is written, or if it never will be)."""
+        with self._lock:
+            self._reserved.discard(code)
+
+    def __len__(self) -> int:
+        """Number of codes waiting in the pool."""
+        with self._lock:
+            return len(self._pool)
+
+
+_allocators: "weakref.WeakKeyDictionary[object, ParkingCodeAllocator]" = weakref.WeakKeyDictionary()
+_allocators_lock = threading.Lock()
+
+
+def get_parking_code_allocator(table) -> ParkingCodeAllocator:
+    """Return the shared parking code allocator for a parking table, creating it on first use."""
+    with _allocators_lock:
+        allocator = _allocators.get(table)
+        if allocator is None:
+            allocator = ParkingCodeAllocator(table)
+            _allocators[table] = allocator
+        return allocator
+
+
+class IssuedTodayIndex:
+    """Parking codes issued today, by alias (case-insensitive).
+
+    Entries are evicted at the day boundary. The table's version tells whether it
+    changed since the index was built: a write made through issue() moves it by
+    exactly one and is added in place, anything else triggers a rebuild from today's
+    rows (Table.rows_between on date_issued: a binary search of the CSV table's sorted
+    date index, the current month's partition, or an indexed SQLite query).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._lock = threading.Lock()
+        self._day: str | None = None
+        self._version: int | None = None
+        self._codes: dict[str, str] = {}
+
+    def _refresh(self) -> None:
+        """Rebuild the index if the day changed or the table was written to. Caller holds _lock."""
+        today = date.today().isoformat()
+        version = self.table.version
+        if today == self._day and version == self._version:
+            return
+        codes = {}
+        for row in self.table.rows_between("date_issued", today, today):
+            # The first code of the day is the one that counts, as with find()
+            codes.setdefault(row["alias"].lower(), row["parking_code"])
+        self._day, self._version, self._codes = today, version, codes
+
+    def find(self, alias: str) -> str | None:
+        """Return the code already issued to `alias` today, if any."""
+        with self._lock:
+            self._refresh()
+            return self._codes.get(alias.lower())
+
+    def issue(self, alias: str, day: str, write: Callable[[], str]) -> tuple[str, bool]:
+        """Issue a code for `alias` unless it already has one today.
+
+        The check, write() and the index update run under the index lock, so concurrent
+        requests for the same employee in this process end up with a single code, and
+        lookups never see the table ahead of the index (which would force a rebuild).
+
+        Args:
+            alias: The employee
+            day: The date_issued write() uses (YYYY-MM-DD)
+            write: Writes the parking record and returns its code
+
+        Returns:
+            (code, True) if write() issued it, or (today's existing code, False)
+        """
+        with self._lock:
+            self._refresh()
+            existing_code = self._codes.get(alias.lower())
+            if existing_code:
+                return existing_code, False
+            code = write()
+            version = self.table.version
+            if day == self._day and version == self._version + 1:
+                self._codes[alias.lower()] = code
+                self._version = version
+            # Otherwise someone else wrote too (or the day changed); the next find() rebuilds
+            return code, True
+
+
+_issued_today: "weakref.WeakKeyDictionary[object, IssuedTodayIndex]" = weakref.WeakKeyDictionary()
+
+
+def get_issued_today(table) -> IssuedTodayIndex:
+    """Return the shared issued-today index for a parking table, creating it on first use."""
+    with _allocators_lock:
+        index = _issued_today.get(table)
+        if index is None:
+            index = IssuedTodayIndex(table)
+            _issued_today[table] = index
+        return index
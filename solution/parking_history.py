@@ -0,0 +1,636 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+from csv_storage import file_lock, read_csv_rows, write_csv_atomic
+from directory_store import DirectoryStore, get_store
+from metrics import record_io
+
+"""
+Partitioned Parking History
+
+Parking records only ever grow: every generate_parking_code call adds a row, and a
+single parking_records.csv ends up holding years of history that a lookup has to parse
+and keep in memory. With a data/parking_records/ directory the records are split by
+the month of date_issued instead:
+
+    data/parking_records/2026-09.csv       one file per month
+    data/parking_records/2026-10.csv       the current month - the hot partition
+    data/parking_records/2025-01.parquet   closed months, optionally compacted
+    data/parking_records/undated.csv       rows without a valid date_issued
+
+The current month is served by a DirectoryStore like the other tables: it is parsed
+once, indexed by alias and parking code, and new codes are appended to it. Daily work
+(issuing a code, "did dkim get a code today", codes issued per day) only reads this
+month. Closed months are read only when a query needs them, and then only the column
+it asks about: the set of parking codes per month (for the never-issued-before check)
+is read once and cached until the file changes. Expiring old records drops whole
+monthly files instead of rewriting the history.
+
+Closed months can be compacted into a columnar format - Parquet or Arrow IPC, which
+needs `pip install pyarrow` - so reading one column of a month doesn't parse the rest.
+
+    python solution/parking_history.py partition      # split data/parking_records.csv
+    python solution/parking_history.py compact --format parquet
+    python solution/parking_history.py report --days 14
+
+CsvBackend serves the partitioned table automatically once the directory exists; the
+SQLite backend is unaffected (its date_issued index already avoids full scans).
+"""
+
+PARTITION_DIR_NAME = "parking_records"
+UNDATED_PARTITION = "undated"
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+PARTITION_SUFFIXES = (".csv", *COLUMNAR_FORMATS.values())
+
+
+def partition_key(date_issued: str) -> str:
+    """Month partition ("YYYY-MM") of a YYYY-MM-DD date, or "undated" if it isn't one."""
+    if (
+        isinstance(date_issued, str) and len(date_issued) == 10
+        and date_issued[4] == "-" and date_issued[7] == "-"
+        and date_issued[:4].isdigit() and date_issued[5:7].isdigit() and date_issued[8:].isdigit()
+    ):
+        return date_issued[:7]
+    return UNDATED_PARTITION
+
+
+def _signature(path: Path) -> tuple[int, int, int] | None:
+    """(mtime_ns, size, inode) of a partition file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_columnar(path: Path, columns: list[str] | None = None):
+    """Read a Parquet or Arrow IPC partition (optionally only some columns) as a pyarrow Table."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns)
+    import pyarrow.feather as feather
+    return feather.read_table(path, columns=columns)
+
+
+def _write_columnar(path: Path, rows: list[dict[str, str]], columns: list[str]) -> None:
+    """Replace a Parquet or Arrow IPC partition atomically (temp file + os.replace)."""
+    import pyarrow as pa
+
+    table = pa.table({
+        column: pa.array([row.get(column) or "" for row in rows], type=pa.string())
+        for column in columns
+    })
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    try:
+        if path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_name, compression="zstd")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp_name, compression="zstd")
+        with open(tmp_name, "rb") as tmp_file:
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    record_io(bytes_written=os.stat(path).st_size)
+
+
+def read_partition(path: Path) -> tuple[list[str], list[dict[str, str]]]:
+    """Read every row of a partition file, whatever its format.
+
+    Returns:
+        (column names, rows)
+    """
+    if path.suffix == ".csv":
+        columns, rows = read_csv_rows(path)
+    else:
+        table = _read_columnar(path)
+        columns, rows = table.column_names, table.to_pylist()
+    record_io(rows_scanned=len(rows), bytes_read=os.stat(path).st_size)
+    return columns, rows
+
+
+def read_partition_column(path: Path, column: str) -> list[str]:
+    """Read one column of a partition file (columnar formats skip the other columns)."""
+    if path.suffix == ".csv":
+        _, rows = read_csv_rows(path)
+        values = [row.get(column, "") for row in rows]
+    else:
+        values = [value or "" for value in _read_columnar(path, [column]).column(column).to_pylist()]
+    record_io(rows_scanned=len(values), bytes_read=os.stat(path).st_size)
+    return values
+
+
+def write_partition(path: Path, rows: list[dict[str, str]], columns: list[str]) -> None:
+    """Replace a partition file in its own format; an empty partition is deleted."""
+    if not rows:
+        path.unlink(missing_ok=True)
+    elif path.suffix == ".csv":
+        write_csv_atomic(path, rows, columns)
+    else:
+        _write_columnar(path, rows, columns)
+
+
+class PartitionedParkingTable:
+    """Parking records split into one file per month of date_issued (see module docstring).
+
+    Implements the same Table operations as DirectoryStore and SqliteTable. "First
+    match" means the oldest partition first, then file order, as in a single file.
+
+    Args:
+        directory: The partition directory (e.g. data/parking_records)
+        columns: Column order of new partition files
+        key_columns: Columns lookups are done on
+        date_column: The column rows are partitioned by
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        columns: list[str],
+        key_columns: tuple[str, ...] = ("alias", "parking_code"),
+        date_column: str = "date_issued",
+    ):
+        self.directory = Path(directory).resolve()
+        self.columns = list(columns)
+        self.key_columns = key_columns
+        self.date_column = date_column
+        self._lock = threading.Lock()
+        # Lowercased values of a key column in each closed partition, and row counts,
+        # keyed by file and valid while the file's signature is unchanged
+        self._value_sets: dict[tuple[Path, str], tuple[tuple, set[str]]] = {}
+        self._row_counts: dict[Path, tuple[tuple, int]] = {}
+        # Partition files and their signatures, valid while the directory is unchanged
+        self._dir_signature: tuple | None = None
+        self._listing: dict[Path, tuple] | None = None
+        self._hot: tuple[str | None, Path | None] = (None, None)
+        self._version = 0
+        self._snapshot: tuple | None = None
+        self._hot_seen: tuple[DirectoryStore | None, int] = (None, 0)
+
+    def hot_key(self) -> str:
+        """The current month's partition key - the one kept in memory."""
+        return date.today().isoformat()[:7]
+
+    def _hot_path(self) -> Path:
+        key = self.hot_key()
+        if self._hot[0] != key:
+            self._hot = (key, self.directory / f"{key}.csv")
+        return self._hot[1]
+
+    def _hot_store(self) -> DirectoryStore:
+        return get_store(self._hot_path(), key_columns=self.key_columns, columns=self.columns)
+
+    def _partition_signatures(self) -> dict[Path, tuple]:
+        """Every partition file and its signature, oldest month first (undated rows last).
+
+        Closed partitions are only ever replaced (os.replace) or deleted, and both change
+        the directory's mtime, so the listing is only re-read when the directory changes
+        instead of stat-ing every month on every lookup. The current month, which is
+        appended to in place, is tracked by its DirectoryStore.
+        """
+        dir_signature = _signature(self.directory)
+        with self._lock:
+            if self._listing is not None and dir_signature == self._dir_signature:
+                return self._listing
+
+        listing = {}
+        if dir_signature is not None:
+            paths = [
+                self.directory / name for name in os.listdir(self.directory)
+                if not name.startswith(".") and Path(name).suffix in PARTITION_SUFFIXES
+            ]
+            for path in sorted(paths, key=lambda path: (path.stem == UNDATED_PARTITION, path.stem, path.suffix)):
+                signature = _signature(path)
+                if signature is not None:
+                    listing[path] = signature
+        with self._lock:
+            self._dir_signature, self._listing = dir_signature, listing
+        return listing
+
+    def _forget_listing(self) -> None:
+        """Re-read the listing on next use (after changing a partition; mtimes are coarse)."""
+        with self._lock:
+            self._listing = None
+
+    def partitions(self) -> list[Path]:
+        """Every partition file, oldest month first (undated rows last)."""
+        return list(self._partition_signatures())
+
+    def _partition_path(self, key: str) -> Path:
+        """The file holding a month: the existing one in any format, else a new CSV file."""
+        if key == self.hot_key():
+            return self._hot_path()
+        for suffix in PARTITION_SUFFIXES:
+            path = self.directory / f"{key}{suffix}"
+            if path.exists():
+                return path
+        return self.directory / f"{key}.csv"
+
+    def _values(self, path: Path, column: str, signature: tuple | None = None) -> set[str]:
+        """Lowercased values of a key column in a closed partition, cached until the file changes."""
+        signature = signature or self._partition_signatures().get(path)
+        if signature is None:
+            return set()
+        with self._lock:
+            cached = self._value_sets.get((path, column))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        values = read_partition_column(path, column)
+        value_set = {value.lower() for value in values if value}
+        with self._lock:
+            self._value_sets[(path, column)] = (signature, value_set)
+            self._row_counts[path] = (signature, len(values))
+        return value_set
+
+    def _holds(self, path: Path, column: str, value: str) -> bool:
+        """Whether a partition has a row whose `column` equals `value` (case-insensitive)."""
+        if path == self._hot_path():
+            return self._hot_store().contains(column, value)
+        return value.lower() in self._values(path, column)
+
+    def _closed_hold(self, column: str, value: str, exclude: Path | None = None) -> bool:
+        """Whether any closed partition (other than `exclude`) has `column` equal to `value`."""
+        hot_path = self._hot_path()
+        key = value.lower()
+        return any(
+            key in self._values(path, column, signature)
+            for path, signature in self._partition_signatures().items()
+            if path != hot_path and path != exclude
+        )
+
+    def _rewrite(self, path: Path, mutation):
+        """Read-modify-write a closed partition under its file lock. Returns mutation's result."""
+        with file_lock(path):
+            rows = read_partition(path)[1] if path.exists() else []
+            before = [dict(row) for row in rows]
+            result = mutation(rows)
+            if rows != before:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                write_partition(path, rows, self.columns)
+                self._forget_listing()
+        return result
+
+    def find(self, column: str, value: str) -> dict[str, str] | None:
+        """Return a copy of the first row whose `column` equals `value` (case-insensitive)."""
+        for path in self.partitions():
+            if not self._holds(path, column, value):
+                continue
+            if path == self._hot_path():
+                return self._hot_store().find(column, value)
+            for row in read_partition(path)[1]:
+                if (row.get(column) or "").lower() == value.lower():
+                    return {name: row.get(name) or "" for name in self.columns}
+        return None
+
+    def contains(self, column: str, value: str) -> bool:
+        """Check whether any row has `column` equal to `value`. The current month is checked first."""
+        return self._hot_store().contains(column, value) or self._closed_hold(column, value)
+
+    def append(self, row: dict[str, str], unique: str | None = None) -> bool:
+        """Append a row to its month's partition. See append_many."""
+        return self.append_many([row], unique=unique)[0]
+
+    def append_many(self, rows: list[dict[str, str]], unique: str | None = None) -> list[bool]:
+        """Append rows to their months' partitions, one write per partition.
+
+        Rows for the current month (normally all of them) are appended through the hot
+        partition's DirectoryStore. Rows for another month are merged into that
+        partition with a rewrite, which only happens for back-filled history.
+
+        Args:
+            rows: The new rows, in order
+            unique: Optional key column whose values must not exist yet - in any
+                partition, nor earlier in `rows`. The target partition is checked under
+                its file lock; the others are closed months that kiosks don't write to.
+
+        Returns:
+            One flag per row: True if it was written, False if the unique check failed
+        """
+        written = [False] * len(rows)
+        batches: dict[Path, list[int]] = {}
+        batch_keys = set()
+        for position, row in enumerate(rows):
+            path = self._partition_path(partition_key(row.get(self.date_column, "")))
+            if unique is not None:
+                key = (row.get(unique) or "").lower()
+                if key in batch_keys:
+                    continue
+                batch_keys.add(key)
+                hot_path = self._hot_path()
+                if (path != hot_path and self._hot_store().contains(unique, key)) or self._closed_hold(unique, key, exclude=path):
+                    continue
+            batches.setdefault(path, []).append(position)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path, positions in batches.items():
+            batch = [rows[position] for position in positions]
+            if path == self._hot_path():
+                flags = self._hot_store().append_many(batch, unique=unique)
+            else:
+                def mutation(partition_rows: list[dict[str, str]], batch=batch) -> list[bool]:
+                    taken = {(row.get(unique) or "").lower() for row in partition_rows} if unique else set()
+                    flags = []
+                    for row in batch:
+                        flag = not unique or (row.get(unique) or "").lower() not in taken
+                        if flag:
+                            partition_rows.append({column: row.get(column, "") for column in self.columns})
+                        flags.append(flag)
+                    return flags
+                flags = self._rewrite(path, mutation)
+            for position, flag in zip(positions, flags):
+                written[position] = flag
+        return written
+
+    def update(self, column, value, changes) -> dict[str, str] | None:
+        """Update the first row whose `column` equals `value` (see DirectoryStore.update).
+
+        The row stays in its partition, so changes shouldn't move date_issued to another month.
+        """
+        for path in self.partitions():
+            if not self._holds(path, column, value):
+                continue
+            if path == self._hot_path():
+                return self._hot_store().update(column, value, changes)
+
+            def mutation(rows: list[dict[str, str]]) -> dict[str, str] | None:
+                for row in rows:
+                    if (row.get(column) or "").lower() == value.lower():
+                        row.update(changes(dict(row)) if callable(changes) else changes)
+                        return dict(row)
+                return None
+            updated = self._rewrite(path, mutation)
+            if updated is not None:
+                return updated
+        return None
+
+    def remove(self, column: str, value: str) -> int:
+        """Remove every row whose `column` equals `value`; only partitions holding it are rewritten."""
+        removed = 0
+        for path in self.partitions():
+            if not self._holds(path, column, value):
+                continue
+            if path == self._hot_path():
+                removed += self._hot_store().remove(column, value)
+                continue
+
+            def mutation(rows: list[dict[str, str]]) -> int:
+                kept = [row for row in rows if (row.get(column) or "").lower() != value.lower()]
+                count = len(rows) - len(kept)
+                rows[:] = kept
+                return count
+            removed += self._rewrite(path, mutation)
+        return removed
+
+    def remove_older_than(self, column: str, cutoff: str) -> list[dict[str, str]]:
+        """Remove every row dated before `cutoff` (YYYY-MM-DD).
+
+        On the partition column, whole months before the cutoff's month are deleted as
+        files and only the cutoff's own month is rewritten. Rows with a missing date
+        are kept.
+        """
+        cutoff_key = partition_key(cutoff)
+        removed = []
+        for path in self.partitions():
+            if column == self.date_column and (path.stem == UNDATED_PARTITION or path.stem > cutoff_key):
+                continue
+            if path == self._hot_path():
+                removed.extend(self._hot_store().remove_older_than(column, cutoff))
+                continue
+            if column == self.date_column and path.stem < cutoff_key:
+                with file_lock(path):
+                    removed.extend({name: row.get(name) or "" for name in self.columns} for row in read_partition(path)[1])
+                    path.unlink()
+                self._forget_listing()
+                continue
+
+            def mutation(rows: list[dict[str, str]]) -> list[dict[str, str]]:
+                expired = [row for row in rows if (row.get(column) or "") and row[column] < cutoff]
+                if expired:
+                    rows[:] = [row for row in rows if not ((row.get(column) or "") and row[column] < cutoff)]
+                return expired
+            removed.extend(self._rewrite(path, mutation))
+        return removed
+
+    def rows(self) -> list[dict[str, str]]:
+        """Return a snapshot of all rows, oldest partition first."""
+        selected = []
+        for path in self.partitions():
+            if path == self._hot_path():
+                selected.extend(self._hot_store().rows())
+            else:
+                selected.extend({name: row.get(name) or "" for name in self.columns} for row in read_partition(path)[1])
+        return selected
+
+    def rows_between(self, column: str, start: str | None = None, end: str | None = None) -> list[dict[str, str]]:
+        """Rows whose `column` is from `start` to `end` (inclusive; None = unbounded).
+
+        On date_issued, only the partitions of the months in range are read - the
+        current month alone for "today".
+        """
+        selected = []
+        partitions = self._partitions_between(start, end) if column == self.date_column else self.partitions()
+        for path in partitions:
+            if path == self._hot_path():
+                selected.extend(self._hot_store().rows_between(column, start, end))
+                continue
+            for row in read_partition(path)[1]:
+                value = row.get(column) or ""
+                if value and (start is None or value >= start) and (end is None or value <= end):
+                    selected.append({name: row.get(name) or "" for name in self.columns})
+        return selected
+
+    def column_values(self, column: str) -> list[str]:
+        """One column of every record, oldest partition first, reading only that column."""
+        values = []
+        for path in self.partitions():
+            if path == self._hot_path():
+                values.extend(self._hot_store().column_values(column))
+            else:
+                values.extend(read_partition_column(path, column))
+        return values
+
+    def issued_per_day(self, start: str, end: str) -> dict[str, int]:
+        """Number of rows per date_issued from `start` to `end` (inclusive), reading only that column."""
+        counts = Counter()
+        for path in self._partitions_between(start, end):
+            if path == self._hot_path():
+                dates = self._hot_store().column_values(self.date_column)
+            else:
+                dates = read_partition_column(path, self.date_column)
+            counts.update(day for day in dates if start <= day <= end)
+        return dict(sorted(counts.items()))
+
+    def _partitions_between(self, start: str | None, end: str | None) -> list[Path]:
+        return [
+            path for path in self.partitions()
+            if path.stem != UNDATED_PARTITION
+            and (start is None or path.stem >= start[:7])
+            and (end is None or path.stem <= end[:7])
+        ]
+
+    @property
+    def version(self) -> int:
+        """Counter that increases whenever the records change.
+
+        Like DirectoryStore.version, it moves by exactly one for each write to the
+        current month made through this table, and by at least one for any other
+        change (another process's write, a closed month rewritten or removed).
+        """
+        hot_store = self._hot_store()
+        hot_version = hot_store.version
+        closed = tuple(item for item in self._partition_signatures().items() if item[0] != hot_store.path)
+        with self._lock:
+            if closed != self._snapshot:
+                self._snapshot = closed
+                self._version += 1
+            seen_store, seen_version = self._hot_seen
+            if seen_store is hot_store:
+                self._version += hot_version - seen_version
+            elif seen_store is not None:
+                # A new month started
+                self._version += 1
+            self._hot_seen = (hot_store, hot_version)
+            return self._version
+
+    def __len__(self) -> int:
+        hot_path = self._hot_path()
+        total = len(self._hot_store())
+        for path in self.partitions():
+            if path == hot_path:
+                continue
+            signature = self._partition_signatures().get(path)
+            with self._lock:
+                cached = self._row_counts.get(path)
+            if cached is None or cached[0] != signature:
+                self._values(path, self.key_columns[0])
+                with self._lock:
+                    cached = self._row_counts.get(path, (signature, 0))
+            total += cached[1]
+        return total
+
+
+# One shared table per directory, so the parking code allocator (keyed by table) and
+# the cached partition columns are shared by every tool call in the process
+_tables: dict[Path, PartitionedParkingTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_parking_history(
+    directory: Path,
+    columns: list[str],
+    key_columns: tuple[str, ...] = ("alias", "parking_code"),
+) -> PartitionedParkingTable:
+    """Return the shared PartitionedParkingTable for a partition directory, creating it on first use."""
+    key = Path(directory).resolve()
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = PartitionedParkingTable(key, columns, key_columns=key_columns)
+            _tables[key] = table
+        return table
+
+
+def partition_parking_records(data_dir: Path, date_column: str = "date_issued") -> dict[str, int]:
+    """Split data_dir/parking_records.csv into monthly partition files.
+
+    The original file is renamed to parking_records.csv.bak afterwards, so the records
+    exist in one place only.
+
+    Returns:
+        Rows written per partition
+    """
+    data_dir = Path(data_dir)
+    source = data_dir / f"{PARTITION_DIR_NAME}.csv"
+    directory = data_dir / PARTITION_DIR_NAME
+    if directory.exists() and any(directory.iterdir()):
+        raise FileExistsError(f"{directory} already holds partitions")
+
+    with file_lock(source):
+        columns, rows = read_csv_rows(source)
+        by_month: dict[str, list[dict[str, str]]] = {}
+        for row in rows:
+            by_month.setdefault(partition_key(row.get(date_column, "")), []).append(row)
+
+        directory.mkdir(parents=True, exist_ok=True)
+        for key, partition_rows in by_month.items():
+            write_csv_atomic(directory / f"{key}.csv", partition_rows, columns)
+        os.replace(source, source.with_name(f"{source.name}.bak"))
+    return {key: len(partition_rows) for key, partition_rows in sorted(by_month.items())}
+
+
+def compact_partitions(directory: Path, fmt: str = "parquet") -> dict[str, int]:
+    """Convert the CSV partitions of closed months to a columnar format.
+
+    The current month and undated rows stay CSV, since kiosks append to them. Needs pyarrow.
+
+    Args:
+        directory: The partition directory
+        fmt: "parquet" or "arrow" (Arrow IPC)
+
+    Returns:
+        Rows converted per partition
+    """
+    suffix = COLUMNAR_FORMATS[fmt]
+    hot_key = date.today().strftime("%Y-%m")
+    converted = {}
+    for path in sorted(Path(directory).glob("*.csv")):
+        if path.stem in (hot_key, UNDATED_PARTITION) or path.name.startswith("."):
+            continue
+        with file_lock(path):
+            columns, rows = read_csv_rows(path)
+            _write_columnar(path.with_suffix(suffix), rows, columns)
+            path.unlink()
+        converted[path.stem] = len(rows)
+    return converted
+
+
+def main() -> None:
+    """Command-line entry point: partition, compact or report on the parking history."""
+    default_data_dir = Path(__file__).parent.parent / "data"
+
+    parser = argparse.ArgumentParser(description="Manage the partitioned parking record history.")
+    parser.add_argument("command", choices=["partition", "compact", "report"],
+                        help="partition: split parking_records.csv by month, compact: closed months to a "
+                             "columnar format, report: codes issued per day")
+    parser.add_argument("--data-dir", type=Path, default=default_data_dir, help="Directory with the data files")
+    parser.add_argument("--format", choices=sorted(COLUMNAR_FORMATS), default="parquet", help="Format for compact")
+    parser.add_argument("--days", type=int, default=7, help="Days covered by report, up to today")
+    args = parser.parse_args()
+
+    directory = args.data_dir / PARTITION_DIR_NAME
+    started = time.perf_counter()
+    if args.command == "partition":
+        counts = partition_parking_records(args.data_dir)
+        print(f"✅ Split {sum(counts.values()):,} parking records into {len(counts)} partitions in {directory}")
+    elif args.command == "compact":
+        counts = compact_partitions(directory, args.format)
+        print(f"✅ Compacted {len(counts)} closed months ({sum(counts.values()):,} rows) to {args.format}")
+    else:
+        from storage import DATASETS
+
+        today = date.today()
+        start = (today - timedelta(days=args.days - 1)).isoformat()
+        table = get_parking_history(directory, DATASETS["parking_records"]["columns"])
+        for day, count in table.issued_per_day(start, today.isoformat()).items():
+            print(f"{day}  {count:>6} codes")
+    print(f"   ({time.perf_counter() - started:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
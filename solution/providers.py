@@ -0,0 +1,67 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Protocol
+
+"""
+Agent Providers
+
+The agent runs on whatever provider open_provider() hands out, selected with
+AGENT_PROVIDER in .env (or the `kind` argument):
+
+    azure - AzureAIAgentsProvider with DefaultAzureCredential (default)
+    local - the offline stand-in from local_provider.py (tests, benchmarks, demos)
+
+Anything with the same shape as AgentsProvider below can be plugged in the same way.
+"""
+
+PROVIDER_KINDS = ("azure", "local")
+
+
+class AgentsProvider(Protocol):
+    """What the agent code needs from a provider.
+
+    Providers may also set `persistent_agents = False` when their agents only live in
+    this process, so the agent definition cache (agent_cache.py) skips them.
+    """
+
+    async def create_agent(self, name: str, *, instructions: str | None = None, tools: Any = None, **kwargs) -> Any: ...
+
+    async def get_agent(self, id: str, *, tools: Any = None, **kwargs) -> Any: ...
+
+
+@asynccontextmanager
+async def open_provider(kind: str | None = None, **local_options) -> AsyncIterator[AgentsProvider]:
+    """Open an agents provider for the lifetime of the `async with` block.
+
+    Args:
+        kind: "azure" or "local" (defaults to AGENT_PROVIDER, else "azure")
+        local_options: Passed to LocalAgentsProvider (responder, model_latency, token_latency)
+    """
+    kind = (kind or os.getenv("AGENT_PROVIDER", "azure")).strip().lower()
+
+    if kind == "local":
+        from local_provider import LocalAgentsProvider
+        async with LocalAgentsProvider(**local_options) as provider:
+            yield provider
+
+    elif kind == "azure":
+        from agent_framework.azure import AzureAIAgentsProvider
+        from azure.identity.aio import DefaultAzureCredential
+
+        # Use DefaultAzureCredential which tries multiple authentication methods:
+        # 1. Environment variables (AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET)
+        # 2. Managed Identity
+        # 3. Azure CLI (az login)
+        # 4. Visual Studio Code
+        # 5. Azure PowerShell
+        async with (
+            DefaultAzureCredential() as credential,
+            AzureAIAgentsProvider(credential=credential) as provider,
+        ):
+            yield provider
+
+    else:
+        raise ValueError(f"Unknown AGENT_PROVIDER '{kind}' (expected one of {', '.join(PROVIDER_KINDS)})")
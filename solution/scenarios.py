@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import random
+from dataclasses import dataclass
+
+from local_provider import ScriptedTurn, ToolCall
+
+"""
+Scripted Conversations
+
+Conversations for the offline LocalAgentsProvider: each user message is paired with
+the tool calls and reply a well-behaved model would produce, so whole conversations
+can be replayed without Azure. readme_scenarios() are the four test scenarios from
+README_HACKATHON.md against the shipped data/; synthetic_scenarios() generates
+realistic kiosk traffic against any directory for load runs and benchmarks.
+
+    thread = agent.get_new_thread(script=scenario.script())
+    for message in scenario.messages():
+        await agent.run(message, thread=thread)
+"""
+
+
+@dataclass
+class Scenario:
+    """A scripted conversation: (user message, what the model does) per turn."""
+
+    name: str
+    turns: list[tuple[str, ScriptedTurn]]
+
+    def messages(self) -> list[str]:
+        """The user messages, in order."""
+        return [message for message, _ in self.turns]
+
+    def script(self) -> list[ScriptedTurn]:
+        """The model's side of the conversation, in order."""
+        return [turn for _, turn in self.turns]
+
+
+def _say(text: str) -> ScriptedTurn:
+    return ScriptedTurn(text=text)
+
+
+def _call(text: str, *calls: tuple[str, dict]) -> ScriptedTurn:
+    return ScriptedTurn([ToolCall(name, arguments) for name, arguments in calls], text)
+
+
+def readme_scenarios() -> list[Scenario]:
+    """The four test scenarios from README_HACKATHON.md."""
+    return [
+        Scenario("existing_employee", [
+            ("Hi!", _say("Hello and welcome! Are you an employee or a guest?")),
+            ("Employee", _say("Great! What is your alias?")),
+            ("jsmith", _call(
+                "Welcome back, John Smith! Will you need parking today?",
+                ("check_employee_exists", {"alias": "jsmith"}),
+            )),
+            ("Yes", _call(
+                "Here is your parking code - enter it in the ParkRTC app.",
+                ("generate_parking_code", {"alias": "jsmith"}),
+            )),
+        ]),
+        Scenario("new_guest", [
+            ("I'm a guest", _say("Welcome! What are your first and last name?")),
+            ("Tony Stark", _call(
+                "I couldn't find you in our guest list. Would you like me to add you?",
+                ("check_guest_exists", {"first_name": "Tony", "last_name": "Stark"}),
+            )),
+            ("Yes, alias tstark", _call(
+                "You're registered! For parking, please use the ParkRTC app to pay. "
+                "Park in Zone 200 in the Purple Garage.",
+                ("add_guest", {"first_name": "Tony", "last_name": "Stark", "alias": "tstark"}),
+            )),
+        ]),
+        Scenario("expired_guest", [
+            ("I'm a guest", _say("Welcome! What are your first and last name?")),
+            ("Daniel Moore", _call(
+                "Your guest access has expired. May I proceed with re-registering you in our "
+                "system with a new auto-generated alias?",
+                ("check_guest_exists", {"first_name": "Daniel", "last_name": "Moore"}),
+            )),
+            ("Yes", _call(
+                "You're re-registered with a new alias. For parking, please use the ParkRTC app "
+                "to pay. Park in Zone 200 in the Purple Garage.",
+                ("remove_expired_guest", {"first_name": "Daniel", "last_name": "Moore"}),
+                ("add_guest_with_auto_alias", {"first_name": "Daniel", "last_name": "Moore"}),
+            )),
+        ]),
+        Scenario("badge_access", [
+            ("I'm jsmith", _call(
+                "Welcome back, John Smith!",
+                ("check_employee_exists", {"alias": "jsmith"}),
+            )),
+            ("What floors can I access?", _call(
+                "Floor 1 is open to everyone; here is your badge access.",
+                ("check_badge_access", {"alias": "jsmith"}),
+            )),
+            ("I need access to floor 5", _call(
+                "Done - your badge access is updated.",
+                ("update_badge_access", {"alias": "jsmith", "floors": "5"}),
+            )),
+        ]),
+    ]
+
+
+def synthetic_scenarios(storage, count: int, seed: int = 0) -> list[Scenario]:
+    """Generate `count` kiosk conversations against the people in `storage`.
+
+    The mix is weighted like a morning rush: mostly employees checking in and asking for
+    parking, some badge requests, returning guests and first-time guests.
+    """
+    rng = random.Random(seed)
+    employees = storage.employees.rows()
+    guests = storage.guests.rows()
+    scenarios = []
+
+    for i in range(count):
+        kind = rng.choices(
+            ["employee_parking", "employee_badge", "returning_guest", "new_guest"],
+            weights=[50, 20, 20, 10],
+        )[0]
+
+        if kind == "employee_parking" and employees:
+            alias = rng.choice(employees)["alias"]
+            scenarios.append(Scenario(kind, [
+                (f"I'm employee {alias}", _call(
+                    "Welcome back! Will you need parking today?",
+                    ("check_employee_exists", {"alias": alias}),
+                )),
+                ("Yes please", _call(
+                    "Here is your parking code.",
+                    ("generate_parking_code", {"alias": alias}),
+                )),
+            ]))
+
+        elif kind == "employee_badge" and employees:
+            alias = rng.choice(employees)["alias"]
+            floors = ",".join(str(floor) for floor in sorted(rng.sample(range(2, 8), rng.randint(1, 3))))
+            scenarios.append(Scenario(kind, [
+                (f"I'm {alias}, which floors can I access?", _call(
+                    "Here is your badge access.",
+                    ("check_employee_exists", {"alias": alias}),
+                    ("check_badge_access", {"alias": alias}),
+                )),
+                (f"I need floors {floors}", _call(
+                    "Your badge access is updated.",
+                    ("update_badge_access", {"alias": alias, "floors": floors}),
+                )),
+            ]))
+
+        elif kind == "returning_guest" and guests:
+            first_name, _, last_name = rng.choice(guests)["name"].partition(" ")
+            scenarios.append(Scenario(kind, [
+                (f"I'm a guest, {first_name} {last_name}", _call(
+                    "Thanks! Park in Zone 200 in the Purple Garage.",
+                    ("check_guest_exists", {"first_name": first_name, "last_name": last_name}),
+                )),
+            ]))
+
+        else:
+            first_name, last_name = f"Visitor{seed}x{i}", rng.choice(["Lee", "Patel", "Garcia", "Nguyen", "Smith"])
+            alias = f"{first_name[0].lower()}{last_name.lower()}{seed}x{i}"
+            scenarios.append(Scenario("new_guest", [
+                (f"I'm a guest, {first_name} {last_name}", _call(
+                    "I couldn't find you. Shall I register you?",
+                    ("check_guest_exists", {"first_name": first_name, "last_name": last_name}),
+                )),
+                (f"Yes, alias {alias}", _call(
+                    "You're registered! Park in Zone 200 in the Purple Garage.",
+                    ("add_guest", {"first_name": first_name, "last_name": last_name, "alias": alias}),
+                )),
+            ]))
+
+    return scenarios
@@ -0,0 +1,447 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any
+
+from approvals import QueueApprover, get_approver, set_approver
+from metrics import REGISTRY
+from providers import PROVIDER_KINDS, open_provider
+from turn_trace import TurnHistory
+
+"""
+Multi-Session Kiosk Server
+
+Serves many kiosks from one process: a single provider and agent are shared, and each
+kiosk gets its own session (conversation thread + recent turn traces). Turns run
+concurrently up to --max-concurrent-runs; up to --max-queued-runs more wait for a slot,
+and anything beyond that is rejected with 503 + Retry-After instead of piling up.
+
+    python solution/server.py                      # Azure AI agent
+    python solution/server.py --provider local     # offline stand-in (tests, load runs)
+
+HTTP API (JSON bodies, one request per connection):
+
+    POST   /sessions                    -> {"session_id": ...}
+    POST   /sessions/{id}/messages      {"text": "..."} -> {"reply", "tool_calls", ...}
+    GET    /sessions/{id}               -> session info and the last turn's tool calls
+    GET    /sessions/{id}/turns         -> the session's recent turns (TURN_HISTORY_SIZE)
+    DELETE /sessions/{id}
+    GET    /approvals                   -> write operations waiting for the passkey
+    POST   /approvals/{request_id}      {"passkey": "..."}
+    GET    /health                      -> load and session counts
+    GET    /metrics                     -> per-tool metrics, Prometheus text format
+
+Write approvals default to APPROVAL_MODE=queue here: a turn that needs approval waits
+(holding its run slot) until an admin answers via /approvals, so also set
+APPROVAL_TIMEOUT_SECONDS to keep unanswered requests from holding slots forever.
+"""
+
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class ServerBusy(Exception):
+    """Raised when the server can't accept more work right now."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SessionNotFound(KeyError):
+    """Raised for an unknown (or evicted) session id."""
+
+
+class TurnInProgress(Exception):
+    """Raised when a session is sent a message while its previous turn is still running."""
+
+
+@dataclass
+class Session:
+    """Per-kiosk conversation state."""
+
+    session_id: str
+    thread: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+    history: TurnHistory = field(default_factory=TurnHistory)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SessionManager:
+    """Multiplexes many conversation threads over one shared agent.
+
+    Args:
+        agent: The shared agent (anything with get_new_thread() and async run(text, thread=...))
+        max_sessions: Open sessions allowed at once (idle ones are evicted first)
+        max_concurrent_runs: Turns allowed to run at the same time
+        max_queued_runs: Turns allowed to wait for a run slot before new ones get ServerBusy
+        idle_timeout: Seconds without activity before a session is evicted
+    """
+
+    def __init__(
+        self,
+        agent,
+        max_sessions: int = 1000,
+        max_concurrent_runs: int = 8,
+        max_queued_runs: int = 32,
+        idle_timeout: float = 15 * 60,
+    ):
+        self.agent = agent
+        self.max_sessions = max_sessions
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_queued_runs = max_queued_runs
+        self.idle_timeout = idle_timeout
+        self.sessions: dict[str, Session] = {}
+        self._run_slots = asyncio.Semaphore(max_concurrent_runs)
+        # Turns admitted (running or waiting for a slot); only touched on the event loop
+        self._admitted = 0
+        self._running = 0
+        self.completed_turns = 0
+        self.rejected_turns = 0
+
+    def create(self) -> Session:
+        """Open a new session with its own conversation thread."""
+        if len(self.sessions) >= self.max_sessions:
+            self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            raise ServerBusy(f"Too many open sessions ({self.max_sessions})", retry_after=30)
+
+        session = Session(uuid.uuid4().hex, self.agent.get_new_thread())
+        self.sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """Return an open session."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+
+    def close(self, session_id: str) -> None:
+        """Close a session and drop its thread."""
+        if self.sessions.pop(session_id, None) is None:
+            raise SessionNotFound(session_id)
+
+    def evict_idle(self) -> int:
+        """Close sessions idle for longer than idle_timeout. Returns how many were closed."""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [
+            session_id for session_id, session in self.sessions.items()
+            if session.last_active < cutoff and not session.lock.locked()
+        ]
+        for session_id in idle:
+            del self.sessions[session_id]
+        return len(idle)
+
+    async def run_turn(self, session_id: str, text: str) -> dict:
+        """Run one user message through the shared agent on the session's thread.
+
+        Returns:
+            The reply text, the tool calls made, and how long the turn waited and ran
+
+        Raises:
+            SessionNotFound: Unknown session
+            TurnInProgress: The session's previous turn hasn't finished
+            ServerBusy: All run slots and queue places are taken
+        """
+        session = self.get(session_id)
+        if session.lock.locked():
+            raise TurnInProgress(session_id)
+        if self._admitted >= self.max_concurrent_runs + self.max_queued_runs:
+            self.rejected_turns += 1
+            raise ServerBusy("Server is at capacity, try again shortly")
+
+        self._admitted += 1
+        try:
+            async with session.lock:
+                session.last_active = time.monotonic()
+                queued_at = time.perf_counter()
+                async with self._run_slots:
+                    started_at = time.perf_counter()
+                    self._running += 1
+                    trace = session.history.start(text)
+                    try:
+                        result = await self.agent.run(text, thread=session.thread)
+                    finally:
+                        self._running -= 1
+                    finished_at = time.perf_counter()
+
+                trace.observe_response(result)
+                # AgentResponse object has a text property or can be converted to string
+                trace.finish(str(result) if not hasattr(result, 'text') else result.text)
+                REGISTRY.record_turn(trace.duration, trace.time_to_first_token, trace.input_tokens, trace.output_tokens)
+                session.last_active = time.monotonic()
+                self.completed_turns += 1
+        finally:
+            self._admitted -= 1
+
+        return {
+            "turn": trace.number,
+            "reply": trace.reply,
+            "tool_calls": [call.to_dict() for call in trace.tool_calls],
+            "queued_seconds": started_at - queued_at,
+            "run_seconds": finished_at - started_at,
+        }
+
+    def stats(self) -> dict:
+        """Load and session counts for /health."""
+        return {
+            "sessions": len(self.sessions),
+            "running_turns": self._running,
+            "queued_turns": self._admitted - self._running,
+            "max_concurrent_runs": self.max_concurrent_runs,
+            "max_queued_runs": self.max_queued_runs,
+            "completed_turns": self.completed_turns,
+            "rejected_turns": self.rejected_turns,
+        }
+
+
+# ============================================================================
+# 🌐 MINIMAL HTTP/1.1 FRONT END (stdlib asyncio, no web framework)
+# ============================================================================
+
+class HttpError(Exception):
+    """An error response: status code, message and optional extra headers."""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict]:
+    """Read one HTTP request. Returns (method, path, json_body)."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_REQUEST_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body over {MAX_REQUEST_BYTES} bytes")
+
+    body = {}
+    if length:
+        try:
+            body = json.loads(await reader.readexactly(length))
+        except json.JSONDecodeError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+    return method.upper(), path.split("?", 1)[0], body
+
+
+def write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict | str, headers: dict | None = None) -> None:
+    """Write a JSON (or, for str payloads, plain text) response; the connection is closed afterwards."""
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+        content_type = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        content_type = "application/json; charset=utf-8"
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+        *(f"{name}: {value}" for name, value in (headers or {}).items()),
+    ]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+class KioskServer:
+    """Routes HTTP requests to the session manager and the approval queue."""
+
+    def __init__(self, sessions: SessionManager):
+        self.sessions = sessions
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, body = await read_request(reader)
+                status, payload = await self.route(method, path, body)
+                write_response(writer, status, payload)
+            except HttpError as e:
+                write_response(writer, e.status, {"error": str(e)}, e.headers)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception as e:
+                write_response(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: dict) -> tuple[HTTPStatus, dict | str]:
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", **self.sessions.stats()}
+
+        if parts == ["metrics"] and method == "GET":
+            return HTTPStatus.OK, REGISTRY.format_prometheus()
+
+        if parts[:1] == ["sessions"]:
+            return await self.route_sessions(method, parts[1:], body)
+
+        if parts[:1] == ["approvals"]:
+            return self.route_approvals(method, parts[1:], body)
+
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def route_sessions(self, method: str, parts: list[str], body: dict) -> tuple[HTTPStatus, dict]:
+        try:
+            if not parts and method == "POST":
+                session = self.sessions.create()
+                return HTTPStatus.CREATED, {"session_id": session.session_id}
+
+            if len(parts) == 1 and method == "GET":
+                session = self.sessions.get(parts[0])
+                last_turn = session.history.last()
+                return HTTPStatus.OK, {
+                    "session_id": session.session_id,
+                    "turns": session.history.count,
+                    "idle_seconds": time.monotonic() - session.last_active,
+                    "last_tool_calls": [call.to_dict() for call in last_turn.tool_calls] if last_turn else [],
+                }
+
+            if len(parts) == 2 and parts[1] == "turns" and method == "GET":
+                session = self.sessions.get(parts[0])
+                return HTTPStatus.OK, {"turns": [trace.to_dict() for trace in reversed(session.history.turns)]}
+
+            if len(parts) == 1 and method == "DELETE":
+                self.sessions.close(parts[0])
+                return HTTPStatus.OK, {"closed": parts[0]}
+
+            if len(parts) == 2 and parts[1] == "messages" and method == "POST":
+                text = str(body.get("text", "")).strip()
+                if not text:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, "Missing 'text'")
+                return HTTPStatus.OK, await self.sessions.run_turn(parts[0], text)
+        except SessionNotFound as e:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Unknown session '{e.args[0]}'")
+        except TurnInProgress:
+            raise HttpError(HTTPStatus.CONFLICT, "The previous message in this session is still being answered")
+        except ServerBusy as e:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": str(e.retry_after)})
+
+        raise HttpError(HTTPStatus.NOT_FOUND, "No such session route")
+
+    def route_approvals(self, method: str, parts: list[str], body: dict) -> tuple[HTTPStatus, dict]:
+        approver = get_approver()
+        if not isinstance(approver, QueueApprover):
+            raise HttpError(HTTPStatus.NOT_FOUND, "Approvals are only served with APPROVAL_MODE=queue")
+
+        if not parts and method == "GET":
+            return HTTPStatus.OK, {"pending": [
+                {
+                    "request_id": request.request_id,
+                    "operation": request.operation_name,
+                    "details": request.details,
+                    "waiting_seconds": request.wait_seconds,
+                }
+                for request in approver.pending()
+            ]}
+
+        if len(parts) == 1 and method == "POST":
+            if not approver.resolve(parts[0], str(body.get("passkey", ""))):
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No pending approval '{parts[0]}'")
+            return HTTPStatus.OK, {"resolved": parts[0]}
+
+        raise HttpError(HTTPStatus.NOT_FOUND, "No such approval route")
+
+
+async def evict_idle_sessions(sessions: SessionManager, interval: float = 60) -> None:
+    """Background task: close idle sessions every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        evicted = sessions.evict_idle()
+        if evicted:
+            print(f"🧹 Closed {evicted} idle session(s)")
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Create the shared agent, then serve kiosks until interrupted."""
+    # Imported here so `--help` doesn't load the agent, its data and the Azure SDK
+    from agent import create_user_access_agent, pregenerate_parking_codes
+    from agent_cache import StartupTimer, get_agent_cache
+
+    if not os.getenv("APPROVAL_MODE"):
+        set_approver(QueueApprover())
+
+    timer = StartupTimer()
+    pregenerate_parking_codes()
+    timer.lap("parking code pool")
+
+    local_options = {"model_latency": args.local_latency} if args.provider == "local" else {}
+    async with open_provider(args.provider, **local_options) as provider:
+        timer.lap("credential + provider")
+
+        agent = await create_user_access_agent(provider, cache=get_agent_cache(), timer=timer)
+        sessions = SessionManager(
+            agent,
+            max_sessions=args.max_sessions,
+            max_concurrent_runs=args.max_concurrent_runs,
+            max_queued_runs=args.max_queued_runs,
+            idle_timeout=args.idle_minutes * 60,
+        )
+
+        server = await asyncio.start_server(
+            KioskServer(sessions).handle_connection, args.host, args.port, limit=MAX_REQUEST_BYTES
+        )
+        evictor = asyncio.create_task(evict_idle_sessions(sessions))
+        print(f"=== User Access Check Agent server on http://{args.host}:{args.port} ({args.provider} provider) ===")
+        print(timer.report())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+
+def main() -> None:
+    """Command-line entry point."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Serve the access control agent to many kiosks over HTTP.")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8080")))
+    parser.add_argument("--provider", choices=PROVIDER_KINDS, default=os.getenv("AGENT_PROVIDER", "azure"),
+                        help="'local' uses the offline stand-in from local_provider.py")
+    parser.add_argument("--local-latency", type=float, default=0.0,
+                        help="Simulated seconds per model round-trip for the local provider")
+    parser.add_argument("--max-concurrent-runs", type=int, default=int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "8")))
+    parser.add_argument("--max-queued-runs", type=int, default=int(os.getenv("SERVER_MAX_QUEUED_RUNS", "32")))
+    parser.add_argument("--max-sessions", type=int, default=int(os.getenv("SERVER_MAX_SESSIONS", "1000")))
+    parser.add_argument("--idle-minutes", type=float, default=float(os.getenv("SERVER_SESSION_IDLE_MINUTES", "15")))
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+"""
+Startup Budget Check
+
+Imports a module in a fresh interpreter with `python -X importtime` and fails if the
+import takes longer than the budget, or if it pulls in a dependency that is meant to
+be loaded lazily (pandas, numpy, the agent framework, the Azure SDK). Keeps a kiosk
+restart - and any test or tool that only imports agent.py - fast.
+
+    python solution/startup_budget.py                     # import agent, 500 ms budget
+    python solution/startup_budget.py --budget-ms 300 --top 15
+    python solution/startup_budget.py --module server --allow numpy
+
+Exit status is 1 when the budget is exceeded or a deferred dependency was imported.
+"""
+
+SOLUTION_DIR = Path(__file__).parent
+
+# Only needed once a specific tool, the agent or a report runs
+DEFERRED_MODULES = ("pandas", "numpy", "agent_framework", "azure")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parse `-X importtime` output into (module, depth, self_us, cumulative_us) rows."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure_import(module: str) -> tuple[list[tuple[str, int, int, int]], float]:
+    """Import `module` in a new interpreter. Returns the parsed import times and the wall time."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SOLUTION_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr), wall_seconds
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Check that importing a module stays within a startup budget.")
+    parser.add_argument("--module", default="agent", help="Module to import (from solution/)")
+    parser.add_argument("--budget-ms", type=float, default=500, help="Maximum cumulative import time")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--allow", nargs="*", default=[], help="Deferred modules this module may import anyway")
+    args = parser.parse_args()
+
+    # The fastest run is the least disturbed by disk cache and scheduling noise
+    runs = [measure_import(args.module) for _ in range(max(args.runs, 1))]
+    imports, wall_seconds = min(runs, key=lambda run: run[0][-1][3])
+    total_ms = next(cumulative for name, depth, _, cumulative in imports if name == args.module and depth == 0) / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms), "
+          f"process wall time {wall_seconds * 1000:.0f} ms")
+    print(f"\n{'slowest imports':<50} {'cumulative ms':>14} {'self ms':>9}")
+    for name, depth, self_us, cumulative_us in sorted(imports, key=lambda row: row[3], reverse=True)[:args.top]:
+        print(f"{'  ' * depth + name:<50} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    imported = {name.split(".")[0] for name, _, _, _ in imports}
+    for module in DEFERRED_MODULES:
+        if module in imported and module not in args.allow:
+            failures.append(f"import {args.module} imported '{module}', which should only be loaded on first use")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        sys.exit(1)
+    print("\n✅ Within budget, no deferred dependencies imported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import argparse
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Protocol
+
+from csv_storage import read_csv_rows, write_csv_atomic
+from directory_store import get_store
+from metrics import record_io
+from parking_history import PARTITION_DIR_NAME, get_parking_history, partition_key, write_partition
+
+"""
+Storage Backends
+
+The agent's tools work against three datasets - employees, guests and parking records.
+A StorageBackend hands out one table object per dataset, so the tools don't care
+whether the data lives in the CSV files under data/ (the default) or in a SQLite
+database.
+
+Select the backend with environment variables (e.g. in .env):
+    STORAGE_BACKEND=csv | sqlite      (default: csv)
+    SQLITE_DB_PATH=path/to/access.db  (default: data/access_control.db)
+
+Migrate existing CSV data into SQLite (and back) with:
+    python solution/storage.py import
+    python solution/storage.py export
+
+With the CSV backend, parking records can also be partitioned by month into
+data/parking_records/ (see parking_history.py); the partitions are used as soon as that
+directory exists.
+"""
+
+# Schema of each dataset: column order, and the columns lookups are done on
+DATASETS = {
+    "employees": {
+        "columns": ["name", "alias", "date_accessed", "badge_access"],
+        "key_columns": ("alias", "name"),
+    },
+    "guests": {
+        "columns": ["name", "alias", "date_accessed"],
+        "key_columns": ("alias", "name"),
+    },
+    "parking_records": {
+        "columns": ["alias", "parking_code", "date_issued"],
+        "key_columns": ("alias", "parking_code"),
+    },
+}
+
+# Extra (non-key) SQLite indexes, for date-range queries like guest expiry
+SQLITE_DATE_INDEXES = {
+    "employees": "date_accessed",
+    "guests": "date_accessed",
+    "parking_records": "date_issued",
+}
+
+
+class Table(Protocol):
+    """Operations the tools need on one dataset. Lookups are case-insensitive."""
+
+    def find(self, column: str, value: str) -> dict[str, str] | None: ...
+
+    def contains(self, column: str, value: str) -> bool: ...
+
+    def append(self, row: dict[str, str], unique: str | None = None) -> bool: ...
+
+    def append_many(self, rows: list[dict[str, str]], unique: str | None = None) -> list[bool]: ...
+
+    def update(
+        self,
+        column: str,
+        value: str,
+        changes: dict[str, str] | Callable[[dict[str, str]], dict[str, str]],
+    ) -> dict[str, str] | None: ...
+
+    def remove(self, column: str, value: str) -> int: ...
+
+    def remove_older_than(self, column: str, cutoff: str) -> list[dict[str, str]]: ...
+
+    def rows(self) -> list[dict[str, str]]: ...
+
+    def rows_between(self, column: str, start: str | None = None, end: str | None = None) -> list[dict[str, str]]: ...
+
+    def column_values(self, column: str) -> list[str]: ...
+
+    @property
+    def version(self) -> int: ...
+
+    def __len__(self) -> int: ...
+
+
+class StorageBackend(ABC):
+    """Hands out the table for each dataset."""
+
+    @abstractmethod
+    def table(self, dataset: str) -> Table:
+        """Return the table for a dataset ("employees", "guests" or "parking_records")."""
+
+    @property
+    def employees(self) -> Table:
+        return self.table("employees")
+
+    @property
+    def guests(self) -> Table:
+        return self.table("guests")
+
+    @property
+    def parking_records(self) -> Table:
+        return self.table("parking_records")
+
+
+class CsvBackend(StorageBackend):
+    """The data/*.csv files, served through the shared in-memory DirectoryStore.
+
+    Parking records come from the monthly partitions in data/parking_records/ instead of
+    parking_records.csv when that directory exists.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+
+    def table(self, dataset: str) -> Table:
+        schema = DATASETS[dataset]
+        if dataset == "parking_records" and (self.data_dir / PARTITION_DIR_NAME).is_dir():
+            return get_parking_history(
+                self.data_dir / PARTITION_DIR_NAME,
+                columns=schema["columns"],
+                key_columns=schema["key_columns"],
+            )
+        return get_store(
+            self.data_dir / f"{dataset}.csv",
+            key_columns=schema["key_columns"],
+            columns=schema["columns"],
+        )
+
+
+class SqliteTable:
+    """One dataset stored as a SQLite table.
+
+    Key columns are declared COLLATE NOCASE and indexed, so case-insensitive lookups are
+    index seeks. Rows keep their insertion order through the rowid, and "first match"
+    means lowest rowid, the same as the CSV files.
+    """
+
+    def __init__(self, backend: "SqliteBackend", dataset: str):
+        self.backend = backend
+        self.dataset = dataset
+        self.columns = DATASETS[dataset]["columns"]
+
+    def _column(self, column: str) -> str:
+        """Validate a column name before it is interpolated into SQL."""
+        if column not in self.columns:
+            raise ValueError(f"Unknown column '{column}' for {self.dataset}")
+        return column
+
+    def _to_dict(self, row: sqlite3.Row) -> dict[str, str]:
+        return {column: "" if row[column] is None else row[column] for column in self.columns}
+
+    def find(self, column: str, value: str) -> dict[str, str] | None:
+        row = self.backend.connection().execute(
+            f"SELECT * FROM {self.dataset} WHERE {self._column(column)} = ? COLLATE NOCASE ORDER BY rowid LIMIT 1",
+            (value,),
+        ).fetchone()
+        if row is None:
+            return None
+        record_io(rows_scanned=1)
+        return self._to_dict(row)
+
+    def contains(self, column: str, value: str) -> bool:
+        return self.find(column, value) is not None
+
+    def append(self, row: dict[str, str], unique: str | None = None) -> bool:
+        return self.append_many([row], unique=unique)[0]
+
+    def append_many(self, rows: list[dict[str, str]], unique: str | None = None) -> list[bool]:
+        """Insert several rows in one transaction; rows failing the unique check are skipped."""
+        placeholders = ", ".join("?" for _ in self.columns)
+        written = []
+        with self.backend.transaction() as conn:
+            for row in rows:
+                # Earlier rows of the batch are already inserted, so they are checked too
+                if unique is not None and conn.execute(
+                    f"SELECT 1 FROM {self.dataset} WHERE {self._column(unique)} = ? COLLATE NOCASE LIMIT 1",
+                    (row.get(unique, ""),),
+                ).fetchone():
+                    written.append(False)
+                    continue
+                conn.execute(
+                    f"INSERT INTO {self.dataset} ({', '.join(self.columns)}) VALUES ({placeholders})",
+                    [row.get(column, "") for column in self.columns],
+                )
+                written.append(True)
+        return written
+
+    def update(
+        self,
+        column: str,
+        value: str,
+        changes: dict[str, str] | Callable[[dict[str, str]], dict[str, str]],
+    ) -> dict[str, str] | None:
+        # The write lock is taken before the row is read, so it can't change in between
+        with self.backend.transaction() as conn:
+            row = conn.execute(
+                f"SELECT rowid, * FROM {self.dataset} WHERE {self._column(column)} = ? COLLATE NOCASE ORDER BY rowid LIMIT 1",
+                (value,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            record_io(rows_scanned=1)
+            current = self._to_dict(row)
+            new_values = changes(current) if callable(changes) else changes
+            assignments = ", ".join(f"{self._column(name)} = ?" for name in new_values)
+            conn.execute(
+                f"UPDATE {self.dataset} SET {assignments} WHERE rowid = ?",
+                [*new_values.values(), row["rowid"]],
+            )
+
+        current.update(new_values)
+        return current
+
+    def remove(self, column: str, value: str) -> int:
+        with self.backend.transaction() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM {self.dataset} WHERE {self._column(column)} = ? COLLATE NOCASE",
+                (value,),
+            )
+            record_io(rows_scanned=cursor.rowcount)
+            return cursor.rowcount
+
+    def remove_older_than(self, column: str, cutoff: str) -> list[dict[str, str]]:
+        # Served by the date index; ISO dates compare correctly as text
+        condition = f"{self._column(column)} != '' AND {column} < ?"
+        with self.backend.transaction() as conn:
+            removed = [
+                self._to_dict(row)
+                for row in conn.execute(f"SELECT * FROM {self.dataset} WHERE {condition} ORDER BY rowid", (cutoff,))
+            ]
+            if removed:
+                conn.execute(f"DELETE FROM {self.dataset} WHERE {condition}", (cutoff,))
+        record_io(rows_scanned=len(removed))
+        return removed
+
+    def rows(self) -> list[dict[str, str]]:
+        cursor = self.backend.connection().execute(f"SELECT * FROM {self.dataset} ORDER BY rowid")
+        rows = [self._to_dict(row) for row in cursor]
+        record_io(rows_scanned=len(rows))
+        return rows
+
+    def rows_between(self, column: str, start: str | None = None, end: str | None = None) -> list[dict[str, str]]:
+        # Served by the date index on date columns; ISO dates compare correctly as text
+        conditions, params = [f"{self._column(column)} != ''"], []
+        if start is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(end)
+        cursor = self.backend.connection().execute(
+            f"SELECT * FROM {self.dataset} WHERE {' AND '.join(conditions)} ORDER BY rowid", params
+        )
+        rows = [self._to_dict(row) for row in cursor]
+        record_io(rows_scanned=len(rows))
+        return rows
+
+    def column_values(self, column: str) -> list[str]:
+        cursor = self.backend.connection().execute(f"SELECT {self._column(column)} FROM {self.dataset} ORDER BY rowid")
+        values = ["" if value is None else value for (value,) in cursor]
+        record_io(rows_scanned=len(values))
+        return values
+
+    @property
+    def version(self) -> int:
+        return self.backend.version()
+
+    def replace_all(self, rows: list[dict[str, str]]) -> None:
+        """Replace the table's contents in one transaction (used by the CSV importer)."""
+        placeholders = ", ".join("?" for _ in self.columns)
+        with self.backend.transaction() as conn:
+            conn.execute(f"DELETE FROM {self.dataset}")
+            conn.executemany(
+                f"INSERT INTO {self.dataset} ({', '.join(self.columns)}) VALUES ({placeholders})",
+                ([row.get(column, "") for column in self.columns] for row in rows),
+            )
+
+    def __len__(self) -> int:
+        return self.backend.connection().execute(f"SELECT COUNT(*) FROM {self.dataset}").fetchone()[0]
+
+
+class SqliteBackend(StorageBackend):
+    """All three datasets in one SQLite database, in WAL mode.
+
+    WAL lets any number of readers (kiosks) run while one writer commits. Each thread
+    gets its own connection, since sqlite3 connections can't be shared across threads.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._tables = {dataset: SqliteTable(self, dataset) for dataset in DATASETS}
+        self._schema_ready = False
+        # Changes made by connections that bypass the backend (see version())
+        self._version_lock = threading.Lock()
+        self._external_changes = 0
+        self._schema_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            # The database file and tables are created on first use, not at construction
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in one write transaction (BEGIN IMMEDIATE ... COMMIT)."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            # Counted in the same transaction, so every commit - from any thread or kiosk
+            # process - moves version() by exactly one
+            conn.execute("UPDATE change_counter SET commits = commits + 1")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def version(self) -> int:
+        """Return a counter that increases whenever the database changes.
+
+        Commits made through any SqliteBackend - this one from any of its threads, or
+        another kiosk's - are counted in the change_counter table, so a single commit
+        moves the version by exactly one. PRAGMA data_version (per connection, moved by
+        other connections' commits) additionally catches writers that bypass the
+        backend: if it moved while the commit count didn't, something else changed the
+        database.
+        """
+        commits, = self.connection().execute("SELECT commits FROM change_counter").fetchone()
+        data_version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        with self._version_lock:
+            last_seen = getattr(self._local, "last_seen", None)
+            if last_seen is not None and data_version != last_seen[0] and commits == last_seen[1]:
+                self._external_changes += 1
+            self._local.last_seen = (data_version, commits)
+            return commits + self._external_changes
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create the tables and indexes if they don't exist yet."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for dataset, schema in DATASETS.items():
+                column_defs = ", ".join(
+                    f"{column} TEXT NOT NULL DEFAULT ''"
+                    + (" COLLATE NOCASE" if column in schema["key_columns"] else "")
+                    for column in schema["columns"]
+                )
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {dataset} ({column_defs})")
+                for column in schema["key_columns"]:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{dataset}_{column} ON {dataset} ({column})")
+                date_column = SQLITE_DATE_INDEXES[dataset]
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{dataset}_{date_column} ON {dataset} ({date_column})")
+            conn.execute("CREATE TABLE IF NOT EXISTS change_counter (commits INTEGER NOT NULL)")
+            conn.execute("INSERT INTO change_counter SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM change_counter)")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def table(self, dataset: str) -> SqliteTable:
+        return self._tables[dataset]
+
+
+def get_backend(data_dir: Path) -> StorageBackend:
+    """Create the storage backend selected by the STORAGE_BACKEND environment variable.
+
+    Args:
+        data_dir: Directory holding the CSV files (and the default SQLite database)
+    """
+    kind = os.getenv("STORAGE_BACKEND", "csv").strip().lower()
+    if kind == "csv":
+        return CsvBackend(data_dir)
+    if kind == "sqlite":
+        return SqliteBackend(os.getenv("SQLITE_DB_PATH") or Path(data_dir) / "access_control.db")
+    raise ValueError(f"Unknown STORAGE_BACKEND '{kind}' (expected 'csv' or 'sqlite')")
+
+
+def import_csv_to_sqlite(data_dir: Path, db_path: Path) -> dict[str, int]:
+    """Copy every dataset from the CSV files into the SQLite database, replacing its contents.
+
+    Returns:
+        Number of rows imported per dataset
+    """
+    backend = SqliteBackend(db_path)
+    counts = {}
+    for dataset in DATASETS:
+        csv_path = Path(data_dir) / f"{dataset}.csv"
+        if dataset == "parking_records" and (Path(data_dir) / PARTITION_DIR_NAME).is_dir():
+            rows = CsvBackend(data_dir).table(dataset).rows()
+        elif csv_path.exists():
+            _, rows = read_csv_rows(csv_path)
+        else:
+            continue
+        backend.table(dataset).replace_all(rows)
+        counts[dataset] = len(rows)
+    return counts
+
+
+def export_sqlite_to_csv(db_path: Path, data_dir: Path) -> dict[str, int]:
+    """Write every dataset from the SQLite database back out to the CSV files.
+
+    Returns:
+        Number of rows exported per dataset
+    """
+    backend = SqliteBackend(db_path)
+    counts = {}
+    for dataset, schema in DATASETS.items():
+        rows = backend.table(dataset).rows()
+        partition_dir = Path(data_dir) / PARTITION_DIR_NAME
+        if dataset == "parking_records" and partition_dir.is_dir():
+            _export_parking_partitions(partition_dir, rows, schema["columns"])
+        else:
+            write_csv_atomic(Path(data_dir) / f"{dataset}.csv", rows, schema["columns"])
+        counts[dataset] = len(rows)
+    return counts
+
+
+def _export_parking_partitions(partition_dir: Path, rows: list[dict[str, str]], columns: list[str]) -> None:
+    """Replace the monthly parking partitions with `rows` (CSV files; compact them again afterwards)."""
+    by_month: dict[str, list[dict[str, str]]] = {}
+    for row in rows:
+        by_month.setdefault(partition_key(row["date_issued"]), []).append(row)
+    for path in get_parking_history(partition_dir, columns).partitions():
+        if path.stem not in by_month or path.suffix != ".csv":
+            path.unlink()
+    for key, month_rows in by_month.items():
+        write_partition(partition_dir / f"{key}.csv", month_rows, columns)
+
+
+def main() -> None:
+    """Command-line entry point for migrating data between the CSV files and SQLite."""
+    default_data_dir = Path(__file__).parent.parent / "data"
+
+    parser = argparse.ArgumentParser(description="Migrate access-control data between CSV and SQLite.")
+    parser.add_argument("command", choices=["import", "export"], help="import: CSV -> SQLite, export: SQLite -> CSV")
+    parser.add_argument("--data-dir", type=Path, default=default_data_dir, help="Directory with the CSV files")
+    parser.add_argument("--db", type=Path, default=None, help="SQLite database path (default: <data-dir>/access_control.db)")
+    args = parser.parse_args()
+
+    db_path = args.db or args.data_dir / "access_control.db"
+    if args.command == "import":
+        counts = import_csv_to_sqlite(args.data_dir, db_path)
+        direction = f"{args.data_dir} -> {db_path}"
+    else:
+        counts = export_sqlite_to_csv(db_path, args.data_dir)
+        direction = f"{db_path} -> {args.data_dir}"
+
+    print(f"✅ {args.command.capitalize()} complete ({direction})")
+    for dataset, count in counts.items():
+        print(f"   • {dataset}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import sys
+from pathlib import Path
+
+"""
+Test setup: the solution modules import each other as top-level modules (they are run
+from the solution directory), so put that directory on the import path.
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
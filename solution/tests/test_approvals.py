@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+
+from approvals import ApprovalRequest, ConsoleApprover, QueueApprover
+
+"""
+Tests for the console approver's stdin handling and the queue approver.
+"""
+
+
+@pytest.fixture
+def stdin_from(monkeypatch, tmp_path):
+    """Redirect stdin, as `python agent.py < input.txt` or `... | python agent.py` would."""
+    opened = []
+
+    def redirect(kind: str, text: str):
+        if kind == "file":
+            path = tmp_path / "input.txt"
+            path.write_text(text)
+            stream = open(path)
+        else:
+            read_fd, write_fd = os.pipe()
+            os.write(write_fd, text.encode())
+            os.close(write_fd)
+            stream = os.fdopen(read_fd)
+        opened.append(stream)
+        monkeypatch.setattr(sys, "stdin", stream)
+        return stream
+
+    yield redirect
+    for stream in opened:
+        stream.close()
+
+
+def _decide(approver) -> bool:
+    return asyncio.run(approver.decide(ApprovalRequest("Add Guest", "Add Tony Stark")))
+
+
+def test_stdin_from_a_file_is_read_without_the_selector(stdin_from):
+    stdin_from("file", "1234\nwrong\n")
+    approver = ConsoleApprover()
+
+    assert approver.cancellable is False
+    assert _decide(approver) is True
+    assert _decide(approver) is False
+
+
+def test_selector_refusing_stdin_falls_back_to_input(stdin_from):
+    stdin_from("file", "1234\n")
+    approver = ConsoleApprover()
+    # As if the stdin check had passed: add_reader raises PermissionError on a file
+    approver.cancellable = True
+
+    assert _decide(approver) is True
+    assert approver.cancellable is False
+
+
+def test_piped_stdin_is_read_through_the_loop(stdin_from):
+    stdin_from("pipe", "1234\n")
+    approver = ConsoleApprover()
+
+    assert approver.cancellable is True
+    assert _decide(approver) is True
+
+
+def test_stdin_without_a_file_descriptor_is_not_selectable(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("1234\n"))
+    approver = ConsoleApprover()
+
+    assert approver.cancellable is False
+    assert _decide(approver) is True
+
+
+def test_queue_approver_is_resolved_from_another_thread():
+    approver = QueueApprover()
+
+    async def main():
+        decision = asyncio.ensure_future(approver.decide(ApprovalRequest("Add Guest", "Add Tony Stark")))
+        while not approver.pending():
+            await asyncio.sleep(0)
+        [request] = approver.pending()
+        # The server answers from its own request thread
+        resolved = await asyncio.to_thread(approver.resolve, request.request_id, "1234")
+        return resolved, await decision
+
+    assert asyncio.run(main()) == (True, True)
+    assert approver.pending() == []
+    assert approver.resolve("missing", "1234") is False
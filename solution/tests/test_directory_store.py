@@ -0,0 +1,190 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import threading
+import time
+
+import pytest
+
+import csv_storage
+import directory_store
+from csv_storage import read_csv_rows, write_csv_atomic
+from directory_store import DirectoryStore
+
+"""
+Tests for DirectoryStore's write path: group commit, merging against other processes'
+changes, appends racing a rewrite, and temp-file cleanup on a failed rewrite.
+"""
+
+COLUMNS = ["name", "alias", "date_accessed", "badge_access"]
+
+
+@pytest.fixture
+def employees(tmp_path):
+    path = tmp_path / "employees.csv"
+    rows = [
+        {"name": f"Person {i}", "alias": f"p{i}", "date_accessed": "2026-01-01", "badge_access": "2"}
+        for i in range(10)
+    ]
+    write_csv_atomic(path, rows, COLUMNS)
+    return path
+
+
+class BlockingWrites:
+    """Wraps write_csv_atomic so the first rewrite waits until released, and counts rewrites."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, path, rows, columns):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            assert self.release.wait(10)
+        return write_csv_atomic(path, rows, columns)
+
+
+@pytest.fixture
+def blocking_writes(monkeypatch):
+    writes = BlockingWrites()
+    monkeypatch.setattr(directory_store, "write_csv_atomic", writes)
+    return writes
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_updates_and_removes_share_one_rewrite(employees, blocking_writes):
+    store = DirectoryStore(employees)
+    results = {}
+
+    def run(key, call, *args):
+        results[key] = call(*args)
+
+    first = threading.Thread(target=run, args=("p0", store.update, "alias", "p0", {"badge_access": "9"}))
+    first.start()
+    assert blocking_writes.started.wait(10)
+
+    # While the first rewrite holds the file, these queue up behind it
+    others = [
+        threading.Thread(target=run, args=(f"p{i}", store.update, "alias", f"p{i}", {"badge_access": "7"}))
+        for i in range(1, 5)
+    ] + [threading.Thread(target=run, args=("remove", store.remove, "alias", "p9"))]
+    for thread in others:
+        thread.start()
+    _wait_for(lambda: len(store._pending) == len(others))
+
+    blocking_writes.release.set()
+    for thread in [first, *others]:
+        thread.join(10)
+
+    assert blocking_writes.calls == 2
+    assert results["p0"]["badge_access"] == "9"
+    assert all(results[f"p{i}"]["badge_access"] == "7" for i in range(1, 5))
+    assert results["remove"] == 1
+
+    _, rows = read_csv_rows(employees)
+    by_alias = {row["alias"]: row for row in rows}
+    assert "p9" not in by_alias and len(rows) == 9
+    assert by_alias["p0"]["badge_access"] == "9"
+    assert [by_alias[f"p{i}"]["badge_access"] for i in range(1, 5)] == ["7"] * 4
+    assert store.find("alias", "p3")["badge_access"] == "7"
+
+
+def test_grant_merges_with_change_from_another_process(employees):
+    store = DirectoryStore(employees)
+    assert store.find("alias", "p1")["badge_access"] == "2"
+
+    # Another kiosk grants floor 3 by rewriting the file behind this store's back
+    other = DirectoryStore(employees)
+    other.update("alias", "p1", {"badge_access": "2,3"})
+
+    def grant_floor_5(row):
+        floors = set(row["badge_access"].split(","))
+        return {"badge_access": ",".join(sorted(floors | {"5"}))}
+
+    updated = store.update("alias", "p1", grant_floor_5)
+
+    assert updated["badge_access"] == "2,3,5"
+    _, rows = read_csv_rows(employees)
+    assert next(row for row in rows if row["alias"] == "p1")["badge_access"] == "2,3,5"
+
+
+def test_append_during_rewrite_is_not_lost(employees, blocking_writes):
+    store = DirectoryStore(employees)
+    store.find("alias", "p0")
+
+    updater = threading.Thread(target=store.update, args=("alias", "p0", {"badge_access": "4"}))
+    updater.start()
+    assert blocking_writes.started.wait(10)
+
+    # Another process appends while the rewrite is in flight; the file lock makes it wait
+    appended = threading.Event()
+
+    def append_from_other_process():
+        csv_storage.append_csv_rows(
+            employees,
+            [{"name": "New Hire", "alias": "newhire", "date_accessed": "2026-01-02", "badge_access": "2"}],
+            COLUMNS,
+        )
+        appended.set()
+
+    appender = threading.Thread(target=append_from_other_process)
+    appender.start()
+    assert not appended.wait(0.2)
+
+    blocking_writes.release.set()
+    updater.join(10)
+    appender.join(10)
+    assert appended.is_set()
+
+    _, rows = read_csv_rows(employees)
+    aliases = [row["alias"] for row in rows]
+    assert "newhire" in aliases and len(rows) == 11
+    assert next(row for row in rows if row["alias"] == "p0")["badge_access"] == "4"
+    assert store.find("alias", "newhire") is not None
+    assert store.find("alias", "p0")["badge_access"] == "4"
+
+
+def test_failed_rewrite_removes_temp_file(employees, monkeypatch):
+    store = DirectoryStore(employees)
+    before = employees.read_bytes()
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(csv_storage.os, "replace", failing_replace)
+    with pytest.raises(OSError, match="disk full"):
+        store.update("alias", "p2", {"badge_access": "8"})
+    monkeypatch.undo()
+
+    assert list(employees.parent.glob("*.tmp")) == []
+    assert employees.read_bytes() == before
+    assert store.find("alias", "p2")["badge_access"] == "2"
+
+    # The store is still writable afterwards
+    assert store.update("alias", "p2", {"badge_access": "8"})["badge_access"] == "8"
+
+
+def test_rows_between_uses_sorted_index_kept_current_by_appends(employees):
+    store = DirectoryStore(employees)
+    store.update("alias", "p3", {"date_accessed": "2026-02-10"})
+    store.update("alias", "p7", {"date_accessed": ""})
+
+    assert [row["alias"] for row in store.rows_between("date_accessed", "2026-02-01")] == ["p3"]
+    assert len(store.rows_between("date_accessed", None, "2026-01-01")) == 8
+
+    # Appended in place: the index is extended, not rebuilt
+    store.append({"name": "Late", "alias": "late", "date_accessed": "2026-02-10", "badge_access": ""})
+    store.append({"name": "Early", "alias": "early", "date_accessed": "2025-12-31", "badge_access": ""})
+    assert [row["alias"] for row in store.rows_between("date_accessed", "2026-02-10", "2026-02-10")] == ["p3", "late"]
+    assert [row["alias"] for row in store.rows_between("date_accessed", None, "2025-12-31")] == ["early"]
+
+    # A change from another process reloads the table and drops the index
+    csv_storage.append_csv_rows(employees, [{"name": "Other", "alias": "other", "date_accessed": "2026-02-10"}])
+    assert [row["alias"] for row in store.rows_between("date_accessed", "2026-02-01")] == ["p3", "late", "other"]
@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import pytest
+
+from csv_storage import write_csv_atomic
+from directory_store import DirectoryStore
+from fuzzy_search import FuzzySearchIndex
+
+"""
+Tests for keeping the fuzzy name index current as the table changes.
+"""
+
+COLUMNS = ["name", "alias", "date_accessed"]
+
+
+@pytest.fixture
+def guests(tmp_path):
+    path = tmp_path / "guests.csv"
+    write_csv_atomic(path, [
+        {"name": "Tony Stark", "alias": "tstark", "date_accessed": "2026-03-01"},
+        {"name": "Bruce Banner", "alias": "bbanner", "date_accessed": "2026-03-01"},
+    ], COLUMNS)
+    return DirectoryStore(path)
+
+
+@pytest.fixture
+def index(guests):
+    index = FuzzySearchIndex(guests)
+    assert index.search("Tony Strak")[0][0]["alias"] == "tstark"
+    index.rebuilds = 0
+    original_rebuild = index._rebuild
+
+    def counting_rebuild():
+        index.rebuilds += 1
+        original_rebuild()
+
+    index._rebuild = counting_rebuild
+    return index
+
+
+def _names(matches):
+    return [row["name"] for row, _ in matches]
+
+
+def test_writes_reported_by_this_process_are_applied_in_place(guests, index):
+    version_before = guests.version
+    row = {"name": "Natasha Romanoff", "alias": "nromanoff", "date_accessed": "2026-03-02"}
+    guests.append(row)
+    index.record_added([row], version_before)
+
+    version_before = guests.version
+    guests.remove("alias", "bbanner")
+    index.record_write(version_before)
+
+    assert _names(index.search("Natasha Romanof")) == ["Natasha Romanoff"]
+    assert index.search("Bruce Baner") == []
+    assert index.rebuilds == 0
+
+
+def test_change_from_another_kiosk_with_the_same_row_count_rebuilds(guests, index):
+    # Another kiosk removes one guest and registers another: the row count is unchanged
+    other_kiosk = DirectoryStore(guests.path)
+    other_kiosk.remove("alias", "bbanner")
+    other_kiosk.append({"name": "Wanda Maximoff", "alias": "wmaximoff", "date_accessed": "2026-03-02"})
+    assert len(guests) == 2
+
+    assert _names(index.search("Wanda Maximof")) == ["Wanda Maximoff"]
+    assert index.rebuilds == 1
+
+
+def test_unreported_write_in_between_forces_a_rebuild(guests, index):
+    version_before = guests.version
+    guests.append({"name": "Sam Wilson", "alias": "swilson", "date_accessed": "2026-03-02"})
+    row = {"name": "Steve Rogers", "alias": "srogers", "date_accessed": "2026-03-02"}
+    guests.append(row)
+    index.record_added([row], version_before)
+
+    assert _names(index.search("Sam Wilsen")) == ["Sam Wilson"]
+    assert _names(index.search("Steve Roger")) == ["Steve Rogers"]
+    assert index.rebuilds == 1
@@ -0,0 +1,156 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import agent
+import approvals
+from alias_allocator import get_alias_allocator
+from approvals import AutoApprover
+from csv_storage import append_csv_rows, read_csv_rows, write_csv_atomic
+from storage import CsvBackend
+
+"""
+Tests for the group tools: check_people_exist and register_guests.
+"""
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+GUEST_COLUMNS = ["name", "alias", "date_accessed"]
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(DATA_DIR / "employees.csv", data_dir / "employees.csv")
+    today = datetime.now().date()
+    write_csv_atomic(data_dir / "guests.csv", [
+        {"name": "Tony Stark", "alias": "tstark", "date_accessed": today.isoformat()},
+        {"name": "Bruce Banner", "alias": "bbanner", "date_accessed": (today - timedelta(days=90)).isoformat()},
+    ], GUEST_COLUMNS)
+    backend = CsvBackend(data_dir)
+    monkeypatch.setattr(agent, "STORAGE", backend)
+    monkeypatch.delenv("APPROVAL_TIMEOUT_SECONDS", raising=False)
+    return backend
+
+
+@pytest.fixture
+def approval_requests():
+    """Approve everything, recording each request."""
+    requests = []
+    approvals.set_approver(AutoApprover(lambda request: requests.append(request) or True))
+    yield requests
+    approvals.set_approver(None)
+
+
+def _guest_rows(backend):
+    return read_csv_rows(backend.data_dir / "guests.csv")[1]
+
+
+def test_check_people_exist_classifies_everyone_in_one_call(storage):
+    result = agent.check_people_exist(["jsmith", "Sarah Johnson", "tony stark", "Bruce Banner", "Nobody Here"])
+
+    assert result.startswith("Checked 5 people: 2 employee(s), 1 guest(s), 1 expired guest(s), 1 not found.")
+    assert "- jsmith: employee John Smith (alias: jsmith)" in result
+    assert "- Sarah Johnson: employee Sarah Johnson (alias: sjohnson)" in result
+    assert "- tony stark: guest (alias: tstark, last accessed 0 days ago)" in result
+    assert "- Bruce Banner: guest EXPIRED (alias: bbanner" in result
+    assert "- Nobody Here: not found" in result
+
+
+def test_register_guests_skips_duplicates_with_one_approval(storage, approval_requests):
+    result = asyncio.run(agent.register_guests([
+        {"first_name": "Peter", "last_name": "Parker", "alias": "pparker"},
+        {"first_name": "Tony", "last_name": "Stark"},
+        {"first_name": "peter", "last_name": "parker", "alias": "pparker2"},
+        {"first_name": "Natasha", "last_name": "Romanoff", "alias": "nromanoff"},
+    ]))
+
+    assert result.startswith("✅ Successfully registered 2 guest(s)")
+    assert "Tony Stark (already in the guest database)" in result
+    assert "peter parker (listed twice)" in result
+    assert len(approval_requests) == 1
+    assert "Register 2 guest(s)" in approval_requests[0].details
+
+    rows = _guest_rows(storage)
+    assert [row["alias"] for row in rows] == ["tstark", "bbanner", "pparker", "nromanoff"]
+
+
+def test_register_guests_reserves_aliases_until_written(storage, approval_requests):
+    allocator = get_alias_allocator(storage.guests)
+    seen_while_pending = []
+
+    def approve(request):
+        # A concurrent registration while the group waits for approval gets other aliases
+        seen_while_pending.extend([allocator.reserve("tstark"), allocator.reserve("jdoe")])
+        for alias in seen_while_pending:
+            allocator.release(alias)
+        return True
+
+    approvals.set_approver(AutoApprover(approve))
+    result = asyncio.run(agent.register_guests([
+        {"first_name": "Jane", "last_name": "Doe", "alias": "jdoe"},
+        {"first_name": "John", "last_name": "Doe", "alias": "jdoe"},
+        {"first_name": "Toni", "last_name": "Stark", "alias": "tstark"},
+    ]))
+
+    assert "Jane Doe (alias: jdoe)" in result
+    assert "John Doe (alias: jdoe1, as 'jdoe' was taken)" in result
+    assert "Toni Stark (alias: tstark1, as 'tstark' was taken)" in result
+    assert seen_while_pending == ["tstark2", "jdoe2"]
+    assert allocator._reserved == set()
+
+
+def test_register_guests_retries_only_conflicting_aliases(storage, approval_requests, monkeypatch):
+    guests = storage.guests
+    writes = []
+    original_append_many = guests.append_many
+    monkeypatch.setattr(guests, "append_many", lambda rows, unique=None: writes.append(rows) or original_append_many(rows, unique=unique))
+
+    def approve_while_another_kiosk_registers(request):
+        # Another kiosk takes one of the planned aliases between planning and writing
+        append_csv_rows(guests.path, [{"name": "Wanda Maximoff", "alias": "wmaximoff", "date_accessed": "2026-03-01"}])
+        return True
+
+    approvals.set_approver(AutoApprover(approve_while_another_kiosk_registers))
+    result = asyncio.run(agent.register_guests([
+        {"first_name": "Steve", "last_name": "Rogers", "alias": "srogers"},
+        {"first_name": "Wanda", "last_name": "Max", "alias": "wmaximoff"},
+        {"first_name": "Sam", "last_name": "Wilson", "alias": "swilson"},
+    ]))
+
+    assert "Wanda Max (alias: wmaximoff1, as 'wmaximoff' was taken)" in result
+    assert [len(rows) for rows in writes] == [3, 1]
+    assert writes[1][0]["alias"] == "wmaximoff1"
+
+    aliases = [row["alias"] for row in _guest_rows(storage)]
+    assert len(aliases) == len(set(aliases))
+    assert aliases[-4:] == ["wmaximoff", "srogers", "swilson", "wmaximoff1"]
+
+
+def test_check_people_exist_skips_blank_entries(storage):
+    result = agent.check_people_exist(["jsmith", "", "   "])
+
+    assert result.startswith("Checked 1 people: 1 employee(s).")
+    assert ": not found" not in result
+
+
+@pytest.mark.parametrize("alias", ["", "   ", None])
+def test_register_guests_generates_an_alias_for_a_blank_one(storage, approval_requests, alias):
+    result = asyncio.run(agent.register_guests([{"first_name": "Amy", "last_name": "Lee", "alias": alias}]))
+
+    [row] = [row for row in _guest_rows(storage) if row["name"] == "Amy Lee"]
+    assert row["alias"].startswith("alee") and row["alias"].strip() == row["alias"]
+    assert f"Amy Lee (alias: {row['alias']})" in result
+    assert "was taken" not in result
+
+
+def test_register_guests_strips_the_requested_alias(storage, approval_requests):
+    result = asyncio.run(agent.register_guests([{"first_name": "Amy", "last_name": "Lee", "alias": " alee "}]))
+
+    assert "Amy Lee (alias: alee)." in result
+    assert [row["alias"] for row in _guest_rows(storage)][-1] == "alee"
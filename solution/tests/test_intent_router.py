@@ -0,0 +1,123 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+
+import pytest
+
+from intent_router import FastPathAgent, RouterState
+
+"""
+Tests for the fast-path intent router: which messages it answers itself and which go
+to the agent.
+"""
+
+
+def _verified() -> RouterState:
+    return RouterState(alias="jsmith", name="John Smith")
+
+
+@pytest.mark.parametrize("message, planned", [
+    ("I'm employee jsmith", ("lookup", "jsmith")),
+    ("Hi, I am an employee, alias jsmith.", ("lookup", "jsmith")),
+    ("I'm jsmith", ("lookup", "jsmith")),
+    ("this is employee jsmith", ("lookup", "jsmith")),
+    ("My alias is jsmith", ("lookup", "jsmith")),
+    ("I'm employee jsmith, I need parking", ("parking", "jsmith")),
+    ("I'm jsmith and I'd like a parking code, please", ("parking", "jsmith")),
+    ("Good morning! I'm jsmith. Can I get parking for today?", ("parking", "jsmith")),
+    ("I'm jsmith, which floors can I access?", ("badge", "jsmith")),
+])
+def test_structured_introductions_are_routed(message, planned):
+    router = FastPathAgent(agent=None, tools=[])
+    assert router.plan(message, RouterState()) == planned
+
+
+@pytest.mark.parametrize("message, planned", [
+    ("I need parking", ("parking", None)),
+    ("parking please", ("parking", None)),
+    ("I want to park today", ("parking", None)),
+    ("Which floors can I access?", ("badge", None)),
+])
+def test_follow_ups_of_a_verified_employee_are_routed(message, planned):
+    router = FastPathAgent(agent=None, tools=[])
+    assert router.plan(message, _verified()) == planned
+
+
+@pytest.mark.parametrize("message", [
+    "I need parking for my guest",
+    "parking tomorrow",
+    "parking next week",
+    "I want to get rid of my parking",
+    "parking for my visitor Tony Stark",
+    "I don't need parking",
+    "I need parking but for Friday",
+    "Can I get parking for my team?",
+])
+def test_other_parking_messages_go_to_the_agent(message):
+    router = FastPathAgent(agent=None, tools=[])
+    assert router.plan(message, _verified()) is None
+    assert router.plan(f"I'm employee jsmith, {message}", RouterState()) is None
+
+
+@pytest.mark.parametrize("message", [
+    "it's raining",
+    "this is great",
+    "I'm a guest, Tony Stark",
+    "Hello",
+    "yes",
+])
+def test_non_introductions_go_to_the_agent(message):
+    router = FastPathAgent(agent=None, tools=[])
+    assert router.plan(message, RouterState()) is None
+
+
+def test_yes_answers_a_parking_offer_only():
+    router = FastPathAgent(agent=None, tools=[])
+    state = _verified()
+    assert router.plan("yes", state) is None
+    state.parking_offered = True
+    assert router.plan("Yes please", state) == ("parking", None)
+    assert router.plan("no thanks", state) == ("decline", None)
+
+
+class FakeAgent:
+    """Records the messages sent to the model."""
+
+    def __init__(self):
+        self.messages = []
+
+    def get_new_thread(self):
+        return type("Thread", (), {})()
+
+    async def run(self, text, *, thread=None):
+        self.messages.append(text)
+        return "agent reply"
+
+
+def test_guest_parking_after_a_routed_lookup_reaches_the_agent():
+    calls = []
+
+    async def check_employee_exists(alias):
+        calls.append(("check_employee_exists", alias))
+        return "Employee found: John Smith (alias: jsmith, last accessed: 2026-02-15)"
+
+    async def generate_parking_code(alias):
+        calls.append(("generate_parking_code", alias))
+        return "code"
+
+    agent = FakeAgent()
+    router = FastPathAgent(agent, [check_employee_exists, generate_parking_code])
+
+    async def conversation():
+        thread = router.get_new_thread()
+        greeting = await router.run("I'm employee jsmith", thread=thread)
+        reply = await router.run("I need parking for my guest", thread=thread)
+        return greeting, reply
+
+    greeting, reply = asyncio.run(conversation())
+
+    assert "Welcome back, John Smith" in greeting.text
+    assert reply == "agent reply"
+    assert calls == [("check_employee_exists", "jsmith")]
+    assert agent.messages[0].endswith("\nI need parking for my guest")
+    assert "I'm employee jsmith" in agent.messages[0]
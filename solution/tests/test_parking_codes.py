@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+from datetime import date
+
+import pytest
+
+import parking_codes
+from csv_storage import append_csv_rows, read_csv_rows
+from directory_store import DirectoryStore
+from parking_codes import IssuedTodayIndex, get_parking_code_allocator
+
+"""
+Tests for IssuedTodayIndex: one parking code per employee per day.
+"""
+
+COLUMNS = ["alias", "parking_code", "date_issued"]
+
+
+class FakeDate(date):
+    """date with a today() the test controls."""
+
+    current = date(2026, 3, 2)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(parking_codes, "date", FakeDate)
+    FakeDate.current = date(2026, 3, 2)
+    return FakeDate
+
+
+@pytest.fixture
+def parking_records(tmp_path):
+    path = tmp_path / "parking_records.csv"
+    append_csv_rows(path, [
+        {"alias": "sjohnson", "parking_code": "OLD001", "date_issued": "2026-03-01"},
+        {"alias": "mchen", "parking_code": "TODAY1", "date_issued": "2026-03-02"},
+    ], COLUMNS)
+    return DirectoryStore(path, key_columns=("alias", "parking_code"), columns=COLUMNS)
+
+
+def _issue(index, table, alias, day):
+    """Issue a code the way generate_parking_code does, counting the writes."""
+    writes = []
+    allocator = get_parking_code_allocator(table)
+
+    def write():
+        code = allocator.reserve()
+        try:
+            assert table.append({"alias": alias, "parking_code": code, "date_issued": day}, unique="parking_code")
+        finally:
+            allocator.release(code)
+        writes.append(code)
+        return code
+
+    code, issued = index.issue(alias, day, write)
+    assert issued == bool(writes)
+    return code, issued
+
+
+def test_repeat_request_on_the_same_day_gets_the_same_code(clock, parking_records, monkeypatch):
+    index = IssuedTodayIndex(parking_records)
+    assert index.find("mchen") == "TODAY1"
+    assert index.find("sjohnson") is None
+
+    code, issued = _issue(index, parking_records, "jsmith", "2026-03-02")
+    assert issued
+
+    # Served from the index: no rebuild from the table, no second write
+    scans = []
+    original_rows_between = parking_records.rows_between
+    monkeypatch.setattr(parking_records, "rows_between", lambda *args: scans.append(args) or original_rows_between(*args))
+    assert _issue(index, parking_records, "JSmith", "2026-03-02") == (code, False)
+    assert index.find("jsmith") == code
+    assert scans == []
+
+    _, rows = read_csv_rows(parking_records.path)
+    assert [row["alias"] for row in rows].count("jsmith") == 1
+
+
+def test_codes_are_evicted_at_the_day_boundary(clock, parking_records):
+    index = IssuedTodayIndex(parking_records)
+    first_code, issued = _issue(index, parking_records, "jsmith", "2026-03-02")
+    assert issued
+
+    clock.current = date(2026, 3, 3)
+    assert index.find("jsmith") is None
+    assert index.find("mchen") is None
+
+    second_code, issued = _issue(index, parking_records, "jsmith", "2026-03-03")
+    assert issued and second_code != first_code
+    assert index.find("jsmith") == second_code
+
+    _, rows = read_csv_rows(parking_records.path)
+    assert [(row["parking_code"], row["date_issued"]) for row in rows if row["alias"] == "jsmith"] == [
+        (first_code, "2026-03-02"),
+        (second_code, "2026-03-03"),
+    ]
+
+
+def test_code_issued_by_another_kiosk_is_picked_up(clock, parking_records):
+    index = IssuedTodayIndex(parking_records)
+    assert index.find("jsmith") is None
+
+    append_csv_rows(parking_records.path, [{"alias": "jsmith", "parking_code": "KIOSK2", "date_issued": "2026-03-02"}])
+
+    assert _issue(index, parking_records, "jsmith", "2026-03-02") == ("KIOSK2", False)
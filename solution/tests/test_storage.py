@@ -0,0 +1,118 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from badge_access import FloorAccessIndex, parse_badge_access
+from csv_storage import read_csv_rows
+from storage import DATASETS, SqliteBackend, export_sqlite_to_csv, import_csv_to_sqlite
+
+"""
+Tests for the SQLite backend: the change counter behind Table.version, unique appends,
+and CSV import/export.
+"""
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    copy = tmp_path / "data"
+    copy.mkdir()
+    for dataset in DATASETS:
+        shutil.copy(DATA_DIR / f"{dataset}.csv", copy / f"{dataset}.csv")
+    return copy
+
+
+@pytest.fixture
+def backend(data_dir, tmp_path):
+    db_path = tmp_path / "access_control.db"
+    import_csv_to_sqlite(data_dir, db_path)
+    return SqliteBackend(db_path)
+
+
+def test_commit_from_another_thread_moves_version_by_one(backend):
+    employees = backend.employees
+    index = FloorAccessIndex(employees)
+    assert "jsmith" in index.aliases_with_access(5)
+    rebuilds = []
+    original_rebuild = index._rebuild
+    index._rebuild = lambda version: (rebuilds.append(version), original_rebuild(version))
+
+    def grant_floor_7():
+        version_before = employees.version
+        updated = employees.update("alias", "sjohnson", {"badge_access": "2,3,7"})
+        index.record_change(updated["alias"], parse_badge_access(updated["badge_access"]), version_before)
+        return version_before
+
+    # Written from a pool thread, like the tools do; read back on this thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        version_before = pool.submit(grant_floor_7).result()
+
+    assert employees.version == version_before + 1
+    assert "sjohnson" in index.aliases_with_access(7)
+    assert rebuilds == []
+
+
+def test_commit_from_another_process_is_detected(backend):
+    employees = backend.employees
+    index = FloorAccessIndex(employees)
+    assert "sjohnson" not in index.aliases_with_access(7)
+    version_before = employees.version
+
+    # Another kiosk, with its own backend and connections
+    SqliteBackend(backend.db_path).employees.update("alias", "sjohnson", {"badge_access": "7"})
+    assert employees.version == version_before + 1
+    assert "sjohnson" in index.aliases_with_access(7)
+
+    # A writer that doesn't go through SqliteBackend at all
+    with sqlite3.connect(backend.db_path) as conn:
+        conn.execute("UPDATE employees SET badge_access = '' WHERE alias = 'sjohnson'")
+    assert employees.version > version_before + 1
+    assert "sjohnson" not in index.aliases_with_access(7)
+
+
+def test_unique_append_skips_existing_and_repeated_values(backend):
+    guests = backend.guests
+    existing = guests.rows()[0]
+    count = len(guests)
+
+    written = guests.append_many(
+        [
+            {"name": "Ada Lovelace", "alias": existing["alias"].upper(), "date_accessed": "2026-03-01"},
+            {"name": "Alan Turing", "alias": "aturing", "date_accessed": "2026-03-01"},
+            {"name": "Alan Turing Jr", "alias": "ATuring", "date_accessed": "2026-03-01"},
+        ],
+        unique="alias",
+    )
+
+    assert written == [False, True, False]
+    assert len(guests) == count + 1
+    assert guests.find("alias", "aturing")["name"] == "Alan Turing"
+    assert guests.append({"name": "Alan Turing", "alias": "aturing"}, unique="alias") is False
+    assert guests.append({"name": "Ada Lovelace", "alias": "alovelace"}, unique="alias") is True
+
+
+def test_import_export_round_trip(backend, data_dir, tmp_path):
+    out_dir = tmp_path / "exported"
+    out_dir.mkdir()
+
+    counts = export_sqlite_to_csv(backend.db_path, out_dir)
+
+    for dataset, schema in DATASETS.items():
+        columns, original = read_csv_rows(data_dir / f"{dataset}.csv")
+        exported_columns, exported = read_csv_rows(out_dir / f"{dataset}.csv")
+        assert exported_columns == schema["columns"]
+        assert exported == [{column: row[column] for column in schema["columns"]} for row in original]
+        assert counts[dataset] == len(original)
+
+    # And back in again: the database ends up with the same rows
+    copy_db = tmp_path / "copy.db"
+    assert import_csv_to_sqlite(out_dir, copy_db) == counts
+    copy = SqliteBackend(copy_db)
+    for dataset in DATASETS:
+        assert copy.table(dataset).rows() == backend.table(dataset).rows()
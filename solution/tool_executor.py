@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Tool Executor
+
+The agent framework calls tools on the event loop that drives agent.run, so a tool
+that parses or rewrites a CSV file stalls every other session (and the HTTP server)
+while it runs. Blocking tool work is dispatched to a bounded thread pool instead:
+
+  - offload_tool() turns a synchronous tool into an async one that runs in the pool
+  - async tools (the write tools, which first await an approval) call run_blocking()
+    around their storage calls
+
+TOOL_WORKERS in .env sets the pool size (default 8; 0 runs tools inline on the event
+loop, as before - e.g. to compare benchmark runs). Reads run in parallel across the
+pool. Writes stay serialized per file by the storage layer - DirectoryStore's flush
+lock and cross-process file lock, or SQLite's write lock - and concurrent updates to
+the same file are group-committed into one rewrite. The caller's context variables
+(e.g. the metrics attribution of the current tool call) are carried into the thread.
+"""
+
+DEFAULT_TOOL_WORKERS = 8
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor | None:
+    """Return the shared tool thread pool, creating it on first use (None with TOOL_WORKERS=0)."""
+    global _executor
+    workers = int(os.getenv("TOOL_WORKERS", str(DEFAULT_TOOL_WORKERS)))
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool-io")
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the tool thread pool and await its result.
+
+    Args:
+        func: The blocking function (file I/O, parsing, a storage call)
+        args, kwargs: Passed to func
+
+    Returns:
+        Whatever func returned; exceptions it raises are re-raised here
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+def offload_tool(func):
+    """Make a synchronous tool run in the tool thread pool.
+
+    The wrapper is async and keeps the tool's name, docstring and annotated signature,
+    so the schema the model sees is unchanged. Async tools are returned as they are;
+    they offload their own blocking steps with run_blocking().
+    """
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,208 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+"""
+Turn Traces
+
+A TurnTrace records what happened during one user turn: the tool calls the model made,
+their arguments and outputs, when each call and result was seen, when the first
+reply token arrived, and how many tokens the model calls of the turn consumed.
+Contents are fed to observe() as they arrive (one by one from agent.run_stream
+updates, or all at once from a finished agent.run result via observe_response()).
+Calls are indexed by call_id, so matching a result to its call is a dict lookup
+however many tools a turn uses.
+
+TurnHistory keeps the most recent turns in a ring buffer (TURN_HISTORY_SIZE in .env,
+default 20) so `show 3` in the REPL, or GET /sessions/{id}/turns on the server, can
+display any recent turn and not only the last one.
+"""
+
+DEFAULT_HISTORY_SIZE = 20
+
+
+@dataclass
+class ToolCallTrace:
+    """One tool call made during a turn, and its result once seen."""
+
+    call_id: str
+    name: str
+    arguments: str | dict | None = None
+    server: str = "local"
+    status: str = "pending"
+    output: Any = None
+    called_at: float = field(default_factory=time.perf_counter)
+    returned_at: float | None = None
+    # Execution time reported with the result (see local_provider.py), if any
+    reported_seconds: float | None = None
+
+    @property
+    def duration(self) -> float | None:
+        """Seconds the tool took: as reported with its result, else call-to-result time."""
+        if self.reported_seconds is not None:
+            return self.reported_seconds
+        if self.returned_at is not None:
+            return self.returned_at - self.called_at
+        return None
+
+    def parsed_arguments(self) -> dict | None:
+        """The arguments as a dict (streamed arguments arrive as a JSON string)."""
+        if isinstance(self.arguments, str):
+            try:
+                return json.loads(self.arguments)
+            except json.JSONDecodeError:
+                return None
+        return self.arguments
+
+    def to_dict(self) -> dict:
+        return {
+            "call_id": self.call_id,
+            "name": self.name,
+            "server": self.server,
+            "arguments": self.arguments,
+            "status": self.status,
+            "output": self.output,
+            "duration_seconds": self.duration,
+        }
+
+
+@dataclass
+class TurnTrace:
+    """Everything recorded about one user turn."""
+
+    number: int
+    user_input: str
+    started: datetime = field(default_factory=datetime.now)
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: float | None = None
+    finished_at: float | None = None
+    reply: str | None = None
+    # Summed over the turn's model calls, from the provider's usage details (None if not reported)
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    calls: dict[str, ToolCallTrace] = field(default_factory=dict)
+    _last_call_id: str | None = None
+
+    @property
+    def tool_calls(self) -> list[ToolCallTrace]:
+        """The tool calls in the order the model made them."""
+        return list(self.calls.values())
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        """Seconds from the user's message to the first reply text (the whole turn unless streamed)."""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    def add_usage(self, usage: dict) -> None:
+        """Add one model call's token counts (a UsageDetails dict) to the turn's totals."""
+        self.input_tokens = (self.input_tokens or 0) + (usage.get("input_token_count") or 0)
+        self.output_tokens = (self.output_tokens or 0) + (usage.get("output_token_count") or 0)
+
+    def observe(self, content) -> ToolCallTrace | None:
+        """Record one message content (reply text, function calls and results, usage; others are ignored).
+
+        Returns:
+            The tool call the content belongs to, if it is a function call or result
+        """
+        if content.type == "text":
+            if content.text and self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+
+        elif content.type == "function_call":
+            call_id = content.call_id or self._last_call_id
+            call = self.calls.get(call_id)
+            if call is None:
+                call = ToolCallTrace(call_id, content.name or "Unknown", content.arguments)
+                self.calls[call_id] = call
+                self._last_call_id = call_id
+            elif isinstance(call.arguments, str) and isinstance(content.arguments, str):
+                # Streamed calls send their arguments in fragments
+                call.arguments += content.arguments
+            elif content.arguments:
+                call.arguments = content.arguments
+            return call
+
+        elif content.type == "function_result":
+            call = self.calls.get(content.call_id)
+            if call is None:
+                # A result without its call (e.g. the call arrived in an earlier response)
+                call = ToolCallTrace(content.call_id, "Unknown")
+                self.calls[content.call_id] = call
+            call.output = content.result if content.exception is None else content.exception
+            call.status = "failed" if content.exception is not None else "completed"
+            call.returned_at = time.perf_counter()
+            call.reported_seconds = (content.additional_properties or {}).get("duration_seconds")
+            return call
+
+        elif content.type == "usage":
+            self.add_usage(content.usage_details or {})
+        return None
+
+    def observe_response(self, result) -> None:
+        """Record every content of a finished agent.run result, and its token usage."""
+        input_tokens = self.input_tokens
+        for message in result.messages:
+            for content in message.contents:
+                self.observe(content)
+        # A merged response carries its usage in usage_details rather than as contents
+        if self.input_tokens == input_tokens and result.usage_details:
+            self.add_usage(result.usage_details)
+
+    def finish(self, reply: str) -> None:
+        self.reply = reply
+        self.finished_at = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "turn": self.number,
+            "started": self.started.isoformat(timespec="seconds"),
+            "user_input": self.user_input,
+            "reply": self.reply,
+            "duration_seconds": self.duration,
+            "time_to_first_token_seconds": self.time_to_first_token,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tool_calls": [call.to_dict() for call in self.calls.values()],
+        }
+
+
+class TurnHistory:
+    """Ring buffer of the most recent turns of one conversation.
+
+    Args:
+        size: Turns kept (defaults to TURN_HISTORY_SIZE, else 20)
+    """
+
+    def __init__(self, size: int | None = None):
+        size = size or int(os.getenv("TURN_HISTORY_SIZE", str(DEFAULT_HISTORY_SIZE)))
+        self.turns: deque[TurnTrace] = deque(maxlen=max(size, 1))
+        self.count = 0
+
+    def start(self, user_input: str) -> TurnTrace:
+        """Begin recording a new turn (the oldest one is dropped when the buffer is full)."""
+        self.count += 1
+        trace = TurnTrace(self.count, user_input)
+        self.turns.append(trace)
+        return trace
+
+    def last(self, back: int = 1) -> TurnTrace | None:
+        """The turn `back` turns ago (1 = the latest), or None if it is no longer kept."""
+        if 1 <= back <= len(self.turns):
+            return self.turns[-back]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def __iter__(self):
+        return iter(self.turns)